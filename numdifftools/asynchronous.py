@@ -0,0 +1,133 @@
+"""Asynchronous evaluation of derivatives of coroutine functions
+
+Author : pbrod
+License : BSD
+Notes
+-----
+The acall methods of the derivative classes in numdifftools.core and
+numdifftools.nd_cstep return a coroutine computing the derivative of a
+coroutine function, e.g., one calling a remote simulation service. The
+derivative is computed by the usual algorithm in a helper thread, while the
+function is evaluated on the event loop. The independent perturbed points of
+each step level, i.e., each batch the algorithm would give to an executor,
+are evaluated concurrently with asyncio.gather, limited by a semaphore. The
+core Derivative, Gradient, Hessdiag and Jacobian have one such level with the
+points of all the elements of x, and Hessian has two, the diagonal and the
+mixed partials. Thus the wall time is bounded by the latency of the service
+times the number of step levels, and not by the number of evaluations or
+variables.
+"""
+from __future__ import division, print_function
+import asyncio
+import copy
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+__all__ = ['acall']
+
+
+class _BlockingFun(object):
+    ''' Synchronous function evaluating a coroutine function on a loop
+
+    It is called from threads other than the one running the loop.
+    '''
+
+    def __init__(self, afun, loop, semaphore):
+        self.afun = afun
+        self.loop = loop
+        self.semaphore = semaphore
+
+    async def acall(self, x, *args, **kwds):
+        async with self.semaphore:
+            value = self.afun(x, *args, **kwds)
+            if inspect.isawaitable(value):
+                value = await value
+            return value
+
+    def __call__(self, x, *args, **kwds):
+        return asyncio.run_coroutine_threadsafe(
+            self.acall(x, *args, **kwds), self.loop).result()
+
+
+class _GatherExecutor(object):
+    ''' Executor evaluating each batch of points with asyncio.gather
+
+    Calls of the blocking function itself are awaited directly on the loop.
+    Other callables, e.g., wrappers of it made by the derivative classes, are
+    run in threads, where they call the blocking function.
+    '''
+
+    def __init__(self, fun, loop, max_concurrency):
+        self.fun = fun
+        self.loop = loop
+        self._threads = ThreadPoolExecutor(max_concurrency)
+
+    def shutdown(self, wait=True):
+        self._threads.shutdown(wait)
+
+    def _direct_call(self, fun):
+        ''' Return args and kwds if fun calls self.fun directly, else None '''
+        if fun is self.fun:
+            return (), {}
+        if getattr(fun, 'f', None) is self.fun and hasattr(fun, 'args'):
+            return fun.args, fun.kwds  # nd_cstep._ArgsFun
+        return None
+
+    async def _evaluate(self, fun, x):
+        direct = self._direct_call(fun)
+        if direct is not None:
+            return await self.fun.acall(x, *direct[0], **direct[1])
+        return await self.loop.run_in_executor(self._threads, fun, x)
+
+    async def _gather(self, fun, points):
+        return await asyncio.gather(*[self._evaluate(fun, x)
+                                      for x in points])
+
+    def map(self, fun, points):
+        points = list(points)
+        return iter(asyncio.run_coroutine_threadsafe(
+            self._gather(fun, points), self.loop).result())
+
+
+async def acall(derivative, x, args=(), kwds=None, max_concurrency=8,
+                fun_name='fun'):
+    '''
+    Return derivative(x, *args, **kwds) of a coroutine function
+
+    Parameters
+    ----------
+    derivative : derivative object
+        e.g., Derivative, Gradient, Jacobian or Hessian of numdifftools.core
+        or numdifftools.nd_cstep, with a coroutine function (or a plain
+        function) as the function to differentiate.
+    x : array_like
+        value at which the derivative is evaluated.
+    args, kwds :
+        extra arguments of the call of the derivative object.
+    max_concurrency : scalar integer
+        maximum number of evaluations in progress at a time.
+    fun_name : string
+        name of the member variable holding the function.
+
+    Notes
+    -----
+    The derivative object is copied, so concurrent calls of acall of the
+    same object do not interfere. The member variables set by the call,
+    e.g., error_estimate, are copied back when it is done.
+    '''
+    loop = asyncio.get_running_loop()
+    afun = getattr(derivative, fun_name)
+    blocking_fun = _BlockingFun(afun, loop, asyncio.Semaphore(max_concurrency))
+    executor = _GatherExecutor(blocking_fun, loop, max_concurrency)
+    clone = copy.copy(derivative)
+    setattr(clone, fun_name, blocking_fun)
+    clone.executor = executor
+    try:
+        result = await loop.run_in_executor(
+            None, lambda: clone(x, *args, **(kwds or {})))
+    finally:
+        executor.shutdown(wait=False)
+    state = dict((name, value) for name, value in clone.__dict__.items()
+                 if name not in (fun_name, 'executor'))
+    derivative.__dict__.update(state)
+    return result
@@ -0,0 +1,126 @@
+"""Detection of functions that can be evaluated at a stack of points
+
+Author : pbrod
+License : BSD
+Notes
+-----
+Many functions happen to broadcast over a stack of points, e.g., a function
+of x written with array arithmetic along the first or last axis of x. The
+BatchProbe evaluates such a function at a few points both one by one and
+stacked, and records if the stacked call gives the same values and is
+faster. The derivative classes use it when vectorized='auto' in
+numdifftools.core and batch='auto' in numdifftools.nd_cstep.
+"""
+from __future__ import division, print_function
+from timeit import default_timer as timer
+import numpy as np
+
+__all__ = ['BatchProbe']
+
+
+class BatchProbe(object):
+    '''
+    Decide and remember if functions are faster on stacks of points
+
+    Parameters
+    ----------
+    axis : 0 or -1
+        axis along which the points are stacked. The values returned by a
+        function called with a stack of points must be stacked along the
+        same axis.
+    probe_size : scalar integer
+        maximum number of points evaluated by the probe.
+    rtol : real scalar
+        relative tolerance of the values of the stacked call compared with
+        the values of the calls point by point.
+
+    Notes
+    -----
+    The decision for each function is stored in the dict decisions as a
+    tuple (batch, shape), where batch is True if the stacked call is both
+    correct and faster, and shape is the shape of the value at one point.
+    The decisions are not pickled, because the functions used as keys may
+    not be picklable.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from numdifftools.batching import BatchProbe
+    >>> probe = BatchProbe(axis=0)
+    >>> fun = lambda x: np.sum(x ** 2, axis=-1)
+    >>> points = np.arange(12.0).reshape(4, 3)
+    >>> probe(fun, fun, points)
+    [5.0, 50.0, 149.0, 302.0]
+    >>> probe.decisions[fun][1]
+    ()
+
+    The sum over all elements is not batch-capable
+
+    >>> fun2 = lambda x: np.sum(x ** 2)
+    >>> values = probe(fun2, fun2, points)
+    >>> probe.decisions[fun2]
+    (False, ())
+    '''
+
+    def __init__(self, axis=0, probe_size=32, rtol=1e-12):
+        self.axis = axis
+        self.probe_size = probe_size
+        self.rtol = rtol
+        self.decisions = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['decisions'] = {}
+        return state
+
+    def stack(self, points):
+        ''' Return array with the points stacked along axis '''
+        return np.moveaxis(np.array(points), 0, self.axis)
+
+    def unstack(self, values, num_points, shape):
+        ''' Return array of shape (num_points,) + shape from stacked values
+        '''
+        values = np.asarray(values)
+        if self.axis != 0:
+            values = np.moveaxis(np.reshape(values, (-1, num_points)), -1, 0)
+        return np.reshape(values, (num_points,) + shape)
+
+    def _is_consistent(self, values, rows):
+        rows = np.asarray(rows)
+        atol = self.rtol * np.max(np.abs(rows), initial=0)
+        return np.allclose(values, rows, rtol=self.rtol, atol=atol,
+                           equal_nan=True)
+
+    def __call__(self, key, fun, points, *args, **kwds):
+        ''' Return list of fun(x, *args, **kwds) for each of the points
+
+        If there is no decision for key and there are at least two points,
+        fun is also called with the stack of the points, and the decision is
+        stored in decisions[key].
+        '''
+        t0 = timer()
+        rows = [fun(x, *args, **kwds) for x in points]
+        time_rows = timer() - t0
+        if key in self.decisions or len(rows) < 2:
+            return rows
+        shape = np.shape(rows[0])
+        try:
+            t0 = timer()
+            values = fun(self.stack(points), *args, **kwds)
+            time_stacked = timer() - t0
+            values = self.unstack(values, len(rows), shape)
+            batch = bool(self._is_consistent(values, rows) and
+                         time_stacked < time_rows)
+        except Exception:
+            batch = False
+        self.decisions[key] = (batch, shape)
+        return rows
+
+
+def test_docstrings():
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
+
+
+if __name__ == '__main__':
+    test_docstrings()
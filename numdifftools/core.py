@@ -21,21 +21,71 @@ Numdifftools implementation
 # !/usr/bin/env python
 
 from __future__ import division, print_function
+import copy
+import threading
+from collections import namedtuple
 import numpy as np
 import scipy.linalg as linalg
 import scipy.misc as misc
 # import scipy.interpolate as si
 import warnings
+from itertools import combinations_with_replacement, islice, permutations
+from numpy.lib.stride_tricks import as_strided
 import matplotlib.pyplot as plt
+from numdifftools.batching import BatchProbe
+from numdifftools.fornberg import fd_weights
 
 __all__ = [
-    'dea3', 'Derivative', 'Jacobian', 'Gradient', 'Hessian', 'Hessdiag'
+    'dea3', 'Derivative', 'Jacobian', 'Gradient', 'Hessian', 'Hessdiag',
+    'PartialDerivative', 'ThirdDerivative', 'Laplacian', 'GaussNewtonHessian'
 ]
 
 _TINY = np.finfo(float).tiny
 _EPS = np.finfo(float).eps
 
 
+class _CountingFun(object):
+    ''' Picklable function counting the calls of fun '''
+
+    def __init__(self, fun):
+        self.fun = fun
+        self.num_calls = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __call__(self, x):
+        with self._lock:
+            self.num_calls += 1
+        return self.fun(x)
+
+
+class _PartialFun(object):
+    ''' Picklable function of items (i, xi) returning fun(x) with x[i] = xi
+
+    It does not depend on the element i, so an executor evaluating the
+    points of all the elements, e.g., one sending the function to remote
+    workers, gets the same function for all of them.
+    '''
+
+    def __init__(self, fun, x):
+        self.fun = fun
+        self.x = x
+
+    def __call__(self, item):
+        i, xi = item  # a float i, if the executor made an array of item
+        x = self.x.copy()
+        x[int(i)] = xi
+        return self.fun(x)
+
+
 # def _extrapolate(h1, der_romb, errest):
 #     i0 = np.argmin(errest)-1
 #     x = h1[:i0]
@@ -320,6 +370,45 @@ def dea3(v0, v1, v2, symmetric=False):
     return result, abserr
 
 
+def _dea3_into(E0, E1, E2, result, abserr, work, masks):
+    '''
+    Same as dea3(E0, E1, E2), but computed in place
+
+    The extrapolated values and the error estimates are written to result
+    and abserr. work holds 8 and masks 3 boolean arrays of the shape of E0
+    for the intermediate values, e.g., abs(E2 - E1) is left in work[2].
+    '''
+    delta2, delta1, err2, err1, tol2, tol1, ss, tmp = work
+    small, smalle2, converged = masks
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        np.subtract(E2, E1, out=delta2)
+        np.subtract(E1, E0, out=delta1)
+        np.abs(delta2, out=err2)
+        np.abs(delta1, out=err1)
+        np.maximum(np.abs(E2, out=tol2), np.abs(E1, out=tmp), out=tol2)
+        tol2 *= _EPS
+        np.maximum(np.abs(E1, out=tol1), np.abs(E0, out=tmp), out=tol1)
+        tol1 *= _EPS
+        np.copyto(delta1, _TINY, where=np.less(err1, _TINY, out=small))
+        np.copyto(delta2, _TINY, where=np.less(err2, _TINY, out=small))
+        np.divide(1.0, delta2, out=ss)
+        ss -= np.divide(1.0, delta1, out=tmp)
+        ss += _TINY
+        np.abs(np.multiply(ss, E1, out=tmp), out=tmp)
+        np.less_equal(tmp, 1.0e-3, out=smalle2)
+        np.less_equal(err1, tol1, out=converged)
+        converged &= np.less_equal(err2, tol2, out=small)
+        converged |= smalle2
+        np.divide(1.0, ss, out=result)
+        result += E1
+        np.copyto(result, E2, where=converged)
+        np.abs(np.subtract(result, E2, out=tmp), out=tmp)
+        tol2 *= 10
+        np.copyto(tmp, tol2, where=converged)
+        np.add(err1, err2, out=abserr)
+        abserr += tmp
+
+
 def vec2mat(vec, n, m):
     ''' forms the matrix M, such that M[i,j] = vec[i+j]
     '''
@@ -475,7 +564,7 @@ class _Derivative(object):
     ----------
     fun : callable
         function to differentiate.
-    n : Integer from 1 to 4             (Default 1)
+    n : Integer, 1 or larger            (Default 1)
         defining derivative order.
     order : Integer from 1 to 4        (Default 2)
         defining order of basic method used.
@@ -496,9 +585,28 @@ class _Derivative(object):
             7 + np.ceil(self.n/2.) + self.order + self.romberg_terms
     delta : vector default step_max*step_ratio**(-arange(step_num))
         Defines the steps sizes used in derivation: h_i = step_nom[i] * delta
-    vectorized : Bool
+    vectorized : Bool or 'auto'
         True  - if your function is vectorized.
         False - loop over the successive function calls (default).
+        'auto' - probe on the first call if fun gives the same values when
+                 called with the points as columns of one array, and use
+                 that if it is faster. The decision is cached for each fun.
+    executor : concurrent.futures.Executor, optional
+        If given, the independent function calls of the loop are submitted to
+        it, e.g., a ThreadPoolExecutor, and gathered in their original order.
+        Derivative, Gradient, Hessdiag and Jacobian give the points of all
+        elements of x to one call of its map method, with one function for
+        all of them.
+        The result is identical to the one of the serial loop.
+    inplace : Bool
+        True  - call fun with one scratch copy of x, where the perturbed
+                coordinate (or pair of coordinates) is set before and
+                restored after each call. fun must then neither modify x
+                nor keep a reference to it, e.g., in a cache. Values sharing
+                memory with x are copied. Only used by Gradient, Hessdiag,
+                Hessian and Jacobian, and only if executor is None and
+                vectorized is False; otherwise fun gets a new x each call.
+        False - call fun with a new copy of x each time (default).
 
     Uses a semi-adaptive scheme to provide the best estimate of the
     derivative by its automatic choice of a differencing interval. It uses
@@ -519,7 +627,7 @@ class _Derivative(object):
                  step_max=2.0, step_nom=None, step_ratio=2.0, step_num=26,
                  offset=-2,
                  delta=None, vectorized=False, verbose=False,
-                 use_dea=True, transform=None):
+                 use_dea=True, transform=None, executor=None, inplace=False):
         self.fun = fun
         self.n = n
         self.order = order
@@ -535,6 +643,9 @@ class _Derivative(object):
         self.verbose = verbose
         self.use_dea = use_dea
         self.transform = transform
+        self.executor = executor
+        self.inplace = inplace
+        self._batch_probe = BatchProbe(axis=-1)
 
         self._check_params()
 
@@ -546,7 +657,58 @@ class _Derivative(object):
         # self._rmat = None
         self._qromb = None
         self._rromb = None
+        self._romb_cov = None
         self._diff_fun = None
+        self._frozen = False
+
+    def __getstate__(self):
+        ''' Return state to pickle, e.g., when sent to a worker process
+
+        The executor is not part of the state, because it can not be pickled
+        and the workers evaluate fun serially.
+        '''
+        state = self.__dict__.copy()
+        state['executor'] = None
+        return state
+
+    result = namedtuple('result', ['value', 'error', 'step',
+                                   'num_evaluations'])
+
+    def evaluate(self, x):
+        ''' Return result record of the derivative at x
+
+        Unlike the call of the object, evaluate does not change the object,
+        so the same object can be used by several threads at once. The
+        per-call state is kept in a shallow copy of the object.
+
+        Returns
+        -------
+        result : namedtuple
+            with the fields value, error (error_estimate), step (final_delta)
+            and num_evaluations, the number of calls of fun made in this
+            process.
+        '''
+        clone = copy.copy(self)
+        clone.fun = fun = _CountingFun(self.fun)
+        clone._work = {}
+        value = clone(x)
+        return self.result(value, clone.error_estimate, clone.final_delta,
+                           fun.num_calls)
+
+    def acall(self, x, max_concurrency=8):
+        ''' Return coroutine computing the derivative of a coroutine fun at x
+
+        The independent evaluations of each step level are awaited
+        concurrently with asyncio.gather, at most max_concurrency at a time,
+        and then extrapolated as in the synchronous call, e.g.,
+        der = await Gradient(afun).acall(x)
+
+        See also
+        --------
+        numdifftools.asynchronous.acall
+        '''
+        from numdifftools.asynchronous import acall
+        return acall(self, x, max_concurrency=max_concurrency)
 
     def _set_delta(self, delta=None):
         ''' Set the steps to use in derivation.
@@ -574,10 +736,14 @@ class _Derivative(object):
         '''
         atleast_1d = np.atleast_1d
         kwds = self.__dict__
-        for name in ['n', 'order']:
-            val = np.atleast_1d(kwds[name])
-            if ((len(val) != 1) or (val not in (1, 2, 3, 4))):
-                raise ValueError('%s must be scalar, one of [1 2 3 4].' % name)
+        val = atleast_1d(kwds['n'])
+        if not ((val.ndim == 1) and (len(val) > 0) and
+                np.all(val == np.round(val)) and np.all(val >= 1)):
+            raise ValueError('n must be one or a sequence of integers >= 1.')
+        name = 'order'
+        val = atleast_1d(kwds[name])
+        if ((len(val) != 1) or (val not in (1, 2, 3, 4))):
+            raise ValueError('%s must be scalar, one of [1 2 3 4].' % name)
         name = 'romberg_terms'
         val = atleast_1d(kwds[name])
         if not ((len(val) == 1) and (val in (0, 1, 2, 3))):
@@ -597,10 +763,89 @@ class _Derivative(object):
             t = 'order 1 or 3 is not possible for central difference methods'
             raise ValueError(t)
 
+    def plan(self, shape):
+        ''' Return plan computing the derivative at points of the given shape
+
+        The plan holds a copy of the object, sharing only fun and the
+        executor, with the differentiation rules and the Romberg
+        extrapolation matrices computed once, so repeated calls of the plan
+        only evaluate fun and extrapolate. Changing the parameters of the
+        object, or the elements of array parameters such as step_nom, does
+        not change the plan.
+
+        See also
+        --------
+        DerivativePlan
+        '''
+        clone = copy.copy(self)
+        state = dict(vars(self), fun=None, executor=None, _batch_probe=None)
+        clone.__dict__.update(copy.deepcopy(state, {id(self): clone}))
+        clone.fun, clone.executor = self.fun, self.executor
+        clone._batch_probe = copy.copy(self._batch_probe)
+        clone._batch_probe.decisions = dict(self._batch_probe.decisions)
+        clone._prepare()
+        clone._frozen = True
+        clone._index_cache = {}
+        clone._work = {}
+        return DerivativePlan(clone, shape)
+
+    def _prepare(self):
+        ''' Set the member variables that do not depend on x '''
+        self._initialize()
+
+    def _vec2mat(self, vec, n, m):
+        ''' Return vec2mat(vec, n, m), with the index arrays cached by plans
+        '''
+        if not self._frozen:
+            return vec2mat(vec, n, m)
+        index = self._index_cache.get((n, m))
+        if index is None:
+            i, j = np.ogrid[0:n, 0:m]
+            index = self._index_cache[(n, m)] = i + j
+        return np.matrix(vec[index])
+
+    def _work_array(self, name, shape, dtype=float):
+        ''' Return array of the given shape for intermediate values
+
+        Plans keep the arrays between the calls, so after the first call
+        they are not allocated again.
+        '''
+        if not self._frozen:
+            return np.empty(shape, dtype)
+        work = self._work.get(name)
+        if work is None or work.shape != shape or work.dtype != dtype:
+            work = self._work[name] = np.empty(shape, dtype)
+        return work
+
+    def _work_copy(self, name, array):
+        ''' Return array, copied to the work array name by plans
+
+        The plan keeps the values in its work array, so the array made by fun
+        is freed instead of being held during the rest of the call.
+        '''
+        if not self._frozen:
+            return array
+        work = self._work_array(name, array.shape, array.dtype)
+        np.copyto(work, array)
+        return work
+
+    @staticmethod
+    def _out_array(out, shape):
+        ''' Return out, if given, else a new array of zeros of the given shape
+        '''
+        if out is None:
+            return np.zeros(shape)
+        if np.shape(out) != shape:
+            raise ValueError('Output array must have shape {}, not '
+                             '{}'.format(shape, np.shape(out)))
+        return out
+
     def _initialize(self):
         '''Set derivative parameters:
             differention rule and romberg extrapolation matrices
         '''
+        if self._frozen:
+            return
         self._set_fd_rule()
         self._set_romb_qr()
         self._set_difference_function()
@@ -615,20 +860,24 @@ class _Derivative(object):
         _fd_rule
         romberg_terms
         '''
-        fd_rule = self._fd_rule
-        n_fdr = fd_rule.size
-        n_h = h.size
-
         f_del = self._diff_fun(fun, f_x0i, x0i, h)
 
-        if f_del.size != n_h:
+        if f_del.size != h.size:
             raise ValueError('fun did not return data of correct size ' +
                              '(it must be vectorized)')
+        return self._apply_rule(f_del, self._fd_rule, h, self.n)
 
+    def _apply_rule(self, f_del, fd_rule, h, n):
+        '''
+        Return initial derivative estimates of order n from the differences
+        f_del for a sequence of stepsizes h
+        '''
+        n_fdr = fd_rule.size
         # ne = max(n_h + 1 - n_fdr - self.romberg_terms, 1)
-        ne = max(n_h + 1 - n_fdr, 1)
-        der_init = np.asarray(vec2mat(f_del, ne, n_fdr) * fd_rule.T).ravel()
-        der_init = der_init / (h[:ne]) ** self.n
+        ne = max(h.size + 1 - n_fdr, 1)
+        der_init = np.dot(np.asarray(self._vec2mat(f_del, ne, n_fdr)),
+                          fd_rule)
+        der_init = der_init / (h[:ne]) ** n
 
         return der_init, h[:ne]
 
@@ -694,19 +943,140 @@ class _Derivative(object):
             step_nom = np.maximum(np.log1p(np.abs(x0)), 0.1)
         return self._make_exact(np.atleast_1d(step_nom)) * np.ones(x0.shape)
 
+    @property
+    def _vectorized(self):
+        ''' True if fun is known to accept the points as columns of an array
+        '''
+        return self.vectorized != 'auto' and bool(self.vectorized)
+
+    @property
+    def _use_scratch(self):
+        ''' True if fun is called serially with one scratch array, see inplace
+        '''
+        return (bool(self.inplace) and self.executor is None and
+                self.vectorized is False)
+
+    @property
+    def _batch_elements(self):
+        ''' True if the samples of all elements are evaluated in one map
+        '''
+        return self.executor is not None and not self.vectorized
+
+    @staticmethod
+    def _perturb_scratch(x, index, values):
+        ''' Generate the scratch array x with x[index] set to each of values
+
+        The same array is yielded each time, so each point must be evaluated
+        before the next one is generated. x[index] is restored when done.
+        '''
+        x_index = np.copy(x[index])
+        try:
+            for value in values:
+                x[index] = value
+                yield x
+        finally:
+            x[index] = x_index
+
+    @staticmethod
+    def _call_scratch(fun, x):
+        ''' Return fun(x), copied if it shares memory with the scratch array x
+        '''
+        value = fun(x)
+        if isinstance(value, np.ndarray) and np.may_share_memory(value, x):
+            return value.copy()
+        return value
+
+    def _map(self, fun, points):
+        ''' Return list of fun evaluated at each of the points
+
+        If vectorized is 'auto', the first points are used to decide if fun
+        is faster when called once with all the points as columns.
+
+        Member variables used
+        ---------------------
+        vectorized
+        executor
+        '''
+        if self.vectorized == 'auto':
+            return self._map_auto(fun, points)
+        return self._map_points(fun, points)
+
+    def _map_points(self, fun, points):
+        if self.executor is None:
+            return [fun(x) for x in points]
+        return list(self.executor.map(fun, points))
+
+    def _imap(self, fun, points):
+        ''' Return iterator of fun evaluated at each of the points
+
+        Same as _map, but the serial evaluation is lazy, so each value can
+        be used before the next one is computed.
+        '''
+        if self.vectorized == 'auto':
+            return iter(self._map_auto(fun, points))
+        if self.executor is None:
+            return (fun(x) for x in points)
+        return self.executor.map(fun, points)
+
+    def _element_fun(self, fun):
+        ''' Return function evaluated at the points made by _element_point
+        '''
+        return fun
+
+    @staticmethod
+    def _element_point(i, xi):
+        ''' Return point of element i with value xi given to _element_fun
+        '''
+        return xi
+
+    def _probe_key(self, fun):
+        ''' Return key of the batch decision for fun
+
+        fun is either the user function or a bound method wrapping it, e.g.,
+        self._fun. The bound methods differ for each copy of the object made
+        by evaluate, so the key is made of the user function and the function
+        of the method. Thus the decisions do not grow with the number of
+        calls, nor keep the copies alive.
+        '''
+        user_fun = self.fun
+        if isinstance(user_fun, _CountingFun):
+            user_fun = user_fun.fun
+        if fun is self.fun:
+            return user_fun
+        return user_fun, getattr(fun, '__func__', fun)
+
+    def _map_auto(self, fun, points):
+        probe = self._batch_probe
+        key = self._probe_key(fun)
+        points = iter(points)
+        if key not in probe.decisions:
+            values = probe(key, fun, list(islice(points, probe.probe_size)))
+            if key not in probe.decisions:
+                return values  # too few points to decide
+            return values + self._map_auto(fun, points)
+        batch, shape = probe.decisions[key]
+        if not batch:
+            return self._map_points(fun, points)
+        points = list(points)
+        if not points:
+            return []
+        return list(probe.unstack(fun(probe.stack(points)), len(points),
+                                  shape))
+
     def _eval_first(self, fun, x0):
         f_x0 = np.zeros(x0.shape)
         # will we need fun(x0)?
-        even_order = np.remainder(self.n, 2) == 0
+        even_order = np.any(np.remainder(self.n, 2) == 0)
         if even_order or not self.method[0] == 'c':
-            if self.vectorized:
+            if self._vectorized:
                 f_x0 = fun(x0)
             else:
-                f_x0 = np.asfarray([fun(x0j) for x0j in x0])
+                f_x0 = np.asfarray(self._map(fun, x0))
         return f_x0
 
     def _remove_non_positive(self, h):
-        threshold = (self.n > 1) * 10.0 ** (-15 + self.n)
+        n = np.max(self.n)
+        threshold = (n > 1) * 10.0 ** (-15 + n)
         if (h <= threshold).any():
             warnings.warn('Some of the steps are too small, either because ' +
                           'step_max*step_nom is too small or ' +
@@ -731,6 +1101,9 @@ class _Derivative(object):
         return der_romb[i], errors[i], h2[i]
 
     def _derivative(self, fun, x00, step_nom=None):
+        if self._batch_elements:
+            der, err, delta = self._multi_order_derivative(fun, x00, step_nom)
+            return der[0], err[0], delta[0]
         x0 = np.atleast_1d(x00)
         step_nom = self._get_step_nom(step_nom, x0)
 
@@ -747,34 +1120,124 @@ class _Derivative(object):
             der[i], err[i], delta[i] = self._best_der(der_romb, errors, h2)
         return der, err, delta
 
-    def _fd_mat(self, parity, nterms):
-        ''' Return matrix for finite difference derivation.
+    def _sample(self, fun, x0i, h):
+        ''' Return fun evaluated at x0i + h and x0i - h
 
-        Parameters
-        ----------
-        parity : scalar, integer
-            0 (one sided, all terms included but zeroth order)
-            1 (only odd terms included)
-            2 (only even terms included)
-        nterms : scalar, integer
-            number of terms
+        Only the samples needed by the method are evaluated, the other one is
+        returned as None.
 
         Member variables used
         ---------------------
-        step_ratio
+        method
+        vectorized
+        executor
         '''
-        srinv = 1.0 / self.step_ratio
-        [i, j] = np.ogrid[0:nterms, 0:nterms]
+        method = self.method[0]
+        signs = [sign for sign, methods in ((1, 'cf'), (-1, 'cb'))
+                 if method in methods]
+        if self._vectorized:
+            f_val = [np.ravel(fun(x0i + sign * h)) for sign in signs]
+        else:
+            # the samples of both signs are evaluated in one sweep
+            x = np.hstack([x0i + sign * h for sign in signs])
+            f_val = np.split(np.asfarray(self._map(fun, x)).ravel(),
+                             np.arange(1, len(signs)) * h.size)
+        f_plus = f_val[0] if method in 'cf' else None
+        f_minus = f_val[-1] if method in 'cb' else None
+        for f_val in (f_plus, f_minus):
+            if f_val is not None and f_val.size != h.size:
+                raise ValueError('fun did not return data of correct size ' +
+                                 '(it must be vectorized)')
+        return f_plus, f_minus
+
+    def _sample_batch(self, fun, x0, steps):
+        ''' Return list of f_x0i, f_plus and f_minus of each element of x0
+
+        Same as _eval_first and _sample of each element, but the points of
+        all the elements are evaluated with one map, so an executor can
+        evaluate all of them concurrently.
+        '''
+        method = self.method[0]
+        signs = [sign for sign, methods in ((1, 'cf'), (-1, 'cb'))
+                 if method in methods]
+        even_order = np.any(np.remainder(self.n, 2) == 0)
+        first = even_order or not method == 'c'
+
+        def points():
+            if first:
+                for i in range(x0.size):
+                    yield self._element_point(i, x0[i])
+            for i, h in enumerate(steps):
+                for sign in signs:
+                    for xi in float(x0[i]) + sign * h:
+                        yield self._element_point(i, xi)
+        values = np.asfarray(self._map(self._element_fun(fun),
+                                       points())).ravel()
+        sizes = [x0.size * first] + [h.size for h in steps for _ in signs]
+        if values.size != sum(sizes):
+            raise ValueError('fun did not return data of correct size ' +
+                             '(it must be vectorized)')
+        values = np.split(values, np.cumsum(sizes)[:-1])
+        f_x0 = values[0] if first else np.zeros(x0.shape)
+        f_vals = [values[1 + i * len(signs):1 + (i + 1) * len(signs)]
+                  for i in range(x0.size)]
+        return [(float(f_x0[i]), f_val[0] if method in 'cf' else None,
+                 f_val[-1] if method in 'cb' else None)
+                for i, f_val in enumerate(f_vals)]
+
+    def _samples(self, fun, x0, steps):
+        ''' Return iterator of f_x0i, f_plus and f_minus of each element of x0
+
+        steps[i] are the steps of element i. The points are evaluated with
+        one map if _batch_elements, else each element is sampled when its
+        values are needed.
+        '''
+        if self._batch_elements:
+            return iter(self._sample_batch(fun, x0, steps))
+        f_x0 = self._eval_first(fun, x0)
+        return ((float(f_x0[i]),) + self._sample(fun, float(x0[i]), h)
+                for i, h in enumerate(steps))
 
-        try:
-            fact = {0: 1, 1: 2, 2: 2}[parity]
-        except Exception as msg:
-            raise ValueError('%s. Parity must be 0, 1 or 2! (%d)' % (str(msg),
-                                                                     parity))
-        offset = max(1, parity)
-        c = 1.0 / misc.factorial(np.arange(offset, fact * nterms + 1, fact))
-        mat = c[j] * srinv ** (i * (fact * j + offset))
-        return np.matrix(mat)
+    def _sample_diff(self, f_plus, f_minus, f_x0i, der_order):
+        ''' Return differences for derivative of order der_order
+
+        The central rules only need the even or odd part of the samples.
+        '''
+        method = self.method[0]
+        if method == 'c':
+            if der_order % 2 == 0:
+                return (f_plus + f_minus) / 2.0 - f_x0i
+            return (f_plus - f_minus) / 2.0
+        elif method == 'f':
+            return f_plus - f_x0i
+        return f_minus - f_x0i
+
+    def _multi_order_derivative(self, fun, x00, step_nom=None):
+        ''' Return derivatives of all orders in n from one sample sweep
+
+        Member variables used
+        ---------------------
+        n
+        '''
+        orders = np.atleast_1d(self.n)
+        fd_rules = [self._get_fd_rule(der_order) for der_order in orders]
+        x0 = np.atleast_1d(x00)
+        step_nom = self._get_step_nom(step_nom, x0)
+        steps = [self._get_steps(step_nom[i]) for i in range(x0.size)]
+
+        shape = (orders.size, x0.size)
+        der, err, delta = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+        samples = self._samples(fun, x0, steps)
+        for i, (f_x0i, f_plus, f_minus) in enumerate(samples):
+            h = steps[i]
+            for k, der_order in enumerate(orders):
+                f_del = self._sample_diff(f_plus, f_minus, f_x0i, der_order)
+                der_init, h1 = self._apply_rule(f_del, fd_rules[k], h,
+                                                der_order)
+                der_romb, errors, h2 = self._romb_extrap(der_init, h1)
+                der[k, i], err[k, i], delta[k, i] = self._best_der(der_romb,
+                                                                   errors, h2)
+        return der, err, delta
 
     def _set_fd_rule(self):
         '''
@@ -785,48 +1248,49 @@ class _Derivative(object):
 
         Member methods used
         -------------------
-        _fd_mat
+        _get_fd_rule
 
         Member variables used
         ---------------------
         n
+        '''
+        self._fd_rule = self._get_fd_rule(self.n)
+
+    def _get_fd_rule(self, der_order):
+        '''
+        Return finite differencing rule for derivative of order der_order
+
+        The rule is applied to the differences of the function values at the
+        offsets h, h/step_ratio, h/step_ratio**2, ... and the function value
+        at x0. Its weights are the finite difference weights for these
+        offsets, generated with Fornberg's recursion, so any derivative order
+        is possible.
+
+        Member variables used
+        ---------------------
         order
         method
+        step_ratio
         '''
-        der_order = self.n
         met_order = self.order
         method = self.method[0]
-
-        matrix = np.matrix
-        fd_rule = matrix(der_order)
-
-        pinv = linalg.pinv
+        srinv = 1.0 / self.step_ratio
         if method == 'c':  # 'central'
-            if met_order == 2:
-                if der_order == 3:
-                    fd_rule = matrix([0, 1]) * pinv(self._fd_mat(1, 2))
-                elif der_order == 4:
-                    fd_rule = matrix([0, 1]) * pinv(self._fd_mat(2, 2))
-            elif der_order == 1:
-                fd_rule = matrix([1, 0]) * pinv(self._fd_mat(1, 2))
-            elif der_order == 2:
-                fd_rule = matrix([1, 0]) * pinv(self._fd_mat(2, 2))
-            elif der_order == 3:
-                fd_rule = matrix([0, 1, 0]) * pinv(self._fd_mat(1, 3))
-            elif der_order == 4:
-                fd_rule = matrix([0, 1, 0]) * pinv(self._fd_mat(2, 3))
-        else:
-            v = np.zeros(der_order + met_order - 1)
-            v[der_order - 1] = 1
-            dpm = der_order + met_order - 1
-            fd_rule = matrix(v) * pinv(self._fd_mat(0, dpm))
-            if method == 'b':  # 'backward' rule
-                fd_rule = -fd_rule
-        self._fd_rule = fd_rule.ravel()
+            # only the even or odd part of the samples is used and the
+            # order of the method is even
+            num_steps = (der_order + 1) // 2 + (met_order + 1) // 2 - 1
+            steps = srinv ** np.arange(num_steps)
+            offsets = np.hstack((-steps[::-1], 0, steps))
+            weights = fd_weights(offsets, 0, der_order)
+            return 2 * weights[num_steps + 1:]
+        sign = -1 if method == 'b' else 1  # 'backward' rule
+        steps = sign * srinv ** np.arange(der_order + met_order - 1)
+        return fd_weights(np.hstack((0, steps)), 0, der_order)[1:]
 
     def _get_min_num_steps(self):
         n0 = 5 if self.method[0] == 'c' else 7
-        return int(n0 + np.ceil(self.n / 2.) + self.order + self.romberg_terms)
+        return int(n0 + np.ceil(np.max(self.n) / 2.) + self.order +
+                   self.romberg_terms)
 
     def _set_romb_qr(self):
         '''
@@ -835,6 +1299,8 @@ class _Derivative(object):
         method
         romberg_terms
         '''
+        if self._frozen:
+            return
         num_terms = self.romberg_terms
         add1 = self.method[0] == 'c'
         rombexpon = (1 + add1) * np.arange(num_terms) + self.order
@@ -847,71 +1313,23 @@ class _Derivative(object):
         rmat = np.matrix(rmat)
         self._qromb, self._rromb = linalg.qr(rmat)
         # self._rmat = rmat
+        rinv = np.asarray(linalg.pinv(self._rromb))
+        self._romb_cov = np.sum(rinv ** 2, axis=1)  # 1 spare dof
 
     def _set_difference_function(self):
         ''' Set _diff_fun function according to method
         '''
-        get_diff_fun = dict(c=self._central, b=self._backward,
-                            f=self._forward)[self.method[0]]
-        self._diff_fun = get_diff_fun()
-
-    def _central(self):
-        ''' Return central difference function
-
-        Member variables used
-            n
-            fun
-            vectorized
-        '''
-        even_order = (np.remainder(self.n, 2) == 0)
-
-        if self.vectorized:
-            if even_order:
-                f_del = lambda fun, f_x0i, x0i, h: (
-                    fun(x0i + h) + fun(x0i - h)).ravel() / 2.0 - f_x0i
-            else:
-                f_del = lambda fun, f_x0i, x0i, h: (
-                    fun(x0i + h) - fun(x0i - h)).ravel() / 2.0
-        else:
-            if even_order:
-                f_del = lambda fun, f_x0i, x0i, h: np.asfarray(
-                    [fun(x0i + h_j) + fun(x0i - h_j)
-                     for h_j in h]).ravel() / 2.0 - f_x0i
-            else:
-                f_del = lambda fun, f_x0i, x0i, h: np.asfarray(
-                    [fun(x0i + h_j) - fun(x0i - h_j)
-                     for h_j in h]).ravel() / 2.0
-        return f_del
-
-    def _forward(self):
-        ''' Return forward difference function
-
-        Member variables used
-            fun
-            vectorized
-        '''
-        if self.vectorized:
-            f_del = lambda fun, f_x0i, x0i, h: (fun(x0i + h) - f_x0i).ravel()
-        else:
-            f_del = lambda fun, f_x0i, x0i, h: np.asfarray(
-                [fun(x0i + h_j) - f_x0i for h_j in h]).ravel()
-        return f_del
+        self._diff_fun = self._sampled_diff
 
-    def _backward(self):
-        ''' Return backward difference function
+    def _sampled_diff(self, fun, f_x0i, x0i, h):
+        ''' Return differences of fun at x0i for the sequence of steps h
 
         Member variables used
         ---------------------
-        fun
-        vectorized
-
+        n
         '''
-        if self.vectorized:
-            f_del = lambda fun, f_x0i, x0i, h: (fun(x0i - h) - f_x0i).ravel()
-        else:
-            f_del = lambda fun, f_x0i, x0i, h: np.asfarray(
-                [fun(x0i - h_j) - f_x0i for h_j in h]).ravel()
-        return f_del
+        f_plus, f_minus = self._sample(fun, x0i, h)
+        return self._sample_diff(f_plus, f_minus, f_x0i, self.n)
 
     def _remove_non_finite(self, der_init, h1):
         isnonfinite = 1 - np.isfinite(der_init)
@@ -939,8 +1357,7 @@ class _Derivative(object):
         '''uncertainty estimate of derivative prediction'''
         coefs = rombcoefs[0][0]
         s = np.sqrt(rombcoefs[1])
-        rinv = np.asarray(linalg.pinv(self._rromb))
-        cov1 = np.sum(rinv ** 2, axis=1)  # 1 spare dof
+        cov1 = self._romb_cov
         errest = np.maximum(s * 12.7062047361747 * np.sqrt(cov1[0]),
                             s * _EPS * 10.)
 
@@ -979,7 +1396,8 @@ class _Derivative(object):
         if ne < num_terms + 2:
             errest = np.ones(der_init.shape) * hout
         else:
-            rhs = vec2mat(der_romb, num_terms + 2, max(1, ne - num_terms - 2))
+            rhs = self._vec2mat(der_romb, num_terms + 2,
+                                max(1, ne - num_terms - 2))
 
             rombcoefs = linalg.lstsq(self._rromb, (self._qromb.T * rhs))
             der_romb = rombcoefs[0][0, :]
@@ -996,27 +1414,51 @@ class _Derivative(object):
 
 class _PartialDerivative(_Derivative):
 
-    def _partial_der(self, x00):
-        ''' Return partial derivatives
+    def _partial_der(self, x00, out=None, err_out=None, step_out=None):
+        ''' Return partial derivatives, error estimates and final steps
+
+        They are written to out, err_out and step_out, if given.
         '''
         x0 = np.atleast_1d(x00)
         nx = len(x0)
-        df, err, delta = np.zeros(nx), np.zeros(nx), np.zeros(nx)
+        df, err, delta = [self._out_array(array, (nx,))
+                          for array in (out, err_out, step_out)]
 
-        step_nom = [None, ] * nx if self.step_nom is None else self.step_nom
+        step_nom = self.step_nom
 
         fun = self._fun
-        self._x = np.asarray(x0, dtype=float)
+        self._x = self._work_array('x', (nx,))
+        self._x[...] = x0
+        if self._batch_elements:
+            df[...], err[...], delta[...] = self._derivative(fun, x0,
+                                                             step_nom)
+            return df, err, delta
         for i in range(nx):
             self._ix = i
-            df[i], err[i], delta[i] = self._derivative(fun, x0[i], step_nom[i])
+            step_nom_i = None if step_nom is None else step_nom[i]
+            df[i], err[i], delta[i] = self._derivative(fun, x0[i], step_nom_i)
             # err[i] = self.error_estimate
             # delta[i] = self.final_delta
         # self.error_estimate = err
         # self.final_delta = delta
         return df, err, delta
 
+    def _element_fun(self, fun):
+        return _PartialFun(self.fun, self._x)
+
+    @staticmethod
+    def _element_point(i, xi):
+        return i, xi
+
     def _fun(self, xi):
+        if self._use_scratch:
+            x, i = self._x, self._ix
+            x_i = x[i]
+            x[i] = xi
+            try:
+                return self._call_scratch(self.fun, x)
+            finally:
+                x[i] = x_i
         x = self._x.copy()
         x[self._ix] = xi
         return self.fun(x)
@@ -1026,6 +1468,10 @@ class Derivative(_Derivative):
     __doc__ = '''Estimate n'th derivative of fun at x0, with error estimate
 
     %s
+    If n is a sequence of derivative orders, e.g., n=[1, 2, 3, 4], all the
+    derivatives are computed from the same function evaluations. The rules of
+    each order are applied to the shared samples, and the derivatives, the
+    error_estimate and the final_delta are stacked along a new first axis.
 
     Examples
     --------
@@ -1057,6 +1503,14 @@ class Derivative(_Derivative):
      >>> np.abs(fd3([0,1])-dfun([0,1])) <= fd3.error_estimate
      array([ True,  True], dtype=bool)
 
+     # 1'st to 4'th derivative of exp(x), at x == 1, from one sample sweep
+
+     >>> fd4 = nd.Derivative(np.exp, n=[1, 2, 3, 4])
+     >>> np.allclose(fd4(1), np.exp(1))
+     True
+     >>> fd4.error_estimate.shape
+     (4, 1)
+
      See also
      --------
      Gradient,
@@ -1073,27 +1527,637 @@ class Derivative(_Derivative):
             fun = self.fun
             f = 1
         elif self.transform == 'exp':
-            fun = lambda x: np.exp(self.fun(x))
+            fun = self._exp_fun
             f = np.exp(-self.fun(x))
         elif self.transform == 'log':
-            fun = lambda x: np.log(np.abs(self.fun(x)))
+            fun = self._log_abs_fun
             f = self.fun(x)
         return fun, f
 
+    def _exp_fun(self, x):
+        return np.exp(self.fun(x))
+
+    def _log_abs_fun(self, x):
+        return np.log(np.abs(self.fun(x)))
+
+    def _prepare(self):
+        if np.ndim(self.n) > 0:
+            self._set_romb_qr()
+        else:
+            self._initialize()
+
     def derivative(self, x):
         ''' Return estimate of n'th derivative of fun at x
             using romberg extrapolation
         '''
-        self._initialize()
         x0 = np.atleast_1d(x)
         shape = x0.shape
         fun, f0 = self._get_transformed_fun(x0)
-        der, err, delta = self._derivative(fun, x0.ravel(), self.step_nom)
+        self._prepare()
+        if np.ndim(self.n) > 0:
+            der, err, delta = self._multi_order_derivative(fun, x0.ravel(),
+                                                           self.step_nom)
+            shape = der.shape[:1] + shape
+        else:
+            der, err, delta = self._derivative(fun, x0.ravel(), self.step_nom)
         self.error_estimate = err.reshape(shape) * f0
         self.final_delta = delta.reshape(shape)
         return der.reshape(shape) * f0
 
 
+class _MixedDerivative(_Derivative):
+    ''' Common methods for derivatives from tensor product stencils
+    '''
+
+    def _prepare(self):
+        self._set_romb_qr()
+
+    def _get_rule_1d(self, der_order):
+        ''' Return offsets and weights of 1-D rule for a unit step size
+
+        Member variables used
+        ---------------------
+        order
+        method
+        '''
+        method = self.method[0]
+        if method == 'c':
+            num_steps = (der_order + 1) // 2 + (self.order + 1) // 2 - 1
+            offsets = np.arange(-num_steps, num_steps + 1.0)
+        else:
+            sign = -1 if method == 'b' else 1
+            offsets = sign * np.arange(der_order + self.order, dtype=float)
+        return offsets, fd_weights(offsets, 0, der_order)
+
+    def _get_stencil(self, orders):
+        ''' Return tensor product stencil for derivatives of given orders
+
+        Returns
+        -------
+        offsets : array of shape (len(orders), num_points)
+            offsets of the stencil points in units of the steps.
+        weights : array of shape (num_points,)
+            weights of the stencil points. Points with zero weight are removed.
+        '''
+        rules = [self._get_rule_1d(der_order) for der_order in orders]
+        offsets = np.meshgrid(*[rule[0] for rule in rules], indexing='ij')
+        weights = np.meshgrid(*[rule[1] for rule in rules], indexing='ij')
+        offsets = np.vstack([offset.ravel() for offset in offsets])
+        weights = np.prod([weight.ravel() for weight in weights], axis=0)
+        nonzero = np.abs(weights) > 10 * _EPS * np.max(np.abs(weights))
+        return offsets[:, nonzero], weights[nonzero]
+
+    def _get_shared_stencil(self, nx, der_order):
+        ''' Return merged stencil of all derivatives of order der_order
+
+        Returns
+        -------
+        indices : list of tuples
+            the variables of each derivative, i.e., (i, j) is d^2/dx_i dx_j.
+        offsets : array of shape (nx, num_points)
+            the distinct points of the stencils in units of the steps.
+        rules : list of tuples
+            columns in offsets and weights of the stencil of each derivative.
+        '''
+        indices = list(combinations_with_replacement(range(nx), der_order))
+        all_offsets, all_weights = [], []
+        for index in indices:
+            orders = np.bincount(index, minlength=nx)
+            active = np.flatnonzero(orders)
+            offsets, weights = self._get_stencil(orders[active])
+            full_offsets = np.zeros((nx, weights.size))
+            full_offsets[active] = offsets
+            all_offsets.append(full_offsets)
+            all_weights.append(weights)
+        offsets, columns = np.unique(np.hstack(all_offsets), axis=1,
+                                     return_inverse=True)
+        columns = np.split(columns.ravel(),
+                           np.cumsum([w.size for w in all_weights])[:-1])
+        return indices, offsets, list(zip(columns, all_weights))
+
+    @staticmethod
+    def _scale_offsets(offsets, steps):
+        ''' Return stencil points for all steps
+
+        Column k * num_points + j holds stencil point j scaled with step k.
+        '''
+        num_vars = offsets.shape[0]
+        return (steps[:, :, np.newaxis] *
+                offsets[:, np.newaxis, :]).reshape(num_vars, -1)
+
+    def _get_step_matrix(self, x0, active):
+        ''' Return steps along the active variables and their step scale
+
+        The steps are step_nom[i] * delta for each active variable i, and the
+        number of steps is the same for all of them.
+
+        Member variables used
+        ---------------------
+        step_nom
+        '''
+        step_nom = self._get_step_nom(self.step_nom, x0)[active]
+        steps = [self._get_steps(step_nom_i) for step_nom_i in step_nom]
+        num_steps = min(len(h) for h in steps)
+        steps = np.array([h[:num_steps] for h in steps])
+        return steps, steps[0] / step_nom[0]
+
+    def _eval_points(self, fun, x0, active, points):
+        ''' Return fun evaluated at x0 + points on the active variables
+
+        The values are returned as an array of shape (num_points, nf), where
+        nf is the number of elements returned by fun.
+
+        Member variables used
+        ---------------------
+        vectorized
+        executor
+        '''
+        num_points = points.shape[1]
+        if self._vectorized:
+            x = np.tile(x0.reshape(-1, 1), (1, num_points))
+            x[active] += points
+            return np.reshape(fun(x), (-1, num_points)).T
+
+        def perturbed(k):
+            x = x0.copy()
+            x[active] = x0[active] + points[:, k]
+            return x
+        x = (perturbed(k) for k in range(num_points))
+        return np.array([np.ravel(fval) for fval in self._map(fun, x)],
+                        dtype=float)
+
+
+class PartialDerivative(_MixedDerivative):
+    __doc__ = ('''Estimate mixed partial derivative of fun, with error estimate
+    %s
+
+    PartialDerivative returns the partial derivative
+
+        d^N fun / (dx[0]^multi_index[0] * dx[1]^multi_index[1] * ...)
+
+    where N = sum(multi_index). Instead of nesting Derivative and Gradient
+    objects, which multiplies the number of function evaluations across the
+    levels, the 1-D rules for each variable are combined into one tensor
+    product stencil. All the stencil points are evaluated once for each step
+    in the step sequence, and the estimates are extrapolated jointly, so the
+    cost is the number of stencil points with nonzero weight times step_num.
+
+    Assumptions
+    -----------
+    fun : SCALAR analytical function to differentiate.
+        fun must be a function of the vector or array x.
+        If vectorized is True, fun must accept an array of shape (p, m)
+        holding m points of length p as columns and return m values. Then fun
+        is only called once.
+
+    x : vector location at which to differentiate fun
+        If x is an N x M array, then fun is assumed to be
+        a function of N*M variables.
+
+    final_delta is the step scale of the best estimate. The steps used along
+    x[i] are step_nom[i] * final_delta.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools as nd
+
+    # d^3 f / (dx dy^2) of f(x, y) = sin(x) * exp(2 * y) at (1, 0.5)
+
+    >>> fun = lambda xy: np.sin(xy[0]) * np.exp(2 * xy[1])
+    >>> pd = nd.PartialDerivative(fun, multi_index=(1, 2))
+    >>> val = pd([1, 0.5])
+    >>> np.allclose(val, 4 * np.cos(1) * np.exp(1))
+    True
+    >>> np.abs(val - 4 * np.cos(1) * np.exp(1)) <= pd.error_estimate
+    True
+
+    See also
+    --------
+    Derivative,
+    Gradient,
+    Hessian
+    ''' % _Derivative.__doc__.partition('\n')[2].replace(
+        'n : Integer, 1 or larger            (Default 1)\n'
+        '        defining derivative order.',
+        'multi_index : sequence of integers, 0 or larger\n'
+        '        defining derivative order with respect to each variable.'
+        ) if _Derivative.__doc__ else '')
+
+    def __init__(self, fun, multi_index, **kwds):
+        self.multi_index = multi_index
+        index = np.atleast_1d(multi_index)
+        if not (index.ndim == 1 and np.all(index == np.round(index)) and
+                np.all(index >= 0)):
+            raise ValueError('multi_index must be a sequence of integers, '
+                             '>= 0.')
+        super(PartialDerivative, self).__init__(fun, n=int(np.sum(index)),
+                                                **kwds)
+
+    def __call__(self, x):
+        return self.partial_derivative(x)
+
+    def partial_derivative(self, x):
+        ''' Return mixed partial derivative of fun at x
+
+        Member variables used
+        ---------------------
+        multi_index
+        step_nom
+        '''
+        x0 = np.atleast_1d(np.asarray(x, dtype=float)).ravel()
+        index = np.atleast_1d(self.multi_index).astype(int)
+        if index.size != x0.size:
+            raise ValueError('multi_index must have one element for each '
+                             'variable in x.')
+        self._set_romb_qr()
+        active = np.flatnonzero(index)
+        orders = index[active]
+        steps, delta = self._get_step_matrix(x0, active)
+        num_steps = steps.shape[1]
+
+        offsets, weights = self._get_stencil(orders)
+        num_points = weights.size
+        fval = self._eval_points(self.fun, x0, active,
+                                 self._scale_offsets(offsets, steps))
+        if fval.size != num_points * num_steps:
+            raise ValueError('fun did not return data of correct size ' +
+                             '(it must return a scalar for each point)')
+        fval = fval.reshape(num_steps, num_points)
+        der_init = np.dot(fval, weights) / np.prod(
+            steps ** orders[:, np.newaxis], axis=0)
+
+        der_romb, errors, h2 = self._romb_extrap(der_init, delta)
+        der, err, final_delta = self._best_der(der_romb, errors, h2)
+        self.error_estimate = err
+        self.final_delta = final_delta
+        return der
+
+
+class ThirdDerivative(_MixedDerivative):
+    __doc__ = ('''Estimate 3rd order partial derivatives, with error estimate
+    %s
+
+    The tensor of third order partial derivatives is symmetric, so only the
+    elements T[i, j, k] with i <= j <= k are computed. The tensor product
+    stencils of all these elements are merged, and every distinct point is
+    evaluated only once for each step in the step sequence. The estimates of
+    each element are extrapolated separately, which gives the error estimates.
+
+    The packed elements are ordered as
+    itertools.combinations_with_replacement(range(n), 3).
+
+    Assumptions
+    -----------
+    fun : SCALAR analytical function to differentiate.
+        fun must be a function of the vector or array x.
+        If vectorized is True, fun (or gradient or hessian) must accept an
+        array of shape (p, m) holding m points of length p as columns and
+        return an array of shape (nf, m), where nf is 1, p or p*p,
+        respectively.
+
+    x : vector location at which to differentiate fun
+        If x is an N x M array, then fun is assumed to be
+        a function of N*M variables.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools as nd
+
+    # f(x) = exp(a.x) has the third derivatives a[i]*a[j]*a[k]*f(x)
+
+    >>> a = np.array([1., 2.])
+    >>> fun = lambda x: np.exp(np.dot(a, x))
+    >>> Tfun = nd.ThirdDerivative(fun)
+    >>> t = Tfun([0, 0])
+    >>> t.shape
+    (2, 2, 2)
+    >>> np.allclose(t, np.einsum('i,j,k', a, a, a))
+    True
+
+    >>> grad = lambda x: a * fun(x)
+    >>> Tfun2 = nd.ThirdDerivative(fun, gradient=grad, packed=True)
+    >>> np.allclose(Tfun2([0, 0]), [1, 2, 4, 8])
+    True
+
+    See also
+    --------
+    Hessian,
+    PartialDerivative
+    ''' % _Derivative.__doc__.partition('\n')[2].replace(
+        'Integer, 1 or larger            (Default 1)', '3').replace(
+        'defining derivative order.',
+        'Derivative order is always 3.').replace(
+        '(default).\n', '''(default).
+    gradient : callable, optional
+        gradient of fun. If given, the tensor is computed from second order
+        differences of the gradient.
+    hessian : callable, optional
+        Hessian matrix of fun. If given, the tensor is computed from first
+        order differences of the Hessian. hessian takes precedence over
+        gradient, and fun is not called if either of them is given.
+    packed : Bool
+        True  - return the n*(n+1)*(n+2)/6 unique elements of the tensor.
+        False - return the full n x n x n tensor (default).
+''') if _Derivative.__doc__ else '')
+
+    def __init__(self, fun, gradient=None, hessian=None, packed=False,
+                 **kwds):
+        self.gradient = gradient
+        self.hessian = hessian
+        self.packed = packed
+        super(ThirdDerivative, self).__init__(fun, n=3, **kwds)
+
+    def __call__(self, x):
+        return self.third_derivative(x)
+
+    def _get_callback(self):
+        ''' Return function to differentiate and its derivative order
+        '''
+        if self.hessian is not None:
+            return self.hessian, 2
+        if self.gradient is not None:
+            return self.gradient, 1
+        return self.fun, 0
+
+    def third_derivative(self, x):
+        ''' Return tensor of 3rd order partial derivatives of fun at x
+
+        Member variables used
+        ---------------------
+        gradient
+        hessian
+        packed
+        '''
+        x0 = np.atleast_1d(np.asarray(x, dtype=float)).ravel()
+        nx = x0.size
+        fun, fun_order = self._get_callback()
+        der_order = 3 - fun_order
+        self.n = der_order
+        self._set_romb_qr()
+        active = np.arange(nx)
+        steps, delta = self._get_step_matrix(x0, active)
+        num_steps = steps.shape[1]
+
+        indices, offsets, rules = self._get_shared_stencil(nx, der_order)
+        num_points = offsets.shape[1]
+        fval = self._eval_points(fun, x0, active,
+                                 self._scale_offsets(offsets, steps))
+        if fval.shape[1] != nx ** fun_order:
+            raise ValueError('%s did not return data of correct size' %
+                             ('fun', 'gradient', 'hessian')[fun_order])
+        fval = fval.reshape(num_steps, num_points, -1)
+
+        elements = list(combinations_with_replacement(range(nx), 3))
+        position = dict((element, k) for k, element in enumerate(elements))
+        der, err, final_delta = (np.zeros(len(elements)) for _i in range(3))
+        for index, (columns, weights) in zip(indices, rules):
+            orders = np.bincount(index, minlength=nx)
+            scale = np.prod(steps ** orders[:, np.newaxis], axis=0)
+            for comp in combinations_with_replacement(range(index[0] + 1),
+                                                      fun_order):
+                # each element i <= j <= k is computed from one derivative
+                # of one component of fun, gradient or hessian
+                comp_ix = np.ravel_multi_index(comp, (nx,) * fun_order
+                                               ) if comp else 0
+                der_init = np.dot(weights, fval[:, columns, comp_ix].T) / scale
+                der_romb, errors, h2 = self._romb_extrap(der_init, delta)
+                k = position[comp + index]
+                der[k], err[k], final_delta[k] = self._best_der(der_romb,
+                                                                errors, h2)
+        if not self.packed:
+            der, err, final_delta = (self._unpack(val, elements, nx)
+                                     for val in (der, err, final_delta))
+        self.error_estimate = err
+        self.final_delta = final_delta
+        return der
+
+    @staticmethod
+    def _unpack(packed, elements, nx):
+        ''' Return full symmetric tensor from its unique elements
+        '''
+        tensor = np.zeros((nx, nx, nx))
+        for value, element in zip(packed, elements):
+            for perm in permutations(element):
+                tensor[perm] = value
+        return tensor
+
+
+class Laplacian(_MixedDerivative):
+    __doc__ = ('''Estimate Laplacian (trace of Hessian), with error estimate
+    %s
+
+    The Laplacian is the sum of the diagonal elements of the Hessian matrix.
+    Instead of summing Hessdiag, which runs one step sweep per variable and
+    evaluates fun(x) in each of them, fun(x) is evaluated once, the 2n points
+    fun(x +- h * e_i) are evaluated for each step h, and the second
+    differences are summed before the Romberg extrapolation. Thus only one
+    extrapolation is done and the error estimate is for the sum.
+
+    For large n, num_probes random directions v with elements +-1 can be used
+    instead of the n unit vectors. Then the trace is estimated by the mean of
+    the directional second derivatives v' * H * v (Hutchinson's estimator).
+    The cost is independent of n, and the standard error of the mean is
+    added to the error estimate.
+
+    Assumptions
+    -----------
+    fun : SCALAR analytical function to differentiate.
+        fun must be a function of the vector x.
+        If vectorized is True, fun must accept an array of shape (n, m)
+        holding m points of length n as columns and return m values. Then fun
+        is only called twice.
+
+    x : vector location of length n at which to differentiate fun, or an
+        array of shape (n, m) holding m locations as columns.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools as nd
+    >>> fun = lambda x: np.sum(x ** 3)
+    >>> Lfun = nd.Laplacian(fun)
+    >>> np.allclose(Lfun([1, 2, 3]), 36)
+    True
+
+    # Laplacian at 4 locations in one go
+
+    >>> fun = lambda x: np.sum(x ** 3, axis=0)
+    >>> Lfun = nd.Laplacian(fun, vectorized=True)
+    >>> x = np.arange(12.).reshape(3, 4)
+    >>> np.allclose(Lfun(x), 6 * np.sum(x, axis=0))
+    True
+
+    # Hutchinson's estimator with 500 random directions
+
+    >>> fun = lambda x: np.sum(x ** 2) + x[0] * x[1]
+    >>> Lfun = nd.Laplacian(fun, num_probes=500, random_state=0)
+    >>> np.abs(Lfun(np.ones(100)) - 200) <= 3 * Lfun.error_estimate
+    True
+
+    See also
+    --------
+    Hessdiag,
+    Hessian
+    ''' % _Derivative.__doc__.partition('\n')[2].replace(
+        'Integer, 1 or larger            (Default 1)', '2').replace(
+        'defining derivative order.',
+        'Derivative order is always 2.').replace(
+        '(default).\n', '''(default).
+    num_probes : integer, optional
+        number of random directions used by Hutchinson's estimator.
+        None uses the unit vectors, i.e., computes the exact trace (default).
+    random_state : integer or numpy.random.RandomState, optional
+        seed or generator of the random directions.
+''') if _Derivative.__doc__ else '')
+
+    def __init__(self, fun, num_probes=None, random_state=None, **kwds):
+        self.num_probes = num_probes
+        self.random_state = random_state
+        super(Laplacian, self).__init__(fun, n=2, **kwds)
+
+    def __call__(self, x):
+        return self.laplacian(x)
+
+    def _get_directions(self, nx):
+        ''' Return unit vectors or random directions as columns
+
+        Member variables used
+        ---------------------
+        num_probes
+        random_state
+        '''
+        if self.num_probes is None:
+            return np.eye(nx)
+        random_state = self.random_state
+        if not isinstance(random_state, np.random.RandomState):
+            random_state = np.random.RandomState(random_state)
+        return 2.0 * random_state.randint(0, 2, (nx, self.num_probes)) - 1
+
+    def _eval_fun(self, x):
+        ''' Return fun evaluated at the columns of x
+
+        Member variables used
+        ---------------------
+        fun
+        vectorized
+        executor
+        '''
+        if self._vectorized:
+            return self._check_size(np.ravel(self.fun(x)), x.shape[1])
+        return self._eval_point_values(x.T, x.shape[1])
+
+    def _eval_point_values(self, points, num_points):
+        ''' Return fun evaluated at each of the num_points points one by one
+
+        Member variables used
+        ---------------------
+        fun
+        executor
+        '''
+        fval = np.array(self._map(self.fun, points), dtype=float).ravel()
+        return self._check_size(fval, num_points)
+
+    @staticmethod
+    def _check_size(fval, num_points):
+        if fval.size != num_points:
+            raise ValueError('fun did not return data of correct size ' +
+                             '(it must return a scalar for each point)')
+        return fval
+
+    def _directional_diffs(self, x0, directions, steps):
+        ''' Return second difference estimates along each direction
+
+        Parameters
+        ----------
+        x0 : array of shape (nx, m)
+        directions : array of shape (nx, nd)
+        steps : array of shape (nd, m, num_steps) or (1, m, num_steps)
+
+        Returns
+        -------
+        der_init : array of shape (nd, m, num_steps)
+            estimates of v' * H * v for each direction v, location and step.
+        '''
+        offsets, weights = self._get_rule_1d(2)
+        center = offsets == 0
+        offsets, weights, w_center = (offsets[~center], weights[~center],
+                                      np.sum(weights[center]))
+        f_x0 = self._eval_fun(x0)
+        nx, num_dirs = directions.shape
+        shape = (num_dirs,) + steps.shape[1:] + (offsets.size,)
+        # perturbations[d, p, k, j] = offsets[j] * steps[d, p, k]
+        perturbations = np.broadcast_to(steps[..., np.newaxis] * offsets,
+                                        shape)
+        if self._vectorized:
+            x = (x0[:, np.newaxis, :, np.newaxis, np.newaxis] +
+                 directions[:, :, np.newaxis, np.newaxis, np.newaxis] *
+                 perturbations)
+            fval = self._eval_fun(x.reshape(nx, -1)).reshape(shape)
+        else:
+            # the points are generated on demand, so only the function values
+            # are stored and not all the nx * nd * m * num_steps * 2 points.
+            points = (x0[:, p] + directions[:, d] * perturbations[d, p, k, j]
+                      for d, p, k, j in np.ndindex(*shape))
+            fval = self._eval_point_values(points, perturbations.size)
+            fval = fval.reshape(shape)
+        der_init = np.dot(fval, weights) + w_center * f_x0[:, np.newaxis]
+        return der_init / steps ** 2
+
+    def laplacian(self, x):
+        ''' Return Laplacian of fun at x
+
+        Member variables used
+        ---------------------
+        num_probes
+        step_nom
+        '''
+        x = np.asarray(x, dtype=float)
+        x0 = x.reshape(x.shape[0], -1) if x.ndim > 1 else x.reshape(-1, 1)
+        nx, num_locations = x0.shape
+        self._set_romb_qr()
+        step_nom = self._get_step_nom(self.step_nom, x0)
+        num_steps = len(self._get_steps(np.min(step_nom)))
+        delta = self._make_exact(self._delta[:num_steps])
+        directions = self._get_directions(nx)
+        if self.num_probes is None:
+            steps = step_nom[:, :, np.newaxis] * delta
+        else:
+            mean_step_nom = np.mean(step_nom, axis=0)
+            steps = mean_step_nom[np.newaxis, :, np.newaxis] * delta
+        steps = self._make_exact(steps)
+
+        der_init = self._directional_diffs(x0, directions, steps)
+        if self.num_probes is None:
+            der_init_sum = np.sum(der_init, axis=0)
+        else:
+            der_init_sum = np.mean(der_init, axis=0)
+
+        der, err, final_delta = (np.zeros(num_locations) for _i in range(3))
+        for p in range(num_locations):
+            der_romb, errors, h2 = self._romb_extrap(der_init_sum[p], delta)
+            der[p], err[p], final_delta[p] = self._best_der(der_romb,
+                                                            errors, h2)
+            if self.num_probes is not None:
+                err[p] += self._sampling_error(der_init[:, p], delta)
+
+        if x.ndim <= 1:
+            der, err, final_delta = der[0], err[0], final_delta[0]
+        self.error_estimate = err
+        self.final_delta = final_delta
+        return der
+
+    def _sampling_error(self, der_init, delta):
+        ''' Return standard error of the mean of the directional derivatives
+        '''
+        probes = np.zeros(len(der_init))
+        for r, der_init_r in enumerate(der_init):
+            der_romb, errors, h2 = self._romb_extrap(der_init_r, delta)
+            probes[r] = self._best_der(der_romb, errors, h2)[0]
+        return np.std(probes, ddof=1) / np.sqrt(len(probes))
+
+
 class Jacobian(_Derivative):
     __doc__ = ('''Estimate Jacobian matrix, with error estimate
     %s
@@ -1111,6 +2175,13 @@ class Jacobian(_Derivative):
         If x0 is an N x M array, then fun is assumed to be
         a function of N*M variables.
 
+    If vectorized is True, fun must accept an array of shape (p, m) holding
+    m points of length p as columns and return an array of shape (n, m).
+    Then fun is only called once per step sequence for each variable.
+
+    The 'forward' and 'backward' methods reuse fun(x0), and thus only need
+    half the function evaluations of the 'central' method.
+
     Examples
     --------
     >>> import numpy as np
@@ -1154,14 +2225,132 @@ class Jacobian(_Derivative):
     Hessdiag,
     Hessian
     ''' % _Derivative.__doc__.partition('\n')[2].replace(
-        'Integer from 1 to 4             (Default 1)', '1').replace(
+        'Integer, 1 or larger            (Default 1)', '1').replace(
         'defining derivative order.',
         'Derivative order is always 1.') if _Derivative.__doc__ else '')
 
-    def __call__(self, x):
-        return self.jacobian(x)
+    def __call__(self, x, out=None, err_out=None, step_out=None):
+        return self.jacobian(x, out, err_out, step_out)
+
+    def _eval_steps(self, fun, x0, i, steps, nf, out=None, values=None):
+        ''' Return fun evaluated at x0 + steps[k] * e_i, one column per step
+
+        The values are written to out, if given. If values is given, it is
+        an iterator of the values already evaluated by _map_columns, and the
+        next steps.size values are taken from it.
+
+        Member variables used
+        ---------------------
+        vectorized
+        executor
+        inplace
+        '''
+        if self._vectorized:
+            x = np.tile(x0.reshape(-1, 1), (1, steps.size))
+            x[i] += steps
+            fval = np.reshape(fun(x), (nf, -1))
+            if out is None:
+                return fval
+            out[...] = fval
+            return out
+
+        def perturbed(step):
+            x = x0.copy()
+            x[i] = x0[i] + step
+            return x
+        if values is not None:
+            values = islice(values, steps.size)
+        elif self._use_scratch:
+            # each value is copied to fval before the next point is made
+            x = self._perturb_scratch(self._x, i, x0[i] + steps)
+            values = (fun(xk) for xk in x)
+        else:
+            values = self._imap(fun, (perturbed(step) for step in steps))
+        fval = np.zeros((nf, steps.size)) if out is None else out
+        for k in range(steps.size):
+            # the value is freed before the next one is evaluated
+            fval[:, k] = np.ravel(next(values))
+        return fval
+
+    def _map_columns(self, fun, x0, steps):
+        ''' Return iterator of fun evaluated at the points of all columns
+
+        The points x0 + sign * steps[i][k] * e_i of all the columns i are
+        given to one map, so an executor can evaluate all of them
+        concurrently. The values are in the order _jacobian_diff uses them.
+        '''
+        signs = dict(c=(1, -1), f=(1,), b=(-1,))[self.method[0]]
+
+        def points():
+            for i, h in enumerate(steps):
+                for sign in signs:
+                    for step in sign * h:
+                        x = x0.copy()
+                        x[i] = x0[i] + step
+                        yield x
+        return iter(self._map(fun, points()))
+
+    def _jacobian_diff(self, fun, f0, x0, i, h, work=None, values=None):
+        ''' Return differences of fun along x[i] for each step in h
+
+        The one sided methods reuse f0 = fun(x0), so they only need one
+        evaluation per step. The differences are computed in place in the
+        array work of shape (2, f0.size, num_steps >= h.size), if given.
+        values is the iterator of the values made by _map_columns, if any.
+
+        Member variables used
+        ---------------------
+        method
+        '''
+        nf = f0.size
+        if work is None:
+            work = np.empty((2, nf, h.size))
+        fval = work[0, :, :h.size]
+        method = self.method[0]
+        if method == 'c':
+            fdel = self._eval_steps(fun, x0, i, h, nf, fval, values)
+            fdel -= self._eval_steps(fun, x0, i, -h, nf, work[1, :, :h.size],
+                                     values)
+            fdel *= 0.5
+            return fdel
+        elif method == 'f':
+            fdel = self._eval_steps(fun, x0, i, h, nf, fval, values)
+        else:
+            fdel = self._eval_steps(fun, x0, i, -h, nf, fval, values)
+        fdel -= f0[:, np.newaxis]
+        return fdel
+
+    def _apply_fd_rule(self, fdel, h, work=None):
+        ''' Return initial derivative estimates from the differences in fdel
+
+        Same as _fder, but applied to all rows of fdel at once. If given, the
+        array work of shape (2, >= fdel.size) holds the estimates and the
+        divisors, because numpy allocates a buffer for broadcast operands.
+        '''
+        fd_rule = np.asarray(self._fd_rule).ravel()
+        n_fdr = fd_rule.size
+        ne = max(h.size + 1 - n_fdr, 1)
+        nf = fdel.shape[0]
+        if ne + n_fdr - 1 <= fdel.shape[1]:
+            # fdel[:, i + j] as a view of the same memory
+            windows = as_strided(fdel, (nf, ne, n_fdr),
+                                 fdel.strides + fdel.strides[1:])
+        else:
+            [i, j] = np.ogrid[0:ne, 0:n_fdr]
+            windows = fdel[:, i + j]
+        if work is None:
+            return np.matmul(windows, fd_rule) / h[:ne] ** self.n, h[:ne]
+        der_init, divisors = work[:, :nf * ne].reshape(2, nf, ne)
+        np.matmul(windows, fd_rule, out=der_init)
+        np.copyto(divisors, h[:ne] ** self.n)
+        der_init /= divisors
+        return der_init, h[:ne]
+
+    def _prepare(self):
+        self.n = 1
+        self._initialize()
 
-    def jacobian(self, x):
+    def jacobian(self, x, out=None, err_out=None, step_out=None):
         '''
         Return Jacobian matrix of a vector valued function of n variables
 
@@ -1172,6 +2361,9 @@ class Jacobian(_Derivative):
             location at which to differentiate fun.
             If x is an nxm array, then fun is assumed to be
             a function of n*m variables.
+        out, err_out, step_out : arrays, optional
+            of shape (n, p) to write the Jacobian, the error estimates and
+            the final steps to, instead of new arrays.
 
         Member variable used
         --------------------
@@ -1196,45 +2388,42 @@ class Jacobian(_Derivative):
         Hessian,
         Hessdiag
         '''
-        self.n = 1
         fun = self.fun
-        self._initialize()
+        self._prepare()
 
-        zeros = np.zeros
-        newaxis = np.newaxis
-        x0 = np.atleast_1d(x)
+        x0 = np.atleast_1d(np.asarray(x, dtype=float))
         nx = x0.size
 
-        f0 = fun(x0)
-        f0 = f0.ravel()
+        f0 = self._work_copy('f0', np.ravel(fun(x0)))
         n = f0.size
 
-        jac = zeros((n, nx))
+        jac, err, delta = [self._out_array(array, (n, nx))
+                           for array in (out, err_out, step_out)]
         if n == 0:
-            self.error_estimate = jac
+            self.error_estimate = err
             return jac
 
         step_nom = self._get_step_nom(self.step_nom, x0)
-
-        err, delta = jac.copy(), jac.copy()
+        if self._use_scratch:
+            self._x = self._work_array('x', (nx,))
+            self._x[...] = x0
+
+        # the differences of all columns are computed in the same array
+        work = self._work_array('jacobian', (4, n, self._delta.size))
+        steps = [self._get_steps(step_nom[i]) for i in range(nx)]
+        values = None
+        if self._batch_elements:
+            values = self._map_columns(fun, x0, steps)
         for i in range(nx):
-            x0_i = x0[i]
-            h = self._get_steps(step_nom[i])
-            nsteps = h.size
-            # evaluate at each step, centered around x0_i
-            # difference to give a second order estimate
-            fdel = zeros((n, nsteps))
-            xp, xm = x0.copy(), x0.copy()
-            for j in range(nsteps):
-                xp[i], xm[i] = x0_i + h[j], x0_i - h[j]
-                fdif = fun(xp) - fun(xm)
-                fdel[:, j] = 0.5 * fdif.ravel()
-            derest = fdel / h[newaxis, :]
+            h = steps[i]
+            fdel = self._jacobian_diff(fun, f0, x0, i, h, work, values)
+            derest, h1 = self._apply_fd_rule(fdel, h,
+                                             work[2:].reshape(2, -1))
 
             for j in range(n):
-                der_romb, errors, h1 = self._romb_extrap(derest[j, :], h)
+                der_romb, errors, h2 = self._romb_extrap(derest[j, :], h1)
                 jac[j, i], err[j, i], delta[j, i] = self._best_der(der_romb,
-                                                                   errors, h1)
+                                                                   errors, h2)
 
         self.final_delta = delta
         self.error_estimate = err
@@ -1289,22 +2478,30 @@ class Gradient(_PartialDerivative):
     --------
     Derivative, Hessdiag, Hessian, Jacobian
     ''' % _Derivative.__doc__.partition('\n')[2].replace(
-        'Integer from 1 to 4             (Default 1)', '1').replace(
+        'Integer, 1 or larger            (Default 1)', '1').replace(
         'defining derivative order.',
         'Derivative order is always 1.') if _Derivative.__doc__ else '')
 
-    def __call__(self, x):
-        return self.gradient(x)
+    def __call__(self, x, out=None, err_out=None, step_out=None):
+        return self.gradient(x, out, err_out, step_out)
+
+    def _prepare(self):
+        self.n = 1
+        if self.vectorized != 'auto':
+            self.vectorized = False
+        self._initialize()
 
-    def gradient(self, x):
+    def gradient(self, x, out=None, err_out=None, step_out=None):
         '''Returns gradient
 
+         The gradient, the error estimates and the final steps are written to
+         the arrays out, err_out and step_out of shape (n,), if given.
+
          See also derivative, hessian, jacobian
         '''
-        self.n = 1
-        self.vectorized = False
-        self._initialize()
-        pder, self.error_estimate, self.final_delta = self._partial_der(x)
+        self._prepare()
+        pder, self.error_estimate, self.final_delta = self._partial_der(
+            x, out, err_out, step_out)
         return pder
 
 
@@ -1348,22 +2545,30 @@ class Hessdiag(_PartialDerivative):
     --------
     Gradient, Derivative, Hessian, Jacobian
     ''' % _Derivative.__doc__.partition('\n')[2].replace(
-        'Integer from 1 to 4             (Default 1)', '2').replace(
+        'Integer, 1 or larger            (Default 1)', '2').replace(
         'defining derivative order.',
         'Derivative order is always 2.') if _Derivative.__doc__ else '')
 
-    def __call__(self, x):
-        return self.hessdiag(x)
+    def __call__(self, x, out=None, err_out=None, step_out=None):
+        return self.hessdiag(x, out, err_out, step_out)
 
-    def hessdiag(self, x):
+    def _prepare(self):
+        self.n = 2
+        if self.vectorized != 'auto':
+            self.vectorized = False
+        self._initialize()
+
+    def hessdiag(self, x, out=None, err_out=None, step_out=None):
         ''' Diagonal elements of Hessian matrix
 
+         The diagonal, the error estimates and the final steps are written to
+         the arrays out, err_out and step_out of shape (n,), if given.
+
          See also derivative, gradient, hessian, jacobian
         '''
-        self.n = 2
-        self.vectorized = False
-        self._initialize()
-        dder, self.error_estimate, self.final_delta = self._partial_der(x)
+        self._prepare()
+        dder, self.error_estimate, self.final_delta = self._partial_der(
+            x, out, err_out, step_out)
         return dder
 
 
@@ -1435,12 +2640,12 @@ class Hessian(Hessdiag):
     Hessdiag,
     Jacobian
     ''' % _Derivative.__doc__.partition('\n')[2].replace(
-        'Integer from 1 to 4             (Default 1)', '2').replace(
+        'Integer, 1 or larger            (Default 1)', '2').replace(
         'defining derivative order.',
         'Derivative order is always 2.') if _Derivative.__doc__ else '')
 
-    def __call__(self, x):
-        return self.hessian(x)
+    def __call__(self, x, out=None, err_out=None, step_out=None):
+        return self.hessian(x, out, err_out, step_out)
 
     def _get_step_max(self):
         # Decide on intelligent step sizes for the mixed partials
@@ -1453,50 +2658,280 @@ class Hessian(Hessdiag):
         stepmax = best_step_size / deltas[num_steps // 2]
         return stepmax, deltas
 
-    def hessian(self, x):
+    def _prepare(self):
+        self.method = 'central'
+        super(Hessian, self)._prepare()
+
+    @staticmethod
+    def _diag(vec, out):
+        ''' Return diagonal matrix of vec, written to out if given '''
+        if out is None:
+            return np.diag(vec)
+        out.fill(0.0)
+        np.fill_diagonal(out, vec)
+        return out
+
+    def hessian(self, x, out=None, err_out=None, step_out=None):
         '''Hessian matrix i.e., array of 2nd order partial derivatives
 
+         The Hessian and the error estimates are written to the arrays out and
+         err_out of shape (n, n), if given, and the final steps of the
+         diagonal elements to the array step_out of shape (n,).
+
          See also derivative, gradient, hessdiag, jacobian
         '''
         x0 = np.atleast_1d(x)
         nx = len(x0)
         self.method = 'central'
+        for array in (out, err_out):
+            if array is not None:
+                self._out_array(array, (nx, nx))
 
-        hess = self.hessdiag(x0)
+        hess = self.hessdiag(x0, self._work_array('diag', (nx,)),
+                             self._work_array('diag_err', (nx,)), step_out)
         err = self.error_estimate
 
-        hess, err = np.diag(hess), np.diag(err)
+        hess, err = self._diag(hess, out), self._diag(err, err_out)
         if nx < 2:
             return hess  # the hessian matrix is 1x1. all done
 
         stepmax, dfac = self._get_step_max()
         ndel = dfac.size
-        fun = self.fun
-        zeros = np.zeros
-        for i in range(1, nx):
-            for j in range(i):
-                dij, step = zeros(ndel), zeros(nx)
+        signs = np.array([[1, 1], [-1, -1], [1, -1], [-1, 1]])
+
+        def pairs():
+            for i in range(1, nx):
+                for j in range(i):
+                    yield i, j
+
+        def scratch_points():
+            # same points as mixed_points, made by setting x[[i, j]] only
+            x = self._work_array('x', (nx,))
+            x[...] = x0
+            for i, j in pairs():
+                hij = stepmax[[i, j]] * dfac[:, np.newaxis]
+                values = x0[[i, j]] + signs * hij[:, np.newaxis]
+                for point in self._perturb_scratch(x, [i, j],
+                                                   values.reshape(-1, 2)):
+                    yield point
+
+        def mixed_points():
+            for i, j in pairs():
+                step = np.zeros(nx)
                 step[[i, j]] = stepmax[[i, j]]
                 for k in range(ndel):
-                    x1 = x0 + step * dfac[k]
-                    x2 = x0 - step * dfac[k]
+                    yield x0 + step * dfac[k]
+                    yield x0 - step * dfac[k]
                     step[j] = -step[j]
-                    x3 = x0 + step * dfac[k]
+                    yield x0 + step * dfac[k]
                     step = -step
-                    x4 = x0 + step * dfac[k]
+                    yield x0 + step * dfac[k]
                     step[i] = -step[i]
-                    dij[k] = fun(x1) + fun(x2) - fun(x3) - fun(x4)
-                h2 = stepmax[[i, j]].prod() * (dfac ** 2)
-                dij = dij / (4 * h2)
-
-                hess_romb, errors, h = self._romb_extrap(dij, np.sqrt(h2))
-                hess[i, j], err[i, j], h = self._best_der(hess_romb, errors, h)
-                hess[j, i], err[j, i] = hess[i, j], err[i, j]
+        # all the mixed partials are sampled in one sweep. The points are
+        # generated on demand and the values of each pair are used as they
+        # come, so only the values of one pair are stored.
+        if self._use_scratch:
+            fval = (self._call_scratch(self.fun, x) for x in scratch_points())
+        else:
+            fval = self._imap(self.fun, mixed_points())
+        fij = self._work_array('mixed', (ndel, 4))
+        dij = self._work_array('mixed_diff', (ndel,))
+        for i, j in pairs():
+            for m, value in zip(range(fij.size), fval):
+                fij.flat[m] = value
+            np.add(fij[:, 0], fij[:, 1], out=dij)
+            dij -= fij[:, 2]
+            dij -= fij[:, 3]
+            h2 = stepmax[[i, j]].prod() * (dfac ** 2)
+            dij /= 4 * h2
+
+            hess_romb, errors, h = self._romb_extrap(dij, np.sqrt(h2))
+            hess[i, j], err[i, j], h = self._best_der(hess_romb, errors, h)
+            hess[j, i], err[j, i] = hess[i, j], err[i, j]
 
         self.error_estimate = err
         return hess
 
 
+class DerivativePlan(object):
+    '''
+    Derivative object frozen for repeated calls at points of one shape
+
+    A plan is made by the plan method of the derivative classes, e.g.,
+    plan = Gradient(fun).plan(shape), similar to the plans of FFTW. The
+    differentiation rules and the Romberg extrapolation matrices (with the
+    pseudo inverse used by the error estimate) are computed once when the
+    plan is made, so a call of the plan only evaluates fun, takes the
+    differences and extrapolates.
+    Output arrays given to the call, e.g., plan(x, out, err_out, step_out)
+    of a Jacobian plan, are passed on. The work arrays of a Jacobian plan are
+    kept, so after the first call only the values of fun and the small
+    arrays of the extrapolation of each element are allocated.
+
+    Parameters
+    ----------
+    derivative : derivative object
+        frozen copy of the derivative object.
+    shape : int or tuple of ints
+        shape of the points x the plan is called with.
+
+    Member variables
+    ----------------
+    error_estimate, final_delta :
+        of the last call, as for the derivative object.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools as nd
+    >>> plan = nd.Hessian(lambda x: np.sum(x ** 3)).plan(3)
+    >>> np.allclose(plan([1., 2., 3.]), np.diag([6., 12., 18.]))
+    True
+    >>> np.allclose(plan([3., 2., 1.]), np.diag([18., 12., 6.]))
+    True
+    '''
+
+    def __init__(self, derivative, shape):
+        self.derivative = derivative
+        self.shape = (shape,) if np.isscalar(shape) else tuple(shape)
+
+    def _check_shape(self, x):
+        if np.shape(x) != self.shape:
+            raise ValueError('x must have shape {} as given to plan, '
+                             'not {}'.format(self.shape, np.shape(x)))
+
+    @property
+    def error_estimate(self):
+        return self.derivative.error_estimate
+
+    @property
+    def final_delta(self):
+        return self.derivative.final_delta
+
+    def __call__(self, x, *args, **kwds):
+        self._check_shape(x)
+        return self.derivative(x, *args, **kwds)
+
+    def evaluate(self, x):
+        ''' Return result record of the derivative at x, see
+        _Derivative.evaluate, so the plan can be shared by threads
+        '''
+        self._check_shape(x)
+        return self.derivative.evaluate(x)
+
+
+class _ResidualProduct(object):
+    ''' Picklable function returning dot(fun(x0), fun(x)) '''
+
+    def __init__(self, fun, x0):
+        self.fun = fun
+        self.res0 = np.ravel(fun(x0))
+
+    def __call__(self, x):
+        return np.dot(self.res0, np.ravel(self.fun(x)))
+
+
+class GaussNewtonHessian(Jacobian):
+    __doc__ = ('''Estimate Gauss-Newton approximation to Hessian of sum(fun**2)
+    %s
+    The Hessian of the least squares objective sum(fun(x)**2) is
+
+        H = 2 * J' * J + 2 * sum(fun_k(x) * d^2 fun_k(x) / dx^2)
+
+    where J is the Jacobian of the residuals fun. The second term is small
+    when the residuals are small or nearly linear, and the Gauss-Newton
+    approximation 2 * J' * J only needs the O(n) function evaluations of
+    one Jacobian, while the Hessian needs O(n^2). The error estimates of J
+    are propagated to the error estimate of 2 * J' * J.
+
+    If second_order is True, the second term is computed as the Hessian of
+    dot(fun(x0), fun(x)) and added to the result. It is also stored in the
+    member variable second_order_term, so its size can be compared with
+    2 * J' * J to check how well the approximation holds.
+
+    Assumptions
+    -----------
+    fun : (vector valued)
+        analytical function returning the residuals.
+        fun must be a function of the vector or array x0.
+
+    x0 : vector location at which to differentiate fun
+        If x0 is an N x M array, then fun is assumed to be
+        a function of N*M variables.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools as nd
+
+    #(nonlinear least squares)
+
+    >>> xdata = np.arange(0, 1, 0.1)
+    >>> ydata = 1 + 2 * np.exp(0.75 * xdata)
+    >>> fun = lambda c: c[0] + c[1] * np.exp(c[2] * xdata) - ydata
+    >>> Hfun = nd.GaussNewtonHessian(fun)
+    >>> h = Hfun([1., 2., 0.75])
+    >>> jac = nd.Jacobian(fun)([1., 2., 0.75])
+    >>> np.allclose(h, 2 * np.dot(jac.T, jac))
+    True
+
+    # Away from the solution the second order term is needed
+
+    >>> Hfun2 = nd.GaussNewtonHessian(fun, second_order=True)
+    >>> h2 = Hfun2([1., 2.5, 0.5])
+    >>> h3 = nd.Hessian(lambda c: np.sum(fun(c) ** 2))([1., 2.5, 0.5])
+    >>> np.allclose(h2, h3)
+    True
+
+    See also
+    --------
+    Hessian,
+    Jacobian
+    ''' % _Derivative.__doc__.partition('\n')[2].replace(
+        'Integer, 1 or larger            (Default 1)', '1').replace(
+        'defining derivative order.',
+        'Derivative order is always 1.').replace(
+        '(default).\n', '''(default).
+    second_order : Bool
+        True  - add the second order term of the Hessian.
+        False - return the Gauss-Newton approximation only (default).
+''') if _Derivative.__doc__ else '')
+
+    def __init__(self, fun, second_order=False, **kwds):
+        self.second_order = second_order
+        super(GaussNewtonHessian, self).__init__(fun, **kwds)
+        self.second_order_term = None
+
+    def __call__(self, x):
+        return self.gauss_newton_hessian(x)
+
+    def gauss_newton_hessian(self, x):
+        ''' Return Gauss-Newton approximation to Hessian of sum(fun(x)**2)
+
+        Member variables used
+        ---------------------
+        fun
+        second_order
+        '''
+        x0 = np.atleast_1d(np.asarray(x, dtype=float))
+        jac = self.jacobian(x0)
+        jac_err = self.error_estimate
+        hess = 2 * np.dot(jac.T, jac)
+        abs_jac = np.abs(jac)
+        err = 2 * (np.dot(abs_jac.T, jac_err) + np.dot(jac_err.T, abs_jac))
+        self.second_order_term = None
+        if self.second_order:
+            hess_fun = Hessian(_ResidualProduct(self.fun, x0),
+                               romberg_terms=self.romberg_terms,
+                               step_ratio=self.step_ratio,
+                               executor=self.executor, inplace=self.inplace)
+            self.second_order_term = 2 * hess_fun(x0)
+            hess = hess + self.second_order_term
+            err = err + 2 * hess_fun.error_estimate
+        self.error_estimate = err + _EPS * np.abs(hess)
+        return hess
+
+
 def _example(x=0.0001, fun_name='inv', n=1, method='central', step_max=100,
              step_ratio=2, step_num=30, romberg_terms=2, use_dea=True,
              transform=None):
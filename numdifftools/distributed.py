@@ -0,0 +1,343 @@
+"""Evaluation of functions by worker processes on several machines over TCP
+
+Author : pbrod
+License : BSD
+Notes
+-----
+The TCPExecutor sends batches of points to a pool of workers, e.g., one
+worker process per core on each of several machines, and assembles the
+values in the order of the points. It has the map method of a
+concurrent.futures.Executor, so it can be given as the executor of the
+derivative classes in numdifftools.core and numdifftools.nd_cstep, which are
+picklable.
+
+The protocol is simple: each message is a pickle preceded by its length as
+an 8 byte unsigned integer. A request holds the hash of the pickled function,
+the pickled function itself, unless it was sent before on the connection,
+and an array of points. The reply holds the list of values, the exception
+raised by the function, or a miss if the worker has not got the function of
+the hash, which is then sent again. The connections are kept open between
+the requests. A worker runs the function it is sent, so it must only listen
+on a trusted network.
+
+A worker is started on each machine with, e.g.,
+
+    python -m numdifftools.distributed --host 0.0.0.0 --port 5000
+"""
+from __future__ import division, print_function
+import argparse
+import hashlib
+import pickle
+import socket
+import socketserver
+import struct
+import threading
+from itertools import chain, islice
+import numpy as np
+
+__all__ = ['TCPExecutor', 'Worker']
+
+_HEADER = struct.Struct('!Q')
+
+
+def _send(sock, obj):
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_HEADER.pack(len(data)))
+    sock.sendall(data)
+
+
+def _recv_exactly(sock, num_bytes):
+    data = bytearray(num_bytes)
+    view = memoryview(data)
+    while num_bytes:
+        num_read = sock.recv_into(view, num_bytes)
+        if num_read == 0:
+            raise EOFError('connection closed')
+        view = view[num_read:]
+        num_bytes -= num_read
+    return data
+
+
+def _recv(sock):
+    num_bytes, = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return pickle.loads(_recv_exactly(sock, num_bytes))
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    ''' Evaluate the batches of points sent on one connection '''
+
+    def handle(self):
+        key, fun = None, None
+        while True:
+            try:
+                request_key, data, points = _recv(self.request)
+            except (EOFError, OSError):
+                return
+            if request_key != key and data is None:
+                _send(self.request, ('miss', None))
+                continue
+            try:
+                if request_key != key:
+                    fun, key = pickle.loads(data), request_key
+                reply = ('ok', [fun(x) for x in points])
+            except Exception as error:
+                reply = ('error', error)
+            try:
+                _send(self.request, reply)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                _send(self.request, ('error', RuntimeError(repr(reply[1]))))
+
+
+class _Job(object):
+    ''' Batches of points of one call of map, made when they are requested
+
+    The batches taken by the connections and not evaluated yet, e.g.,
+    because the connection was lost, are kept in pending. Thus at most one
+    batch per connection, and the batches put back, are held at a time.
+    '''
+
+    def __init__(self, fun_data, points, batch_size):
+        self.fun_data = fun_data
+        self.key = hashlib.sha1(fun_data).digest()
+        self.num_batches = 0
+        self.results = {}
+        self.errors = []
+        self._points = points
+        self._batch_size = batch_size
+        self._exhausted = False
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def _take(self):
+        ''' Return list with the next batch of points and its index, if any
+        '''
+        if not self._exhausted:
+            batch = list(islice(self._points, self._batch_size))
+            if batch:
+                self.num_batches += 1
+                return [(self.num_batches - 1, np.asarray(batch))]
+            self._exhausted = True
+        return []
+
+    def next_batch(self):
+        ''' Return index and points of the next batch, or None if done '''
+        with self._lock:
+            if not self._pending:
+                self._pending = self._take()
+            return self._pending.pop() if self._pending else None
+
+    def put_back(self, i, batch):
+        with self._lock:
+            self._pending.append((i, batch))
+
+    def is_done(self):
+        with self._lock:
+            if not self._pending:
+                self._pending = self._take()
+            return not self._pending
+
+    def values(self):
+        return [value for i in range(self.num_batches)
+                for value in self.results[i]]
+
+
+class Worker(socketserver.ThreadingTCPServer):
+    '''
+    TCP server evaluating the functions and points sent by a TCPExecutor
+
+    Parameters
+    ----------
+    host : string
+        interface to listen on.
+    port : scalar integer
+        port to listen on. If 0, a free port is chosen.
+
+    Notes
+    -----
+    Each connection is served by a thread. Start one worker process per
+    core to evaluate pure Python functions in parallel. The address of the
+    worker, e.g., with the chosen port, is given by server_address.
+    '''
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='localhost', port=0):
+        socketserver.ThreadingTCPServer.__init__(self, (host, port), _Handler)
+
+
+class TCPExecutor(object):
+    '''
+    Pool of connections to workers evaluating a function at batches of points
+
+    Parameters
+    ----------
+    addresses : list of (host, port) tuples
+        addresses of the workers. A worker may be listed more than once to
+        get several connections to it.
+    batch_size : scalar integer
+        number of points sent in one request.
+    max_retries : scalar integer
+        number of times to reconnect to the workers when all connections are
+        lost before the points are evaluated.
+    timeout : real scalar, optional
+        timeout in seconds of connecting to and waiting for a worker. The
+        default waits forever.
+
+    Notes
+    -----
+    Each connection is served by a thread taking the next batch of points
+    from the iterator given to map, so fast workers get more batches than
+    slow ones, and only one batch per connection is held at a time. The
+    values are kept by the index of their batch. If a worker is lost, its
+    batch is put back and evaluated by one of the other workers, and a new
+    connection to the lost worker is tried in the next call of map. The
+    pickled function is sent once per connection. Exceptions raised by the
+    function are raised by map, and are not retried.
+
+    Examples
+    --------
+    >>> import threading
+    >>> import numpy as np
+    >>> import numdifftools as nd
+    >>> from numdifftools.distributed import TCPExecutor, Worker
+
+    # Workers are usually started on other machines
+
+    >>> workers = [Worker() for _ in range(2)]
+    >>> for worker in workers:
+    ...     threading.Thread(target=worker.serve_forever, daemon=True).start()
+    >>> addresses = [worker.server_address for worker in workers]
+    >>> with TCPExecutor(addresses, batch_size=4) as executor:
+    ...     hess = nd.Hessian(np.prod, executor=executor)([1., 2., 3.])
+    >>> np.allclose(hess, [[0, 3, 2], [3, 0, 1], [2, 1, 0]])
+    True
+    >>> for worker in workers:
+    ...     worker.shutdown()
+    ...     worker.server_close()
+
+    See also
+    --------
+    numdifftools.parallel.SharedMemoryExecutor
+    '''
+
+    def __init__(self, addresses, batch_size=64, max_retries=3, timeout=None):
+        if not addresses:
+            raise ValueError('At least one worker address must be given!')
+        self.addresses = [tuple(address) for address in addresses]
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._connections = [None] * len(self.addresses)
+        self._keys = [None] * len(self.addresses)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        return False
+
+    def shutdown(self, wait=True):
+        for k in range(len(self._connections)):
+            self._close(k)
+
+    def _close(self, k):
+        connection = self._connections[k]
+        self._connections[k] = None
+        self._keys[k] = None
+        if connection is not None:
+            connection.close()
+
+    def _connect(self, k):
+        if self._connections[k] is None:
+            self._connections[k] = socket.create_connection(self.addresses[k],
+                                                            self.timeout)
+        return self._connections[k]
+
+    def _request(self, k, connection, job, batch):
+        ''' Return status and reply of the evaluation of batch on connection k
+
+        The pickled function is only sent if the worker has not got it.
+        '''
+        data = None if self._keys[k] == job.key else job.fun_data
+        _send(connection, (job.key, data, batch))
+        status, reply = _recv(connection)
+        if status == 'miss':
+            _send(connection, (job.key, job.fun_data, batch))
+            status, reply = _recv(connection)
+        self._keys[k] = job.key
+        return status, reply
+
+    def _serve(self, k, job):
+        ''' Evaluate the batches of job on connection k '''
+        try:
+            connection = self._connect(k)
+        except OSError:
+            return
+        while not job.errors:
+            task = job.next_batch()
+            if task is None:
+                return
+            i, batch = task
+            try:
+                status, reply = self._request(k, connection, job, batch)
+            except (EOFError, OSError):
+                job.put_back(i, batch)
+                self._close(k)
+                return
+            if status == 'error':
+                job.errors.append(reply)
+                return
+            job.results[i] = reply
+
+    def _run(self, job):
+        for _attempt in range(self.max_retries + 1):
+            threads = [threading.Thread(target=self._serve, args=(k, job))
+                       for k in range(len(self.addresses))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            if job.errors:
+                raise job.errors[0]
+            if job.is_done():
+                return
+        raise ConnectionError('Lost the connections to all workers at '
+                              '{}'.format(self.addresses))
+
+    def map(self, fun, points):
+        ''' Return iterator over fun evaluated at each of the points '''
+        points = iter(points)
+        first = list(islice(points, 1))
+        if not first:
+            return iter([])
+        fun_data = pickle.dumps(fun, protocol=pickle.HIGHEST_PROTOCOL)
+        job = _Job(fun_data, chain(first, points), self.batch_size)
+        with self._lock:
+            self._run(job)
+        return iter(job.values())
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Worker evaluating functions for a TCPExecutor.')
+    parser.add_argument('--host', default='localhost',
+                        help='interface to listen on')
+    parser.add_argument('--port', type=int, default=5000,
+                        help='port to listen on')
+    options = parser.parse_args(args)
+    worker = Worker(options.host, options.port)
+    try:
+        worker.serve_forever()
+    finally:
+        worker.server_close()
+
+
+def test_docstrings():
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,389 @@
+"""Fornberg's methods for finite difference weights and Taylor coefficients
+
+Author : pbrod
+License : BSD
+Notes
+-----
+fd_weights and fd_weights_all return finite difference weights for any
+derivative order on any set of (possibly non-uniform) offsets, using
+Fornberg's recursion, which is accurate also for wide stencils.
+
+The Taylor coefficients are computed from samples of the function on circles
+in the complex plane around the expansion point with a single FFT, i.e., by
+evaluating the Cauchy integral formula with the trapezoidal rule.
+All derivatives up to order m-1 are obtained from m function evaluations.
+"""
+from __future__ import division, print_function
+import math
+from collections import namedtuple
+import numpy as np
+
+_EPS = np.finfo(float).eps
+_FD_WEIGHTS_CACHE = {}
+_FD_WEIGHTS_CACHE_SIZE = 1000
+
+
+def _fd_weights_all(x, x0, n):
+    '''Fornberg's recursion for finite difference weights
+
+    x may have shape (..., m) and x0 shape (...), and then the weights of all
+    the stencils are computed at once and returned with shape (..., n+1, m).
+    '''
+    m = x.shape[-1]
+    weights = np.zeros(x.shape + (n + 1,))
+    weights[..., 0, 0] = 1.0
+    c1 = 1.0
+    c4 = x[..., 0] - x0
+    for i in range(1, m):
+        mn = min(i, n)
+        k = np.arange(1, mn + 1)
+        c3 = x[..., i, np.newaxis] - x[..., :i]
+        c2 = np.prod(c3, axis=-1)
+        c5 = c4
+        c4 = x[..., i] - x0
+        weights[..., i, 1:mn + 1] = (c1 / c2)[..., np.newaxis] * (
+            k * weights[..., i - 1, :mn] -
+            c5[..., np.newaxis] * weights[..., i - 1, 1:mn + 1])
+        weights[..., i, 0] = -c1 * c5 * weights[..., i - 1, 0] / c2
+        weights[..., :i, 1:mn + 1] = (
+            c4[..., np.newaxis, np.newaxis] * weights[..., :i, 1:mn + 1] -
+            k * weights[..., :i, :mn]) / c3[..., np.newaxis]
+        weights[..., :i, 0] = c4[..., np.newaxis] * weights[..., :i, 0] / c3
+        c1 = c2
+    return np.swapaxes(weights, -1, -2)
+
+
+def fd_weights_all(x, x0=0, n=1):
+    '''
+    Return finite difference weights for derivatives of all orders up to n
+
+    Parameters
+    ----------
+    x : vector, length m
+        x-coordinates for grid points. They need not be equally spaced.
+    x0 : scalar
+        location where approximations are to be accurate
+    n : scalar integer
+        highest derivative that we want to find weights for
+
+    Returns
+    -------
+    weights :  array, shape n+1 x m
+        contains coefficients for the j'th derivative in row j (0 <= j <= n)
+
+    Notes
+    -----
+    The x values can be arbitrarily spaced but must be distinct and len(x) > n.
+    The weights are computed with Fornberg's recursion and cached by the
+    signature (x, x0, n). The returned array is read-only.
+
+    References
+    ----------
+    Fornberg, B. (1988). Generation of finite difference formulas on
+    arbitrarily spaced grids. Mathematics of Computation, 51(184), 699-706.
+
+    Fornberg, B. (1998). Calculation of weights in finite difference
+    formulas. SIAM Review, 40(3), 685-691.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools.fornberg as ndf
+    >>> np.allclose(ndf.fd_weights_all([-1, 0, 1], n=2),
+    ...             [[0, 1, 0], [-0.5, 0, 0.5], [1, -2, 1]])
+    True
+
+    See also
+    --------
+    fd_weights
+    '''
+    x = np.asarray(x, dtype=float).ravel()
+    n = int(n)
+    if len(x) <= n or n < 0:
+        raise ValueError('len(x) must be larger than n >= 0!')
+    key = (x.tobytes(), float(x0), n)
+    weights = _FD_WEIGHTS_CACHE.get(key)
+    if weights is None:
+        if len(np.unique(x)) != len(x):
+            raise ValueError('The x values must be distinct!')
+        if len(_FD_WEIGHTS_CACHE) >= _FD_WEIGHTS_CACHE_SIZE:
+            _FD_WEIGHTS_CACHE.clear()
+        weights = _fd_weights_all(x, float(x0), n)
+        weights.flags.writeable = False
+        _FD_WEIGHTS_CACHE[key] = weights
+    return weights
+
+
+def fd_weights(x, x0=0, n=1):
+    '''
+    Return finite difference weights for the n'th derivative
+
+    Parameters
+    ----------
+    x : vector
+        abscissas used for the evaluation for the derivative at x0.
+    x0 : scalar
+        location where approximations are to be accurate
+    n : scalar integer
+        order of derivative. Note for n=0 this can be used to evaluate the
+        interpolating polynomial itself.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools.fornberg as ndf
+    >>> x = np.linspace(-1, 1, 5) * 1e-3
+    >>> w = ndf.fd_weights(x, x0=0, n=1)
+    >>> df = np.dot(w, np.exp(x))
+    >>> np.abs(df-1) < 1e-10
+    True
+
+    See also
+    --------
+    fd_weights_all
+    '''
+    return fd_weights_all(x, x0, n)[-1]
+
+
+def _num_taylor_coefficients(n):
+    '''Return number of points on the circle needed for coefficient n
+
+    The number is a power of 2, at least 32 and at least 4*(n+1) so that the
+    highest requested coefficient is in the first quarter of the FFT.
+    '''
+    num = max(32, 4 * (n + 1))
+    return int(2 ** np.ceil(np.log2(num)))
+
+
+def _unit_circle(m):
+    '''Return the m'th roots of unity'''
+    return np.exp(2j * np.pi * np.arange(m) / m)
+
+
+_cmn_doc = """
+    Return %(derivative)s of complex analytic function using FFT
+
+    Parameters
+    ----------
+    fun : callable
+        function to differentiate. It must be analytic in a neighbourhood of
+        the expansion points and vectorized, i.e., accept complex arrays of
+        any shape and be evaluated elementwise.
+    n : scalar integer, optional
+        Highest order of the Taylor coefficients returned.
+    r : real scalar, optional
+        Initial radius of the circles the function is sampled on.
+    step_ratio : real scalar, optional
+        Ratio between successive radii in the radius search. Note: Ratio > 1
+    max_iter : scalar integer, optional
+        Maximum number of iterations in the radius search.
+    full_output : bool, optional
+        If `full_output` is False, only the coefficients are returned.
+        If `full_output` is True, then (coefs, info) is returned, where
+        `info` is a namedtuple with the fields error_estimate, final_radius,
+        function_count, iterations and failed.
+
+    Call Parameters
+    ---------------
+    z0 : array_like
+        expansion points. All points are handled at once, so fun is called
+        with arrays of shape z0.shape + (m,), where m is the number of points
+        on each circle.
+
+    %(returns)s
+    Notes
+    -----
+    The m-point trapezoidal rule for the Cauchy integral on a circle with
+    radius r gives the scaled coefficients c_k = a_k * r**k up to the aliasing
+    error a_(k+m) * r**(k+m) + ... and a roundoff error of about
+    EPS * max|f| on the circle. For each point the radius is chosen by a line
+    search on a log scale that minimizes the estimated error of coefficient n
+
+        (10 * EPS * max|f| + max(|c_k|, k >= 3*m/4)) / r**n
+
+    where the magnitude of the last quarter of the coefficients measures how
+    fast they decay, i.e., how large the aliasing error is. This balances the
+    truncation error at large radii against the roundoff error at small radii.
+    Each iteration of the search is one batched call to fun.
+
+    References
+    ----------
+    Lyness, J. N., Moler, C. B. (1966). Vandermonde systems and numerical
+    differentiation. Numerische Mathematik.
+
+    Lyness, J. N., Moler, C. B. (1969). Generalized Romberg methods for
+    integrals of derivatives. Numerische Mathematik.
+
+    Fornberg, B. (1981). Numerical Differentiation of Analytic Functions.
+    ACM Transactions on Mathematical Software (TOMS), 7(4), 512-526.
+
+    %(example)s
+    """
+
+
+class Taylor(object):
+    __doc__ = _cmn_doc % dict(derivative='Taylor coefficients', returns="""
+    Returns
+    -------
+    coefs : ndarray
+       Taylor coefficients of fun, coefs[k] = f^(k)(z0) / k!, k = 0, ..., n,
+       stacked along the first axis. If z0 is real and the imaginary parts of
+       all the coefficients are within the error estimates, the coefficients
+       are real.""", example="""
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools.fornberg as ndf
+
+    # Taylor coefficients of exp(z) at z == 0 and z == 1
+
+    >>> coefs = ndf.Taylor(np.exp, n=4)([0, 1])
+    >>> np.allclose(coefs[:, 0], [1, 1, 1./2, 1./6, 1./24])
+    True
+    >>> np.allclose(coefs[:, 1], np.exp(1) * np.array([1, 1, 1./2, 1./6,
+    ...                                                1./24]))
+    True""")
+
+    info = namedtuple('info', ['error_estimate', 'final_radius',
+                               'function_count', 'iterations', 'failed'])
+
+    def __init__(self, fun, n=1, r=0.0059, step_ratio=1.6, max_iter=30,
+                 full_output=False):
+        self.fun = fun
+        self.n = n
+        self.r = r
+        self.step_ratio = step_ratio
+        self.max_iter = max_iter
+        self.full_output = full_output
+
+    def _scaled_coefficients(self, z, r, m):
+        '''Return c_k = a_k * r**k and max|f| from samples on the circles
+
+        The circles have center z and radius r, and are stacked along the
+        last axis.
+        '''
+        y = self.fun(z[..., np.newaxis] + r[..., np.newaxis] * _unit_circle(m))
+        y = np.broadcast_to(y, np.broadcast(z, r).shape + (m,))
+        return np.fft.fft(y, axis=-1) / m, np.max(np.abs(y), axis=-1)
+
+    def _error_estimate(self, c, max_abs_y, r):
+        '''Return estimated absolute error of the coefficients a_0,...,a_n'''
+        num_tail = c.shape[-1] // 4
+        tail = np.max(np.abs(c[..., -num_tail:]), axis=-1)
+        k = np.arange(self.n + 1)
+        noise = 10 * _EPS * max_abs_y + tail
+        return noise[..., np.newaxis] / r[..., np.newaxis] ** k
+
+    def _search_radius(self, z, m):
+        '''Return radius, scaled coefficients and error estimate for each z
+
+        Starting at radius r, the radius is multiplied or divided by
+        step_ratio as long as the error estimate of coefficient n decreases.
+        '''
+        num_z = z.size
+        step_ratio = float(self.step_ratio)
+        r_best = np.ones(num_z) * self.r
+        c_best, y_best = self._scaled_coefficients(z, r_best, m)
+        err_best = self._error_estimate(c_best, y_best, r_best)[:, -1]
+        function_count = np.ones(num_z, dtype=int) * m
+
+        step = np.ones(num_z) * step_ratio
+        committed = np.zeros(num_z, dtype=bool)
+        active = np.ones(num_z, dtype=bool)
+        iterations = 0
+        while active.any() and iterations < self.max_iter:
+            iterations += 1
+            i = np.flatnonzero(active)
+            r = r_best[i] * step[i]
+            c, max_abs_y = self._scaled_coefficients(z[i], r, m)
+            err = self._error_estimate(c, max_abs_y, r)[:, -1]
+            function_count[i] += m
+
+            better = err < err_best[i]
+            j = i[better]
+            r_best[j], c_best[j], y_best[j] = r[better], c[better], \
+                max_abs_y[better]
+            err_best[j] = err[better]
+
+            # Turn around once if the first step did not improve the error,
+            # otherwise stop at the best radius found
+            k = i[~better]
+            turn = ~committed[k]
+            step[k[turn]] = 1.0 / step_ratio
+            active[k[~turn]] = False
+            committed[i] = True
+
+        return r_best, c_best, y_best, function_count, iterations, active
+
+    def __call__(self, z0):
+        n = self.n
+        z = np.asarray(z0)
+        shape = z.shape
+        z = z.ravel()
+        m = _num_taylor_coefficients(n)
+
+        (r, c, max_abs_y, function_count, iterations,
+         failed) = self._search_radius(z, m)
+
+        k = np.arange(n + 1)
+        coefs = c[:, :n + 1] / r[:, np.newaxis] ** k
+        err = self._error_estimate(c, max_abs_y, r)
+        if np.isrealobj(z0) and np.all(np.abs(coefs.imag) <= err):
+            coefs = coefs.real
+
+        coefs = coefs.T.reshape((n + 1,) + shape)
+        if self.full_output:
+            info = self.info(err.T.reshape((n + 1,) + shape),
+                             r.reshape(shape),
+                             function_count.reshape(shape), iterations,
+                             failed.reshape(shape))
+            return coefs, info
+        return coefs
+
+
+class Derivative(Taylor):
+    __doc__ = _cmn_doc % dict(derivative="n'th derivative", returns="""
+    Returns
+    -------
+    der : ndarray
+       n'th derivative of fun at z0, computed from the n'th Taylor
+       coefficient. If full_output is True, the error_estimate in info is the
+       error estimate of der.
+    """, example="""
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools.fornberg as ndf
+
+    # 1'st and 5'th derivative of exp(x) for many x at once
+
+    >>> x = np.linspace(-1, 1, 101)
+    >>> np.allclose(ndf.Derivative(np.exp)(x), np.exp(x))
+    True
+    >>> np.allclose(ndf.Derivative(np.exp, n=5)(x), np.exp(x))
+    True
+
+    # 10'th derivative of 1/(1-z) at z == 0 is 10!
+
+    >>> d10, info = ndf.Derivative(lambda z: 1 / (1 - z), n=10,
+    ...                            full_output=True)(0)
+    >>> np.abs(d10 - 3628800) < info.error_estimate
+    True""")
+
+    def __call__(self, z0):
+        n = self.n
+        fact = math.factorial(n)
+        if self.full_output:
+            coefs, info = super(Derivative, self).__call__(z0)
+            info = info._replace(error_estimate=info.error_estimate[n] * fact)
+            return coefs[n] * fact, info
+        return super(Derivative, self).__call__(z0)[n] * fact
+
+
+def test_docstrings():
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
+
+
+if __name__ == '__main__':
+    test_docstrings()
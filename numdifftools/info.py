@@ -9,7 +9,7 @@ the order of the method or the extrapolation, even allowing the user to
 specify whether central, forward or backward differences are used.
 The methods provided are:
 
-*Derivative:* Computate derivatives of order 1 through 4 on any scalar function.
+*Derivative:* Computate derivatives of any order on any scalar function.
 
 *Gradient:* Computes the gradient vector of a scalar function of one or more variables.
 
@@ -19,6 +19,14 @@ The methods provided are:
 
 *Hessdiag:* Computes only the diagonal elements of the Hessian matrix
 
+*PartialDerivative:* Computes a mixed partial derivative of any order of a scalar function of one or more variables.
+
+*ThirdDerivative:* Computes the symmetric tensor of all 3rd partial derivatives of a scalar function of one or more variables.
+
+*Laplacian:* Computes the trace of the Hessian matrix, optionally with Hutchinson's randomized estimator.
+
+*GaussNewtonHessian:* Computes the Gauss-Newton approximation 2*J'*J to the Hessian of a sum of squared residuals.
+
 All of these methods also produce error estimates on the result.
 A pdf file is also provided to explain the theory behind these tools.
 
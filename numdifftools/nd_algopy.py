@@ -10,9 +10,10 @@ except ImportError:
 
 
 class _Common(object):
-    def __init__(self, fun, method='forward'):
+    def __init__(self, fun, method='forward', executor=None):
         self.fun = fun
         self.method = method
+        self.executor = executor
         self.initialize()
 
     def _initialize_reverse(self, x):
@@ -31,6 +32,7 @@ class _Common(object):
         cg.independentFunctionList = [x]
         cg.dependentFunctionList = [y]
         self._cg = cg
+        return cg
 
     def initialize(self):
         if self.method.startswith('reverse'):
@@ -47,22 +49,27 @@ class _Common(object):
     def _derivative(self, x):
         xi = np.asarray(x, dtype=float)
         shape0 = xi.shape
-        y = np.array([self._gradient(xj) for xj in xi.ravel()])
+        # the derivative at each element of x is independent of the others,
+        # and may be computed concurrently by the executor
+        if self.executor is None:
+            y = np.array([self._gradient(xj) for xj in xi.ravel()])
+        else:
+            y = np.array(list(self.executor.map(self._gradient, xi.ravel())))
         return y.reshape(shape0)
     # def _jacobian(self, x):
     #    return self._gradient(x)
 
     def _jacobian_reverse(self, x):
-        self._initialize_reverse(x)
-        return self._cg.jacobian([np.asarray(x)])
+        cg = self._initialize_reverse(x)
+        return cg.jacobian([np.asarray(x)])
 
     def _gradient_reverse(self, x):
-        self._initialize_reverse(x)
-        return self._cg.gradient([np.asarray(x)])
+        cg = self._initialize_reverse(x)
+        return cg.gradient([np.asarray(x)])
 
     def _hessian_reverse(self, x):
-        self._initialize_reverse(x)
-        return self._cg.hessian([np.asarray(x)])
+        cg = self._initialize_reverse(x)
+        return cg.hessian([np.asarray(x)])
         # return self._cg.hessian([x])
 
     def _gradient_forward(self, x):
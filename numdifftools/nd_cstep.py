@@ -44,8 +44,11 @@ without dependencies.
 #    http://en.wikipedia.org/wiki/Levenberg%E2%80%93Marquardt_algorithm
 from __future__ import print_function
 import numpy as np
-from numdifftools import dea3
+from numdifftools.core import _dea3_into
+from numdifftools.batching import BatchProbe
+from numdifftools.fornberg import fd_weights
 from collections import namedtuple
+from itertools import chain, islice
 from matplotlib import pyplot as plt
 # NOTE: we only do double precision internally so far
 EPS = np.MachAr().eps
@@ -98,15 +101,42 @@ _cmn_doc = """
         If `full_output` is False, only the derivative is returned.
         If `full_output` is True, then (der, r) is returned `der` is the
         derivative, and `r` is a Results object.
+    executor : concurrent.futures.Executor, optional
+        If given, the independent evaluations of f are submitted to it, e.g.,
+        a ThreadPoolExecutor, and gathered in their original order. The
+        result is identical to the one of the serial evaluation.
+    batch : bool or 'auto', optional
+        If True, f is batch-callable, i.e., f(xs, `*args`, `**kwargs`)
+        returns the values at each of the points xs[k] of a stack of points
+        along the first axis, e.g., xs of shape (k, n) for a function of n
+        variables. The perturbed points of each step are then evaluated with
+        one call of f, or one per chunk of points. If 'auto', the first
+        evaluations probe if f gives the same values for a stack of points
+        as point by point, and the stacks are used if they are faster. The
+        decision is cached for each f. If True, Derivative stacks the points
+        of all the steps, so f is called once, or once per chunk.
+    chunk_size : int, optional
+        maximum number of points in a stack given to f when batch is True.
+        The default evaluates all points of a step in one call. Otherwise
+        the points are made one at a time, so the Gradient and Jacobian of
+        f of n variables only need O(n) memory for the points.
 
     Call Parameters
     ---------------
     x : array_like
        value at which function derivative is evaluated
-    args : tuple
+%(extra_parameters)s    args : tuple
         Arguments for function `f`.
     kwds : dict
-        Keyword arguments for function `f`.
+        Keyword arguments for function `f`, except out and err_out.
+    out, err_out : arrays, optional
+        arrays of the shape of the derivative to write the derivative and its
+        error estimate to. The error estimate is only computed if err_out is
+        given or full_output is True. With out, the steps and the
+        extrapolation of the Gradient, Jacobian and Hessian write to work
+        arrays kept by the object, so repeated calls allocate no arrays of
+        the size of the result. Concurrent calls with out therefore need one
+        object each.
     %(returns)s
     Notes
     -----
@@ -215,6 +245,28 @@ class StepsGenerator2(object):
                 yield h
 
 
+class _FixedSteps(object):
+    ''' Picklable generator of the single default or given step '''
+
+    def __init__(self, steps=None):
+        self.steps = steps
+
+    def __call__(self, xi, scale):
+        yield _default_base_step(xi, scale, self.steps)
+
+
+class _ArgsFun(object):
+    ''' Picklable function of x returning f(x, *args, **kwds) '''
+
+    def __init__(self, f, args=(), kwds=None):
+        self.f = f
+        self.args = args
+        self.kwds = {} if kwds is None else kwds
+
+    def __call__(self, x):
+        return self.f(x, *self.args, **self.kwds)
+
+
 class _Derivative(object):
 
     @staticmethod
@@ -234,62 +286,351 @@ class _Derivative(object):
         self._scale = scale
 
     def __init__(self, f, steps=None, method='complex', full_output=False,
-                 scale=None):
+                 scale=None, executor=None, batch=False, chunk_size=None):
         self.n = 1
         self.f = f
         self._scale = scale
         self.steps = self._make_callable(steps)
         self.method = method
         self.full_output = full_output
+        self.executor = executor
+        self.batch = batch
+        self.chunk_size = chunk_size
+        self._batch_probe = BatchProbe(axis=0)
+        self._work = {}
+
+    def __getstate__(self):
+        ''' Return state to pickle, e.g., when sent to a worker process
+
+        The executor is not part of the state, because it can not be pickled
+        and the workers evaluate f serially. Neither are the work arrays.
+        '''
+        state = self.__dict__.copy()
+        state['executor'] = None
+        state['_work'] = {}
+        return state
+
+    def acall(self, x, *args, **kwds):
+        ''' Return coroutine computing the derivative of a coroutine f at x
+
+        The independent evaluations of each step are awaited concurrently
+        with asyncio.gather and then extrapolated as in the synchronous call,
+        e.g., der = await Gradient(af).acall(x). The keyword max_concurrency
+        (default 8) limits the number of evaluations in progress at a time.
+        The other arguments are passed on to f.
+
+        See also
+        --------
+        numdifftools.asynchronous.acall
+        '''
+        from numdifftools.asynchronous import acall
+        max_concurrency = kwds.pop('max_concurrency', 8)
+        return acall(self, x, args, kwds, max_concurrency, fun_name='f')
+
+    def _map(self, f, points, *args, **kwds):
+        ''' Return array of f(x, *args, **kwds) for each x in points
+
+        The evaluations are submitted to the executor, if any. If batch is
+        True, f is called with stacks of at most chunk_size points. If batch
+        is 'auto', the first points are used to decide if it should be.
+        '''
+        batch = self.batch
+        if batch == 'auto':
+            points = iter(points)
+            batch = self._probe_batch(f, points, *args, **kwds)
+            if not isinstance(batch, bool):
+                return batch  # the values at the probed points
+        if batch:
+            values = [np.asarray(value) for value in
+                      self._map_points(f, self._stacks(points), *args, **kwds)]
+            return np.concatenate(values) if values else np.array([])
+        return np.asarray(self._map_points(f, points, *args, **kwds))
+
+    def _probe_batch(self, f, points, *args, **kwds):
+        ''' Return decision of the batch probe for f, or the probed values
+
+        If f is not probed yet, the first points are consumed by the probe
+        and the values at all the points are returned as an array.
+        '''
+        probe = self._batch_probe
+        key = f.f if isinstance(f, _ArgsFun) else f
+        if key in probe.decisions:
+            return probe.decisions[key][0]
+        fval = np.asarray(probe(key, f, list(islice(points, probe.probe_size)),
+                                *args, **kwds))
+        if key not in probe.decisions:
+            return fval  # too few points to decide
+        rest = self._map(f, points, *args, **kwds)
+        if len(rest) == 0:
+            return fval
+        return np.concatenate((fval, rest))
+
+    def _map_points(self, f, points, *args, **kwds):
+        if self.executor is None:
+            return [f(x, *args, **kwds) for x in points]
+        return list(self.executor.map(_ArgsFun(f, args, kwds), points))
+
+    def _imap(self, f, points, *args, **kwds):
+        ''' Return iterator of f(x, *args, **kwds) for each x in points
+
+        Same as _map, but the serial evaluation is lazy, so each value can
+        be used before the next one is computed.
+        '''
+        if self.batch is not False:
+            return iter(self._map(f, points, *args, **kwds))
+        if self.executor is None:
+            return (f(x, *args, **kwds) for x in points)
+        return self.executor.map(_ArgsFun(f, args, kwds), points)
+
+    @staticmethod
+    def _work_array(work, name, shape, dtype=float):
+        ''' Return array for intermediate values, kept in the dict work
+
+        If work is None, a new array is returned. The calls with out give
+        the work arrays of the object, so after the first call they are not
+        allocated again.
+        '''
+        if work is None:
+            return np.empty(shape, dtype)
+        array = work.get(name)
+        if array is None or array.shape != shape or array.dtype != dtype:
+            array = work[name] = np.empty(shape, dtype)
+        return array
+
+    def _next_values(self, work, name, values, num_values, max_values=None):
+        ''' Return array of the next num_values of the iterator values
+
+        The values are written to the work array name of max_values rows as
+        they come, so the arrays returned by f are freed one at a time. The
+        array has the dtype of the first value, or float if it is integral.
+        '''
+        first = np.asarray(next(values))
+        dtype = first.dtype
+        if not np.issubdtype(dtype, np.inexact):
+            dtype = np.dtype(float)
+        rows = (max_values or num_values,) + first.shape
+        fval = self._work_array(work, name, rows, dtype)[:num_values]
+        fval[0] = first
+        del first
+        for k in range(1, num_values):
+            fval[k] = next(values)
+        return fval
+
+    def _stacks(self, points):
+        ''' Return iterator over arrays of at most chunk_size points '''
+        points = iter(points)
+        while True:
+            stack = list(islice(points, self.chunk_size))
+            if not stack:
+                return
+            yield np.array(stack)
 
     def _make_callable(self, steps):
         if hasattr(steps, '__call__'):
             return steps
-
-        def _step_generator(xi, scale):
-            yield _default_base_step(xi, scale, steps)
-        return _step_generator
+        return _FixedSteps(steps)
 
     def _get_functions(self, method):
         return getattr(self, '_' + self.method), self.f, self.steps
 
-    def __call__(self, x, *args, **kwds):
+    def _stencil(self):
+        ''' Return offsets and weights of the rule of the method, or None
+
+        The estimate for step h is sum(weights * f(x + offsets * h)) / h**n
+        where the imaginary part of f is used if the offsets are complex.
+        Only classes with such a rule can evaluate all the steps at once.
+        '''
+        return None
+
+    @staticmethod
+    def _stacked_points(x, h, offsets):
+        ''' Return x + offsets[k] * h[i] stacked along the first axis '''
+        offsets = offsets.reshape((1, -1) + (1,) * x.ndim)
+        return (x + offsets * h[:, np.newaxis]).reshape((-1,) + x.shape)
+
+    def _stacked_steps(self, x, stencil, *args, **kwds):
+        ''' Return list of estimates from stacked evaluations of all steps
+
+        The points of the steps are evaluated in chunks of whole steps with
+        at most chunk_size points, and each chunk is contracted with the
+        weights before the next one is evaluated.
+        '''
+        offsets, weights = stencil
+        num_offsets = len(offsets)
+        steps = np.array(list(self.steps(x, self.scale)))
+        chunk_size = self.chunk_size or len(steps) * num_offsets
+        group_size = max(chunk_size // num_offsets, 1)
+        groups = [steps[i:i + group_size]
+                  for i in range(0, len(steps), group_size)]
+        points = (self._stacked_points(x, h, offsets) for h in groups)
+        fun = _ArgsFun(self.f, args, kwds)
+        if self.executor is None:
+            values = (fun(stack) for stack in points)
+        else:
+            values = self.executor.map(fun, points)
+        results = []
+        for h, fval in zip(groups, values):
+            fval = np.asarray(fval)
+            if np.iscomplexobj(offsets):
+                fval = fval.imag
+            fval = fval.reshape((len(h), num_offsets) + fval.shape[1:])
+            der = np.tensordot(weights, fval, axes=(0, 1))
+            results.extend(der / np.product((h,) * self.n, axis=0))
+        return results
+
+    def __call__(self, x, *args, out=None, err_out=None, **kwds):
         xi = np.asarray(x)
-        derivative, f, steps = self._get_functions(self.method)
-        results = [derivative(f, xi, h, *args, **kwds)
-                   for h in steps(xi, self.scale)]
-        derivative, info = self._extrapolate(results)
+        work = None if out is None else self._work
+        stencil = self._stencil() if self.batch is True else None
+        if stencil is None:
+            results = self._step_estimates(xi, work, *args, **kwds)
+        else:
+            results = self._stacked_steps(xi, stencil, *args, **kwds)
+        derivative, info = self._extrapolate(results, out, err_out, work)
         if self.full_output:
             return derivative, info
         return derivative
 
-    def _get_arg_min(self, errors):
+    def _step_estimates(self, x, work, *args, **kwds):
+        ''' Return estimates of the derivative for each step
+
+        If work is given and the methods of the class use work arrays, the
+        estimates are the rows of the work array 'estimates', else a list.
+        '''
+        derivative, f, steps = self._get_functions(self.method)
+        if work is None or not self._uses_work:
+            return [derivative(f, x, h, *args, **kwds)
+                    for h in steps(x, self.scale)]
+        num_steps = 0
+        for h in steps(x, self.scale):
+            estimate = derivative(f, x, h, *args, work=work, **kwds)
+            num_steps += 1
+            estimates = work.get('estimates')
+            if (estimates is None or estimates.shape[1:] != estimate.shape or
+                    estimates.dtype != estimate.dtype):
+                estimates = np.empty((num_steps,) + estimate.shape,
+                                     estimate.dtype)
+            elif len(estimates) < num_steps:
+                # grown in the first call, keeping the previous estimates
+                estimates = np.concatenate((estimates, estimate[None]))
+            work['estimates'] = estimates
+            estimates[num_steps - 1] = estimate
+        return work['estimates'][:num_steps]
+
+    # True if the methods write to the work arrays given by _step_estimates
+    _uses_work = False
+
+    def _get_arg_min(self, errors, work=None):
+        ''' Return flat indices of the smallest of the errors of each column
+
+        The middle one of the rows with the smallest error is taken, and
+        NaNs are ignored. The intermediate values are in work arrays, and
+        they are computed one row at a time, since numpy allocates buffers
+        for reductions along the first axis, broadcast operands and casts.
+        '''
         shape = errors.shape
-        arg_mins = np.nanargmin(errors, axis=0)
-        min_errors = np.nanmin(errors, axis=0)
-        for i, min_error in enumerate(min_errors):
-            idx = np.flatnonzero(errors[:, i] == min_error)
-            arg_mins[i] = idx[idx.size // 2]
-        ix = np.ravel_multi_index((arg_mins, np.arange(shape[1])), shape)
+        keys = self._work_array(work, 'keys', shape)
+        ties = self._work_array(work, 'ties', shape, bool)
+        ix, middle, rank, count = self._work_array(work, 'arg_min',
+                                                   (4, shape[1]), np.intp)
+        min_keys = self._work_array(work, 'min_keys', shape[1:])
+        hit = self._work_array(work, 'hit', shape[1:], bool)
+        np.copyto(keys, errors)
+        np.copyto(keys, np.inf, where=np.isnan(errors, out=ties))
+        np.copyto(min_keys, keys[0])
+        for row in keys[1:]:
+            np.minimum(min_keys, row, out=min_keys)
+        middle.fill(0)
+        for row, tie in zip(keys, ties):
+            np.equal(row, min_keys, out=tie)
+            np.copyto(count, tie)
+            middle += count
+        middle //= 2
+        middle += 1
+        # the middle one of the ties is where their count reaches middle
+        rank.fill(0)
+        for k, tie in enumerate(ties):
+            np.copyto(count, tie)
+            rank += count
+            np.equal(rank, middle, out=hit)
+            hit &= tie
+            np.copyto(ix, k, where=hit)
+        ix *= shape[1]
+        columns = None if work is None else work.get('columns')
+        if columns is None or columns.shape != ix.shape:
+            columns = np.arange(shape[1])
+            if work is not None:
+                work['columns'] = columns
+        ix += columns
         return ix
 
-    def _extrapolate(self, sequence):
+    @staticmethod
+    def _take(values, ix, shape, out=None):
+        ''' Return values.flat[ix] of the given shape, written to out if given
+        '''
+        if out is None:
+            return values.flat[ix].reshape(shape)
+        return np.take(values.ravel(), ix.reshape(shape), out=out, mode='clip')
+
+    @staticmethod
+    def _check_out(shape, *arrays):
+        for array in arrays:
+            if array is not None and np.shape(array) != shape:
+                raise ValueError('Output array must have shape {}, not '
+                                 '{}'.format(shape, np.shape(array)))
+
+    def _dea3(self, work, name, sequence, symmetric=False):
+        ''' Return dea3 of the rows of sequence, computed in work arrays '''
+        shape = (len(sequence) - 2,) + sequence.shape[1:]
+        der, err = self._work_array(work, name, (2,) + shape)
+        _dea3_into(sequence[0:-2], sequence[1:-1], sequence[2:], der, err,
+                   self._work_array(work, name + '_work', (8,) + shape),
+                   self._work_array(work, name + '_masks', (3,) + shape,
+                                    bool))
+        if symmetric and len(der) > 1:
+            return der[:-1], err[1:]
+        return der, err
+
+    def _extrapolate(self, sequence, out=None, err_out=None, work=None,
+                     with_error=False):
+        ''' Return extrapolated derivative and info of the step estimates
+
+        The error estimate is only computed if with_error is True, or if it
+        is returned, i.e., if full_output is True or err_out is given.
+        '''
+        original_shape = np.shape(sequence[0])
+        self._check_out(original_shape, out, err_out)
+        with_error = with_error or self.full_output or err_out is not None
 
         dont_extrapolate = len(sequence) < 3
         if dont_extrapolate:
-            err = np.empty_like(sequence[0])
-            err.fill(np.NaN)
-            return 0.5 * (sequence[0] + sequence[-1]), self.info(err, 0)
-
-        original_shape = sequence[0].shape
-        res = np.vstack(r.ravel() for r in sequence)
-        der, errors = dea3(res[0:-2], res[1:-1], res[2:], symmetric=True)
+            err = None
+            if with_error:
+                err = np.empty(original_shape) if err_out is None else err_out
+                err.fill(np.NaN)
+            if len(sequence) == 1 and out is None:
+                return sequence[0], self.info(err, 0)
+            der = np.add(sequence[0], sequence[-1], out=out)
+            der *= 0.5
+            return der, self.info(err, 0)
+
+        if isinstance(sequence, np.ndarray):
+            res = sequence.reshape(len(sequence), -1)
+        else:
+            res = np.vstack([r.ravel() for r in sequence])
+        der, errors = self._dea3(work, 'dea3', res, symmetric=True)
         if len(der) > 2:
-            der, errors = dea3(der[0:-2], der[1:-1], der[2:])
-        ix = self._get_arg_min(errors)
+            der, errors = self._dea3(work, 'dea3_2', der)
+        ix = self._get_arg_min(errors, work)
 
-        err = errors.flat[ix].reshape(original_shape)
-        return der.flat[ix].reshape(original_shape), self.info(err, ix)
+        err = None
+        if with_error:
+            err = self._take(errors, ix, original_shape, err_out)
+        der = self._take(der, ix, original_shape, out)
+        if work is not None:
+            # ix is a work array of the object
+            ix = ix.copy() if self.full_output else None
+        return der, self.info(err, ix)
 
 
 class NDerivative(_Derivative):
@@ -311,10 +652,19 @@ class NDerivative(_Derivative):
         Order of the derivative. Default is 1.
     order : int, optional
         Number of points to use, must be odd.
+    executor : concurrent.futures.Executor, optional
+        If given, the stencil points are evaluated concurrently by it.
+    batch : bool, optional
+        If True, the stencil points of all the steps are stacked along a new
+        first axis and evaluated with one call of f, or one call per chunk of
+        at most chunk_size points, and contracted with the weights.
 
     Notes
     -----
     Decreasing the step size too small can result in round-off error.
+    The weights for orders and numbers of points that are not tabulated are
+    generated with Fornberg's recursion, so high order derivatives can be
+    computed from one wide stencil.
 
     Examples
     --------
@@ -330,8 +680,10 @@ class NDerivative(_Derivative):
     """
 
     def __init__(self, f, steps=None, method='central', full_output=False,
-                 scale=None, n=1, order=3):
-        super(NDerivative, self).__init__(f, steps, method, full_output, scale)
+                 scale=None, n=1, order=3, executor=None, batch=False,
+                 chunk_size=None):
+        super(NDerivative, self).__init__(f, steps, method, full_output, scale,
+                                          executor, batch, chunk_size)
         self.order = order
         self.n = n
         self.weights = self._weights(n, order)
@@ -355,7 +707,8 @@ class NDerivative(_Derivative):
 
         Notes
         -----
-        Can be inaccurate for large number of points.
+        The weights are computed with Fornberg's recursion, see
+        numdifftools.fornberg.fd_weights.
 
         """
         if Np < ndiv + 1:
@@ -363,17 +716,11 @@ class NDerivative(_Derivative):
                 "Number of points must be at least the derivative order + 1.")
         if Np % 2 == 0:
             raise ValueError("The number of points must be odd.")
-        from scipy import linalg
         ho = Np >> 1
-        x = np.arange(-ho, ho + 1.0)
-        x = x[:, np.newaxis]
-        X = x**0.0
-        for k in range(1, Np):
-            X = np.hstack([X, x**k])
-        w = np.product(np.arange(1, ndiv + 1), axis=0) * linalg.inv(X)[ndiv]
-        return w
-
-    def _weights(self, n, order):
+        return fd_weights(np.arange(-ho, ho + 1.0), 0, ndiv)
+
+    @staticmethod
+    def _weights(n, order):
         array = np.array
         if order < n + 1:
             raise ValueError("'order' (the number of points used to compute "
@@ -394,7 +741,7 @@ class NDerivative(_Derivative):
                 weights = array(
                     [3, -32, 168, -672, 0, 672, -168, 32, -3]) / 840.0
             else:
-                weights = self.central_diff_weights(order, 1)
+                weights = NDerivative.central_diff_weights(order, 1)
         elif n == 2:
             if order == 3:
                 weights = array([1, -2.0, 1])
@@ -406,16 +753,23 @@ class NDerivative(_Derivative):
                 weights = array([-9, 128, -1008, 8064, -14350,
                                  8064, -1008, 128, -9]) / 5040.0
             else:
-                weights = self.central_diff_weights(order, 2)
+                weights = NDerivative.central_diff_weights(order, 2)
         else:
-            weights = self.central_diff_weights(order, n)
+            weights = NDerivative.central_diff_weights(order, n)
         return weights
 
+    def _stencil(self):
+        if self.method != 'central':
+            return None
+        ho = self.order >> 1
+        return np.arange(-ho, ho + 1.0), self.weights
+
     def _central(self, f, x0, dx, *args, **kwds):
         val = 0.0
         ho = self.order >> 1
-        for k, w in enumerate(self.weights):
-            val += w * f(x0 + (k - ho) * dx, *args, **kwds)
+        points = [x0 + (k - ho) * dx for k in range(len(self.weights))]
+        for w, f_k in zip(self.weights, self._map(f, points, *args, **kwds)):
+            val += w * f_k
         return val / np.product((dx,) * self.n, axis=0)
 
 
@@ -427,6 +781,7 @@ class Derivative(_Derivative):
         scale_complex=str(_Derivative.default_scale('complex')),
         scale_forward=str(_Derivative.default_scale('forward')),
         extra_method="",
+        extra_parameters="",
         extra_note='', returns="""
     Returns
     -------
@@ -453,18 +808,30 @@ class Derivative(_Derivative):
     Hessian
     """)
 
+    _stencils = dict(central=([1., -1.], [0.5, -0.5]),
+                     forward=([1., 0.], [1., -1.]),
+                     backward=([0., -1.], [1., -1.]),
+                     complex=([1j], [1.]))
+
+    def _stencil(self):
+        offsets, weights = self._stencils[self.method]
+        return np.array(offsets), np.array(weights)
+
     def _central(self, f, x, h, *args, **kwds):
         h2 = h * 2
-        return (f(x + h, *args, **kwds) - f(x - h, *args, **kwds)) / h2
+        f_plus, f_minus = self._map(f, [x + h, x - h], *args, **kwds)
+        return (f_plus - f_minus) / h2
 
     def _forward(self, f, x, h, *args, **kwds):
-        return (f(x + h, *args, **kwds) - f(x, *args, **kwds)) / h
+        f_plus, f0 = self._map(f, [x + h, x], *args, **kwds)
+        return (f_plus - f0) / h
 
     def _backward(self, f, x, h, *args, **kwds):
-        return (f(x, *args, **kwds) - f(x - h, *args, **kwds)) / h
+        f0, f_minus = self._map(f, [x, x - h], *args, **kwds)
+        return (f0 - f_minus) / h
 
     def _complex(self, f, x, h, *args, **kwds):
-        return f(x + 1j * h, *args, **kwds).imag / h
+        return self._map(f, [x + 1j * h], *args, **kwds)[0].imag / h
 
 
 class Gradient(_Derivative):
@@ -475,6 +842,7 @@ class Gradient(_Derivative):
         scale_complex=str(_Derivative.default_scale('complex')),
         scale_forward=str(_Derivative.default_scale('forward')),
         extra_method="",
+        extra_parameters="",
         returns="""
     Returns
     -------
@@ -485,6 +853,8 @@ class Gradient(_Derivative):
     by f (e.g., with a value for each observation), it returns a 3d array
     with the Jacobian of each observation with shape xk x nobs x xk. I.e.,
     the Jacobian of the first observation would be [:, 0, :]
+    Use OuterProductGradient to get the sum of the outer products of the
+    scores of each observation without forming this array.
     """, example="""
     Examples
     --------
@@ -518,39 +888,72 @@ class Gradient(_Derivative):
     Derivative, Hessian, Jacobian
     """)
 
-    def _central(self, f, x, h, *args, **kwds):
-        n = len(x)
-        increments = np.identity(n) * h
-        h2 = h * 2.0
-        partials = [(f(x + hi, *args, **kwds) -
-                     f(x - hi, *args, **kwds)) / (h2[i])
-                    for i, hi in enumerate(increments)]
-        return np.array(partials).T
-
-    def _backward(self, f, x, epsilon, *args, **kwds):
-        n = len(x)
-        increments = np.identity(n) * epsilon
-        f0 = f(x, *args, **kwds)
-        partials = [(f0 - f(x - h, *args, **kwds)) / epsilon[i]
-                    for i, h in enumerate(increments)]
-        return np.array(partials).T
+    @staticmethod
+    def _points(x, increments, with_x=False):
+        ''' Generate x, if with_x, and x + increments[k][i] * e[i], all k, i
 
-    def _forward(self, f, x, epsilon, *args, **kwds):
+        The points are made one at a time, so they only need O(n) memory
+        instead of the dense n x n matrix of the increments.
+        '''
+        dtype = np.result_type(x, *increments)
+        if with_x:
+            yield x.astype(dtype)
+        for increment in increments:
+            for i in range(len(x)):
+                point = x.astype(dtype)
+                point[i] = x[i] + increment[i]
+                yield point
+
+    _uses_work = True
+
+    def _divide(self, work, fdel, h):
+        ''' Return fdel.T / h, written to the work array 'step'
+
+        The rows of fdel are divided one at a time, since numpy allocates
+        buffers for broadcast or transposed operands.
+        '''
+        step = self._work_array(work, 'step', fdel.T.shape,
+                                np.result_type(fdel, h))
+        for k in range(len(fdel)):
+            np.divide(fdel[k, ...].T, h[k], out=step[..., k])
+        return step
+
+    def _values(self, work, f, x, increments, with_x, *args, **kwds):
+        ''' Return array of the values of f at the points of _points '''
+        points = self._points(x, increments, with_x)
+        num_points = len(x) * len(increments) + with_x
+        return self._next_values(work, 'fval',
+                                 self._imap(f, points, *args, **kwds),
+                                 num_points)
+
+    def _central(self, f, x, h, *args, work=None, **kwds):
         n = len(x)
-        increments = np.identity(n) * epsilon
-        f0 = f(x, *args, **kwds)
-        partials = [(f(x + h, *args, **kwds) - f0) / epsilon[i]
-                    for i, h in enumerate(increments)]
-        return np.array(partials).T
-
-    def _complex(self, f, x, epsilon, *args, **kwds):
+        h2 = h * 2.0
+        fval = self._values(work, f, x, (h, -h), False, *args, **kwds)
+        fdel = self._work_array(work, 'fdel', fval[:n].shape, fval.dtype)
+        return self._divide(work, np.subtract(fval[:n], fval[n:], out=fdel),
+                            h2)
+
+    def _backward(self, f, x, epsilon, *args, work=None, **kwds):
+        fval = self._values(work, f, x, (-epsilon,), True, *args, **kwds)
+        fdel = self._work_array(work, 'fdel', fval[1:].shape, fval.dtype)
+        for k in range(len(fdel)):
+            np.subtract(fval[0], fval[k + 1], out=fdel[k, ...])
+        return self._divide(work, fdel, epsilon)
+
+    def _forward(self, f, x, epsilon, *args, work=None, **kwds):
+        fval = self._values(work, f, x, (epsilon,), True, *args, **kwds)
+        fdel = self._work_array(work, 'fdel', fval[1:].shape, fval.dtype)
+        for k in range(len(fdel)):
+            np.subtract(fval[k + 1], fval[0], out=fdel[k, ...])
+        return self._divide(work, fdel, epsilon)
+
+    def _complex(self, f, x, epsilon, *args, work=None, **kwds):
         # From Guilherme P. de Freitas, numpy mailing list
         # http://mail.scipy.org/pipermail/numpy-discussion/2010-May/050250.html
-        n = len(x)
-        increments = np.identity(n) * 1j * epsilon
-        partials = [f(x + ih, *args, **kwds).imag / epsilon[i]
-                    for i, ih in enumerate(increments)]
-        return np.array(partials).T
+        fval = self._values(work, f, x, (1j * epsilon,), False, *args,
+                            **kwds)
+        return self._divide(work, fval.imag, epsilon)
 
 
 class Jacobian(Gradient):
@@ -561,6 +964,7 @@ class Jacobian(Gradient):
         scale_complex=str(_Derivative.default_scale('complex')),
         scale_forward=str(_Derivative.default_scale('forward')),
         extra_method="",
+        extra_parameters="",
         returns="""
     Returns
     -------
@@ -571,6 +975,8 @@ class Jacobian(Gradient):
     by f (e.g., with a value for each observation), it returns a 3d array
     with the Jacobian of each observation with shape xk x nobs x xk. I.e.,
     the Jacobian of the first observation would be [:, 0, :]
+    Use OuterProductGradient to get the sum of the outer products of the
+    scores of each observation without forming this array.
     """, example='''
      Examples
     --------
@@ -599,6 +1005,121 @@ class Jacobian(Gradient):
     """)
 
 
+class OuterProductGradient(Gradient):
+    __doc__ = _cmn_doc % dict(
+        derivative='outer product of per-observation gradients (scores)',
+        scale_backward=str(_Derivative.default_scale('backward')),
+        scale_central=str(_Derivative.default_scale('central')),
+        scale_complex=str(_Derivative.default_scale('complex')),
+        scale_forward=str(_Derivative.default_scale('forward')),
+        extra_method="",
+        extra_parameters="""\
+    chunks : iterable
+        chunks of observations. f(x, chunk, *args, **kwds) must return the
+        value, e.g., the log-likelihood, of each observation in the chunk.
+""",
+        returns="""
+    Returns
+    -------
+    opg : ndarray
+        sum over the observations of the outer products of the scores, i.e.,
+        S' * S where S is the nobs x xk score matrix.
+    """, extra_note="""
+    The scores of one chunk of observations are computed at a time and added
+    to S' * S, so the memory used is bounded by the chunk size and neither
+    the score matrix nor the xk x nobs x xk array returned by Jacobian is
+    formed. The BHHH estimate of the covariance of the parameters is
+    inv(S' * S). The sum of the scores and the number of observations are
+    stored in the member variables score_sum and nobs.
+    """, example="""
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools.nd_cstep as ndc
+
+    # Log-likelihood of each observation of a normal distribution
+
+    >>> def loglike(x, y):
+    ...     mu, log_sigma = x
+    ...     return -0.5 * ((y - mu) / np.exp(log_sigma)) ** 2 - log_sigma
+    >>> y = np.random.RandomState(0).normal(1, 2, size=100000)
+    >>> chunks = (y[i:i + 10000] for i in range(0, y.size, 10000))
+    >>> opg_fun = ndc.OuterProductGradient(loglike)
+    >>> x = [np.mean(y), np.log(np.std(y))]
+    >>> opg = opg_fun(x, chunks)
+    >>> opg_fun.nobs
+    100000
+    >>> np.allclose(opg_fun.score_sum, 0, atol=1e-8)
+    True
+    >>> cov = np.linalg.inv(opg)
+    >>> np.allclose(np.sqrt(cov[0, 0]), np.std(y) / np.sqrt(y.size), rtol=1e-2)
+    True""", see_also="""
+    See also
+    --------
+    Gradient, Jacobian
+    """)
+
+    def __init__(self, f, steps=None, method='complex', full_output=False,
+                 scale=None, executor=None, batch=False, chunk_size=None):
+        super(OuterProductGradient, self).__init__(f, steps, method,
+                                                   full_output, scale,
+                                                   executor, batch, chunk_size)
+        self.nobs = 0
+        self.score_sum = None
+
+    def __call__(self, x, chunks, *args, out=None, err_out=None, **kwds):
+        xi = np.asarray(x)
+        opg, err = 0, 0
+        self.nobs, self.score_sum = 0, 0
+        for chunk in chunks:
+            scores, scores_err = self._chunk_scores(xi, chunk, *args, **kwds)
+            opg = opg + np.dot(scores.T, scores)
+            abs_scores = np.abs(scores)
+            err = err + (np.dot(abs_scores.T, scores_err) +
+                         np.dot(scores_err.T, abs_scores))
+            self.score_sum = self.score_sum + np.sum(scores, axis=0)
+            self.nobs += scores.shape[0]
+        self._check_out(np.shape(opg), out, err_out)
+        if out is not None:
+            out[...] = opg
+            opg = out
+        if err_out is not None:
+            err_out[...] = err
+            err = err_out
+        if self.full_output:
+            return opg, self.info(err, None)
+        return opg
+
+    def _chunk_scores(self, x, chunk, *args, **kwds):
+        ''' Return nobs x xk score matrix of one chunk and its error estimate
+        '''
+        derivative, f, steps = self._get_functions(self.method)
+        f_chunk = _ArgsFun(f, (chunk,) + args, kwds)
+        results = [derivative(f_chunk, x, h) for h in steps(x, self.scale)]
+        scores, info = self._extrapolate(results, with_error=True)
+        err = np.nan_to_num(info.error_estimate)
+        return scores.reshape(-1, x.size), err.reshape(-1, x.size)
+
+    def sandwich(self, x, chunks, hessian, *args, **kwds):
+        ''' Return sandwich covariance inv(H) * S' * S * inv(H)
+
+        Parameters
+        ----------
+        x : array_like
+            value at which the scores are evaluated
+        chunks : iterable
+            chunks of observations passed on to f.
+        hessian : array_like
+            Hessian matrix of the total objective sum(f(x, chunk)), e.g.,
+            computed with Hessian.
+        '''
+        opg = self(x, chunks, *args, **kwds)
+        if self.full_output:
+            opg = opg[0]
+        hess_inv = np.linalg.inv(hessian)
+        return np.dot(hess_inv, np.dot(opg, hess_inv))
+
+
 class _Hessian(_Derivative):
 
     @staticmethod
@@ -615,6 +1136,7 @@ class Hessian(_Hessian):
         scale_forward=str(_Hessian.default_scale('forward')),
         extra_method="'central2' : central difference derivative "
         "(scale=%s)" % _Hessian.default_scale('central2'),
+        extra_parameters="",
         returns="""
     Returns
     -------
@@ -667,86 +1189,145 @@ class Hessian(_Hessian):
     Derivative, Hessian
     """)
 
-    def _complex(self, f, x, h, *args, **kwargs):
+    _uses_work = True
+
+    @staticmethod
+    def _pairs(n):
+        ''' Generate the pairs (i, j), j >= i, of the upper triangle by row '''
+        return ((i, j) for i in range(n) for j in range(i, n))
+
+    def _map(self, f, points, *args, **kwds):
+        ''' Return vector of the scalar values of f at each of the points '''
+        fval = super(Hessian, self)._map(f, points, *args, **kwds)
+        return fval.reshape(len(fval))
+
+    @staticmethod
+    def _point(x, dtype, i, h_i, j=None, h_j=0):
+        ''' Return x + h_i * e[i] + h_j * e[j], made with O(n) memory '''
+        point = x.astype(dtype)
+        point[i] = x[i] + h_i
+        if j is not None:
+            point[j] = point[j] + h_j
+        return point
+
+    def _row(self, work, values, n, i, num_values):
+        ''' Return the values of the pairs of row i and a work array for it
+
+        The row has num_values values for each of the n - i pairs (i, j).
+        The values are taken from the iterator values and written to the
+        same work array for each row, so only O(n) values are stored. The
+        work array of n - i elements is for the numerator of the row.
+        '''
+        fval = self._next_values(work, 'fval', values, num_values * (n - i),
+                                 num_values * n)
+        num = self._work_array(work, 'num', (n,), fval.dtype)[:n - i]
+        return fval, num
+
+    def _steps_product(self, work, h, i, dtype):
+        ''' Return h[i:] * h[i] converted to dtype, in a work array '''
+        hh = self._work_array(work, 'hh', h.shape, dtype)[i:]
+        return np.multiply(h[i:], h[i], out=hh, casting='unsafe')
+
+    @staticmethod
+    def _set_row(hess, i, num, den):
+        ''' Set row and column i of the symmetric hess to num / den '''
+        np.divide(num, den, out=hess[i, i:])
+        hess[i:, i] = hess[i, i:]
+
+    def _complex(self, f, x, h, *args, work=None, **kwargs):
         '''Calculate Hessian with complex-step derivative approximation
         The stepsize is the same for the complex and the finite difference part
         '''
         # TODO: might want to consider lowering the step for pure derivatives
         n = len(x)
         # h = _default_base_step(x, 3, base_step, n)
-        ee = np.diag(h)
-        hess = 2. * np.outer(h, h)
-
+        ih = 1j * h
+        dtype = np.result_type(x, ih)
+        points = (self._point(x, dtype, i, ih[i], j, sign * h[j])
+                  for i, j in self._pairs(n) for sign in (1, -1))
+        values = self._imap(f, points, *args, **kwargs)
+        hess = self._work_array(work, 'step', (n, n), h.dtype)
         for i in range(n):
-            for j in range(i, n):
-                hess[i, j] = (f(x + 1j * ee[i, :] + ee[j, :], *args,
-                                **kwargs) -
-                              f(*((x + 1j * ee[i, :] - ee[j, :],) + args),
-                                  **kwargs)).imag / hess[j, i]
-                hess[j, i] = hess[i, j]
+            fval, num = self._row(work, values, n, i, 2)
+            np.subtract(fval[0::2], fval[1::2], out=num)
+            den = self._steps_product(work, h, i, h.dtype)
+            den *= 2.
+            self._set_row(hess, i, num.imag, den)
         return hess
 
-    def _central(self, f, x, h, *args, **kwargs):
+    def _central(self, f, x, h, *args, work=None, **kwargs):
         '''Eq 9.'''
         n = len(x)
         # h = _default_base_step(x, 4, base_step, n)
-        ee = np.diag(h)
-        hess = np.outer(h, h)
-
+        dtype = np.result_type(x, h)
+        points = (self._point(x, dtype, i, sign_i * h[i], j, sign_j * h[j])
+                  for i, j in self._pairs(n) for sign_i in (1, -1)
+                  for sign_j in (1, -1))
+        values = self._imap(f, points, *args, **kwargs)
         for i in range(n):
-            for j in range(i, n):
-                hess[i, j] = (f(x + ee[i, :] + ee[j, :], *args, **kwargs) -
-                              f(x + ee[i, :] - ee[j, :], *args, **kwargs) -
-                              f(x - ee[i, :] + ee[j, :], *args, **kwargs) +
-                              f(x - ee[i, :] - ee[j, :], *args, **kwargs)
-                              ) / (4. * hess[j, i])
-                hess[j, i] = hess[i, j]
+            fval, num = self._row(work, values, n, i, 4)
+            if i == 0:
+                hess = self._work_array(work, 'step', (n, n),
+                                        np.result_type(fval, h))
+            np.subtract(fval[0::4], fval[1::4], out=num)
+            num -= fval[2::4]
+            num += fval[3::4]
+            den = self._steps_product(work, h, i, h.dtype)
+            den *= 4.
+            self._set_row(hess, i, num, den)
         return hess
 
-    def _central2(self, f, x, h, *args, **kwargs):
+    def _central2(self, f, x, h, *args, work=None, **kwargs):
         '''Eq. 8'''
         n = len(x)
         # NOTE: ridout suggesting using eps**(1/4)*theta
         # h = _default_base_step(x, 3, base_step, n)
-        ee = np.diag(h)
-        f0 = f(x, *args, **kwargs)
+        xdtype = np.result_type(x, h)
+        points = chain([x], (self._point(x, xdtype, i, sign * h[i])
+                             for sign in (1, -1) for i in range(n)),
+                       (self._point(x, xdtype, i, sign * h[i], j, sign * h[j])
+                        for i, j in self._pairs(n) for sign in (1, -1)))
+        values = self._imap(f, points, *args, **kwargs)
+        first = self._next_values(work, 'first', values, 2 * n + 1)
+        f0 = first[0]
         dtype = np.result_type(f0)
-        g = np.empty(n, dtype=dtype)
-        gg = np.empty(n, dtype=dtype)
-        for i in range(n):
-            g[i] = f(x + ee[i, :], *args, **kwargs)
-            gg[i] = f(x - ee[i, :], *args, **kwargs)
-
-        hess = np.empty((n, n), dtype=dtype)
-        np.outer(h, h, out=hess)
+        g, gg = first[1:n + 1], first[n + 1:2 * n + 1]
+        hess = self._work_array(work, 'step', (n, n), dtype)
         for i in range(n):
-            for j in range(i, n):
-                hess[i, j] = (f(x + ee[i, :] + ee[j, :], *args, **kwargs) -
-                              g[i] - g[j] + f0 +
-                              f(x - ee[i, :] - ee[j, :], *args, **kwargs) -
-                              gg[i] - gg[j] + f0) / (2 * hess[j, i])
-                hess[j, i] = hess[i, j]
-
+            fval, num = self._row(work, values, n, i, 2)
+            np.subtract(fval[0::2], g[i], out=num)
+            num -= g[i:]
+            num += f0
+            num += fval[1::2]
+            num -= gg[i]
+            num -= gg[i:]
+            num += f0
+            den = self._steps_product(work, h, i, dtype)
+            den *= 2
+            self._set_row(hess, i, num, den)
         return hess
 
-    def _forward(self, f, x, h, *args, **kwargs):
+    def _forward(self, f, x, h, *args, work=None, **kwargs):
         '''Eq. 7'''
         n = len(x)
-        ee = np.diag(h)
-
-        f0 = f(x, *args, **kwargs)
+        xdtype = np.result_type(x, h)
+        points = chain([x],
+                       (self._point(x, xdtype, i, h[i]) for i in range(n)),
+                       (self._point(x, xdtype, i, h[i], j, h[j])
+                        for i, j in self._pairs(n)))
+        values = self._imap(f, points, *args, **kwargs)
+        first = self._next_values(work, 'first', values, n + 1)
+        f0 = first[0]
         dtype = np.result_type(f0)
-        g = np.empty(n, dtype=dtype)
-        for i in range(n):
-            g[i] = f(x + ee[i, :], *args, **kwargs)
-
-        hess = np.empty((n, n), dtype=dtype)
-        np.outer(h, h, out=hess)
+        g = first[1:n + 1]
+        hess = self._work_array(work, 'step', (n, n), dtype)
         for i in range(n):
-            for j in range(i, n):
-                hess[i, j] = (f(x + ee[i, :] + ee[j, :], *args, **kwargs) -
-                              g[i] - g[j] + f0) / hess[j, i]
-                hess[j, i] = hess[i, j]
+            fval, num = self._row(work, values, n, i, 1)
+            np.subtract(fval, g[i], out=num)
+            num -= g[i:]
+            num += f0
+            den = self._steps_product(work, h, i, dtype)
+            self._set_row(hess, i, num, den)
         return hess
 
     def _backward(self, f, x, h, *args, **kwargs):
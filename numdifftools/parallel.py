@@ -0,0 +1,241 @@
+"""Process pool evaluation of functions at points held in shared memory
+
+Author : pbrod
+License : BSD
+Notes
+-----
+Threads do not speed up pure Python functions that hold the GIL. The
+SharedMemoryExecutor evaluates them in a pool of worker processes instead.
+It has the map method of a concurrent.futures.Executor, so it can be given
+as the executor of the derivative classes in numdifftools.core and
+numdifftools.nd_cstep, which are picklable.
+
+The points are copied one by one from the iterator into a shared memory
+block, and each worker gets a chunk of consecutive points to evaluate, not
+single points.
+The workers write the function values into a shared output array, so
+neither the points nor the values are pickled. Only the function, e.g., a
+derivative object holding the user function, is pickled once for each
+chunk. The function must therefore be picklable, e.g., a function defined at
+module level.
+"""
+from __future__ import division, print_function
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+import numpy as np
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+__all__ = ['SharedMemoryExecutor']
+
+
+def _attach(spec):
+    ''' Return shared memory block and array view given by spec '''
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _eval_chunk(fun, in_spec, out_spec, start, stop):
+    ''' Evaluate fun at the points start, ..., stop-1 in shared memory
+
+    The values are written to the shared output array. If out_spec is None,
+    or if the values do not fit into the output array, the values are
+    returned instead.
+    '''
+    shm_in, points = _attach(in_spec)
+    try:
+        values = [fun(points[k].copy()) for k in range(start, stop)]
+    finally:
+        del points
+        shm_in.close()
+    if out_spec is None:
+        return values
+    shm_out, out = _attach(out_spec)
+    try:
+        if not all(np.shape(value) == out.shape[1:] and
+                   np.can_cast(np.result_type(value), out.dtype)
+                   for value in values):
+            return values
+        for k, value in enumerate(values):
+            out[start + k] = value
+    finally:
+        del out
+        shm_out.close()
+
+
+def _create(shape, dtype):
+    ''' Return new shared memory block, its array view and its spec '''
+    dtype = np.dtype(dtype)
+    nbytes = max(int(np.prod(shape)) * dtype.itemsize, 1)
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return shm, array, (shm.name, shape, dtype.str)
+
+
+def _release(shm):
+    shm.close()
+    shm.unlink()
+
+
+class SharedMemoryExecutor(object):
+    '''
+    Process pool evaluating a function at points held in shared memory
+
+    Parameters
+    ----------
+    max_workers : scalar integer, optional
+        number of worker processes. The default is the number of CPUs.
+    chunksize : scalar integer, optional
+        number of points evaluated by a worker in one task. The default
+        divides each block into 4 chunks per worker.
+    block_size : scalar integer
+        maximum number of points in shared memory at a time. The points are
+        generated on demand, so a Hessian of many variables does not need
+        memory for all of its points at once. The first block holds 4 points
+        per worker, and each next block twice as many, up to block_size.
+    mp_context : multiprocessing context, optional
+        context used to start the worker processes.
+
+    Notes
+    -----
+    The map method returns the values in the order of the points, so the
+    derivatives are identical to the ones computed serially. The workers
+    return the values of the first block, which give the shape and type of
+    the values. The values of the next blocks are written directly to a
+    shared output array.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools as nd
+    >>> from numdifftools.parallel import SharedMemoryExecutor
+
+    # The function must be picklable, e.g., defined at module level
+
+    >>> with SharedMemoryExecutor(max_workers=2) as executor:
+    ...     hess = nd.Hessian(np.prod, executor=executor)([1., 2., 3.])
+    >>> np.allclose(hess, [[0, 3, 2], [3, 0, 1], [2, 1, 0]])
+    True
+
+    See also
+    --------
+    concurrent.futures.ProcessPoolExecutor
+    '''
+
+    def __init__(self, max_workers=None, chunksize=None, block_size=2 ** 16,
+                 mp_context=None):
+        if shared_memory is None:
+            raise ImportError('SharedMemoryExecutor needs '
+                              'multiprocessing.shared_memory (python >= 3.8)')
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+        self.block_size = block_size
+        self._pool = ProcessPoolExecutor(max_workers, mp_context=mp_context)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        return False
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait)
+
+    def _get_chunksize(self, num_points):
+        if self.chunksize is not None:
+            return self.chunksize
+        return max(-(-num_points // (4 * self.max_workers)), 1)
+
+    def map(self, fun, points):
+        ''' Return iterator over fun evaluated at each of the points '''
+        points = iter(points)
+        point = next(points, None)
+        blocks = []
+        value0 = None
+        capacity = min(4 * self.max_workers, self.block_size)
+        while point is not None:
+            values, point = self._map_block(fun, point, points, capacity,
+                                            value0)
+            if value0 is None:
+                value0 = np.asarray(values[0])
+            blocks.append(values)
+            if point is None:
+                point = next(points, None)
+            capacity = min(2 * capacity, self.block_size)
+        return chain.from_iterable(blocks)
+
+    @staticmethod
+    def _fill(rows, point, points):
+        ''' Copy point and the next points into rows, one at a time
+
+        Returns the number of rows filled and the point starting the next
+        block, if it does not fit into rows, or None.
+        '''
+        rows[0] = point
+        num_points = 1
+        for point in islice(points, rows.shape[0] - 1):
+            point = np.asarray(point)
+            if (point.shape != rows.shape[1:] or
+                    not np.can_cast(point.dtype, rows.dtype)):
+                return num_points, point
+            rows[num_points] = point
+            num_points += 1
+        return num_points, None
+
+    def _map_block(self, fun, point, points, capacity, value0=None):
+        ''' Return values of fun at a block of points and the next point
+
+        The values are returned by the workers if value0, the first value of
+        fun, is None. Otherwise they are written to a shared array of the
+        shape and type of value0.
+        '''
+        point = np.asarray(point)
+        shm_in, rows, in_spec = _create((capacity,) + point.shape,
+                                        point.dtype)
+        try:
+            num_points, point = self._fill(rows, point, points)
+            chunksize = self._get_chunksize(num_points)
+            bounds = [(start, min(start + chunksize, num_points))
+                      for start in range(0, num_points, chunksize)]
+            if value0 is None:
+                tasks = [self._pool.submit(_eval_chunk, fun, in_spec, None,
+                                           start, stop)
+                         for start, stop in bounds]
+                return [value for task in tasks
+                        for value in task.result()], point
+            shape = (num_points,) + value0.shape
+            shm_out, out, out_spec = _create(shape, value0.dtype)
+            try:
+                tasks = [self._pool.submit(_eval_chunk, fun, in_spec,
+                                           out_spec, start, stop)
+                         for start, stop in bounds]
+                results = [task.result() for task in tasks]
+                values = out.copy()
+            finally:
+                del out
+                _release(shm_out)
+        finally:
+            del rows
+            _release(shm_in)
+        if any(result is not None for result in results):
+            values = list(values)
+            for (start, stop), result in zip(bounds, results):
+                if result is not None:
+                    values[start:stop] = result
+        return values, point
+
+
+def test_docstrings():
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
+
+
+if __name__ == '__main__':
+    test_docstrings()
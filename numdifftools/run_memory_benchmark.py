@@ -0,0 +1,80 @@
+"""Peak memory of the nd_cstep Gradient, Jacobian and Hessian versus size
+
+The perturbed points are made one at a time, so the peak memory grows as
+O(N) and not as the O(N**2) of a dense matrix of the increments. The
+Hessian evaluates the pairs row by row, so its peak memory beyond the
+N x N result grows as O(N). Run with
+
+    python -m numdifftools.run_memory_benchmark
+"""
+from __future__ import print_function
+import tracemalloc
+import warnings
+import numpy as np
+from collections import OrderedDict
+import numdifftools.nd_cstep as ndc
+from numdifftools.nd_cstep import StepsGenerator
+
+steps = StepsGenerator(num_steps=2)
+problem_sizes = [250, 500, 1000, 2000, 4000]
+hessian_sizes = [25, 50, 100, 200]
+
+
+def fun(x):
+    return np.sum(np.sin(x))
+
+
+def vec_fun(x):
+    return np.sin(x[:3]) * np.sum(x)
+
+
+derivative_funs = OrderedDict()
+for method in ['central', 'forward', 'backward', 'complex']:
+    derivative_funs['gradient_' + method] = (
+        ndc.Gradient(fun, method=method, steps=steps))
+derivative_funs['jacobian_central'] = ndc.Jacobian(vec_fun, method='central',
+                                                   steps=steps)
+
+hessian_funs = OrderedDict()
+for method in ['central', 'central2', 'forward', 'complex']:
+    hessian_funs['hessian_' + method] = ndc.Hessian(fun, method=method)
+
+
+def peak_memory(derivative, x):
+    ''' Return peak memory in bytes allocated by derivative(x) '''
+    tracemalloc.start()
+    try:
+        derivative(x)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    warnings.simplefilter('ignore', FutureWarning)
+    for derivative in derivative_funs.values():
+        derivative(np.linspace(0.1, 1, 10))  # warm up
+    print('peak memory [kB] (bytes per variable)')
+    print('%6s' % 'N' + ''.join('%26s' % key for key in derivative_funs))
+    for N in problem_sizes:
+        x = np.linspace(0.1, 1, N)
+        peaks = [peak_memory(derivative, x)
+                 for derivative in derivative_funs.values()]
+        print('%6d' % N + ''.join('%18d (%5d)' % (peak // 1024, peak // N)
+                                  for peak in peaks))
+    print('A dense N x N matrix of floats would need %d kB for N = %d' %
+          (8 * problem_sizes[-1] ** 2 // 1024, problem_sizes[-1]))
+    for derivative in hessian_funs.values():
+        derivative(np.linspace(0.1, 1, 10))  # warm up
+    print('\npeak memory beyond the N x N Hessian [kB] (bytes per variable)')
+    print('%6s' % 'N' + ''.join('%26s' % key for key in hessian_funs))
+    for N in hessian_sizes:
+        x = np.linspace(0.1, 1, N)
+        peaks = [peak_memory(derivative, x) - 8 * N ** 2
+                 for derivative in hessian_funs.values()]
+        print('%6d' % N + ''.join('%18d (%5d)' % (peak // 1024, peak // N)
+                                  for peak in peaks))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,484 @@
+"""Finite difference derivatives of sampled data
+
+Author : pbrod
+License : BSD
+Notes
+-----
+The derivative of a sampled signal is the correlation of the samples with the
+finite difference weights of a stencil. For equidistant samples the interior
+weights are the central difference weights of nd_cstep.NDerivative, and the
+first and last samples use one-sided Fornberg weights with the same number
+of points. For unevenly spaced samples the weights of each sample are
+computed from its neighbours with Fornberg's recursion.
+
+The data are processed in chunks along the axis, each chunk extended with a
+halo of neighbouring samples, so arrays larger than memory, e.g., np.memmap
+arrays, can be differentiated into a memory mapped output. Wide stencils are
+applied with FFT convolution.
+"""
+from __future__ import division, print_function
+import numpy as np
+from numdifftools.fornberg import fd_weights, _fd_weights_all
+from numdifftools.core import _dea3_into
+from numdifftools.nd_cstep import NDerivative
+
+__all__ = ['derivative', 'iter_derivative', 'OnlineDerivative']
+
+
+def _default_num_points(n):
+    '''Return smallest odd number of points for the n'th derivative'''
+    return n + 1 + n % 2
+
+
+def _uniform_rule(n, num_points, dx):
+    '''Return interior, start and end weights of equidistant samples
+
+    start_weights[i] is for sample i using samples 0, ..., num_points-1 and
+    end_weights[k] is for sample N-ho+k using the last num_points samples.
+    '''
+    ho = num_points // 2
+    offsets = np.arange(num_points, dtype=float)
+    weights = NDerivative._weights(n, num_points)
+    start_weights = [fd_weights(offsets - i, 0, n) for i in range(ho)]
+    end_weights = [fd_weights(offsets - (num_points - ho + k), 0, n)
+                   for k in range(ho)]
+    scale = float(dx) ** n
+    return (weights / scale, np.reshape(start_weights, (ho, -1)) / scale,
+            np.reshape(end_weights, (ho, -1)) / scale)
+
+
+def _correlate(block, weights, fft_min_points):
+    '''Return sum(weights[j] * block[i + j]) along the first axis'''
+    num_points = len(weights)
+    num_out = block.shape[0] - num_points + 1
+    if num_points >= fft_min_points:
+        nfft = block.shape[0] + num_points - 1
+        kernel = np.fft.rfft(weights[::-1], nfft)
+        kernel = kernel.reshape((-1,) + (1,) * (block.ndim - 1))
+        full = np.fft.irfft(np.fft.rfft(block, nfft, axis=0) * kernel, nfft,
+                            axis=0)
+        return full[num_points - 1:num_points - 1 + num_out]
+    out = weights[0] * block[:num_out]
+    for j in range(1, num_points):
+        out += weights[j] * block[j:j + num_out]
+    return out
+
+
+def _uniform_block(block, first, start, stop, num_samples, rule,
+                   fft_min_points):
+    '''Return derivative of equidistant samples start, ..., stop-1
+
+    block holds the samples first, first+1, ... along the first axis. If
+    num_samples is None the end of the data is not known yet, and all the
+    requested samples must have a full halo.
+    '''
+    weights, start_weights, end_weights = rule
+    num_points = len(weights)
+    ho = num_points // 2
+    out = np.empty((stop - start,) + block.shape[1:])
+    lo = min(max(start, ho), stop)
+    hi = stop if num_samples is None else max(min(stop, num_samples - ho), lo)
+    if hi > lo:
+        out[lo - start:hi - start] = _correlate(
+            block[lo - ho - first:hi + ho - first], weights, fft_min_points)
+    for i in range(start, lo):
+        out[i - start] = np.tensordot(start_weights[i],
+                                      block[-first:num_points - first], 1)
+    for i in range(hi, stop):
+        k = i - (num_samples - ho)
+        out[i - start] = np.tensordot(
+            end_weights[k],
+            block[num_samples - num_points - first:num_samples - first], 1)
+    return out
+
+
+def _nonuniform_block(block, x, first, start, stop, n, num_points):
+    '''Return derivative of unevenly spaced samples start, ..., stop-1
+
+    x holds all the sample locations, and block the samples first, first+1,
+    ... along the first axis.
+    '''
+    ho = num_points // 2
+    index = np.arange(start, stop)
+    window_start = np.clip(index - ho, 0, len(x) - num_points)
+    window = window_start[:, np.newaxis] + np.arange(num_points)
+    x_window = np.asarray(x[window_start[0]:window_start[-1] + num_points],
+                          dtype=float)[window - window_start[0]]
+    offsets = x_window - np.asarray(x[start:stop], dtype=float)[:, np.newaxis]
+    weights = _fd_weights_all(offsets, 0.0, n)[:, n, :]
+    samples = block[window - first]
+    return np.einsum('ij,ij...->i...', weights, samples)
+
+
+def derivative(y, dx=1.0, n=1, num_points=None, axis=0, x=None, out=None,
+               chunk_size=2 ** 16, fft_min_points=33):
+    '''
+    Return n'th derivative of sampled data along an axis
+
+    Parameters
+    ----------
+    y : array_like
+        samples. It may be a np.memmap, which is then read chunk by chunk.
+    dx : real scalar
+        spacing of equidistant samples.
+    n : scalar integer
+        derivative order.
+    num_points : odd scalar integer, optional
+        number of points in the stencil. The default is the smallest odd
+        number larger than n, which gives accuracy of order 2 for equidistant
+        samples.
+    axis : scalar integer
+        axis of y to differentiate along.
+    x : vector, optional
+        locations of unevenly spaced samples along axis. If given, dx is
+        ignored and the weights of each sample are computed with Fornberg's
+        recursion from its num_points nearest neighbours.
+    out : ndarray, optional
+        array with the same shape as y where the derivative is written, e.g.,
+        a np.memmap opened in mode 'w+'.
+    chunk_size : scalar integer
+        number of samples along axis processed at a time.
+    fft_min_points : scalar integer
+        stencils with at least this number of points are applied with FFT
+        convolution.
+
+    Returns
+    -------
+    out : ndarray
+        n'th derivative of y along axis.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools.sampled as nds
+    >>> x = np.linspace(0, 2 * np.pi, 10001)
+    >>> dy = nds.derivative(np.sin(x), dx=x[1] - x[0], num_points=5,
+    ...                     chunk_size=1000)
+    >>> np.allclose(dy, np.cos(x))
+    True
+
+    # Unevenly spaced samples
+
+    >>> x = np.sort(np.random.RandomState(0).uniform(0, 1, 1001))
+    >>> d2y = nds.derivative(x ** 3, n=2, x=x, num_points=5)
+    >>> np.allclose(d2y, 6 * x)
+    True
+
+    See also
+    --------
+    iter_derivative
+    '''
+    if num_points is None:
+        num_points = _default_num_points(n)
+    y_axis = np.moveaxis(y, axis, 0)
+    num_samples = y_axis.shape[0]
+    if num_samples < num_points:
+        raise ValueError('y must have at least num_points samples along axis!')
+    if out is None:
+        out = np.empty(np.shape(y))
+    out_axis = np.moveaxis(out, axis, 0)
+    if x is None:
+        rule = _uniform_rule(n, num_points, dx)
+    elif len(x) != num_samples:
+        raise ValueError('x must have one location for each sample!')
+
+    for start in range(0, num_samples, chunk_size):
+        stop = min(start + chunk_size, num_samples)
+        first = max(start - num_points, 0)
+        block = np.asarray(y_axis[first:min(stop + num_points, num_samples)],
+                           dtype=float)
+        if x is None:
+            out_axis[start:stop] = _uniform_block(block, first, start, stop,
+                                                  num_samples, rule,
+                                                  fft_min_points)
+        else:
+            out_axis[start:stop] = _nonuniform_block(block, x, first, start,
+                                                     stop, n, num_points)
+    return out
+
+
+def iter_derivative(chunks, dx=1.0, n=1, num_points=None, axis=0,
+                    fft_min_points=33):
+    '''
+    Return generator of the n'th derivative of chunks of equidistant samples
+
+    Parameters
+    ----------
+    chunks : iterable
+        consecutive chunks of samples along axis, e.g., read from a file or
+        a live feed.
+    dx, n, num_points, axis, fft_min_points :
+        see derivative.
+
+    Yields
+    ------
+    der : ndarray
+        the derivative of the next samples along axis. The derivative of a
+        sample is yielded when num_points // 2 samples after it have been
+        received, and the last ones when chunks is exhausted. The yielded
+        chunks add up to the same number of samples as the input chunks.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools.sampled as nds
+    >>> x = np.linspace(0, 1, 1001)
+    >>> chunks = (x[i:i + 100] ** 2 for i in range(0, 1001, 100))
+    >>> dy = np.hstack(list(nds.iter_derivative(chunks, dx=0.001)))
+    >>> np.allclose(dy, 2 * x)
+    True
+
+    See also
+    --------
+    derivative
+    '''
+    if num_points is None:
+        num_points = _default_num_points(n)
+    rule = _uniform_rule(n, num_points, dx)
+    ho = num_points // 2
+    buffer, first, done = None, 0, 0
+    for chunk in chunks:
+        chunk = np.moveaxis(np.asarray(chunk, dtype=float), axis, 0)
+        buffer = chunk if buffer is None else np.concatenate((buffer, chunk))
+        stop = first + buffer.shape[0] - ho
+        if stop > done and first + buffer.shape[0] >= num_points:
+            yield np.moveaxis(_uniform_block(buffer, first, done, stop, None,
+                                             rule, fft_min_points), 0, axis)
+            done = stop
+            # keep the samples needed by the halo of the next samples
+            keep = max(first, done - num_points)
+            buffer, first = buffer[keep - first:], keep
+    if buffer is None:
+        return
+    num_samples = first + buffer.shape[0]
+    if num_samples < num_points:
+        raise ValueError('chunks must have at least num_points samples!')
+    yield np.moveaxis(_uniform_block(buffer, first, done, num_samples,
+                                     num_samples, rule, fft_min_points),
+                      0, axis)
+
+
+class OnlineDerivative(object):
+    '''
+    Derivative of the newest samples of many channels of a live feed
+
+    Parameters
+    ----------
+    num_channels : scalar integer
+        number of channels.
+    dx : real scalar
+        spacing of the equidistant samples.
+    n : scalar integer
+        derivative order.
+    num_points : scalar integer, optional
+        number of points in each stencil. The default is the smallest odd
+        number larger than n.
+    method : {'central', 'backward'}
+        'backward' gives the derivative at the newest sample. 'central' gives
+        the more accurate derivative at the sample lag samples before the
+        newest one.
+
+    Member variables
+    ----------------
+    lag : scalar integer
+        number of samples between the newest sample and the sample the
+        derivatives belong to.
+    count : scalar integer
+        number of samples received.
+    error_estimate : ndarray
+        error estimate of the last derivatives returned by update.
+
+    Notes
+    -----
+    The last samples of each channel are kept in a ring buffer of fixed
+    size, allocated once. For each new sample the derivative is computed
+    with the stencil of num_points samples spaced 4, 2 and 1 samples apart,
+    and the three estimates are extrapolated with dea3, which also gives the
+    error estimate. Where the extrapolated value is further from the
+    estimate with the smallest spacing than the two finest estimates are
+    from each other, the extrapolation has failed and the estimate with the
+    smallest spacing is returned instead. The central weights are those of
+    nd_cstep.NDerivative and the backward weights are one-sided Fornberg
+    weights. Thus the work per sample is constant and vectorized across the
+    channels. The work arrays are also allocated once, so update does not
+    allocate memory when it is given the output arrays. The derivatives of
+    the first samples, before the buffer holds a full stencil, are nan.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools.sampled as nds
+    >>> t = np.arange(0, 10, 0.01)
+    >>> omega = np.array([1.0, 2.0, 3.0])
+    >>> d = nds.OnlineDerivative(num_channels=3, dx=0.01, num_points=5)
+    >>> for ti in t:
+    ...     der = d.update(np.sin(omega * ti))
+    >>> true_der = omega * np.cos(omega * (t[-1] - d.lag * 0.01))
+    >>> np.allclose(der, true_der)
+    True
+    >>> bool(np.all(np.abs(der - true_der) <= d.error_estimate))
+    True
+
+    # Many samples of each channel at once
+
+    >>> d.reset()
+    >>> der = d.update(np.sin(omega * t[:, np.newaxis]))
+    >>> der.shape
+    (1000, 3)
+    >>> np.allclose(der[-1], omega * np.cos(omega * t[-1 - d.lag]))
+    True
+
+    See also
+    --------
+    iter_derivative, derivative
+    '''
+
+    def __init__(self, num_channels=1, dx=1.0, n=1, num_points=None,
+                 method='central'):
+        if num_points is None:
+            num_points = _default_num_points(n)
+        self.num_channels = num_channels
+        self.dx = dx
+        self.n = n
+        self.num_points = num_points
+        self.method = method
+        self._taps, self._weights, self.lag = self._get_rule()
+        span = self._taps.max() + 1
+        self._span = span
+        self._buffer = np.zeros((2 * span, num_channels))
+        self._allocate_work(span + 1)
+        self.reset()
+
+    def _allocate_work(self, max_block):
+        ''' Allocate the work arrays for blocks of at most max_block samples
+        '''
+        shape = (max_block, self.num_channels)
+        self._max_block = max_block
+        self._arange = np.arange(max_block)
+        self._newest = np.empty(max_block, dtype=np.intp)
+        self._index = np.empty((max_block, self._taps.size), dtype=np.intp)
+        self._gathered = np.empty((max_block, self._taps.size,
+                                   self.num_channels))
+        self._estimates = np.empty((3,) + shape)
+        self._work = np.empty((8,) + shape)
+        self._masks = np.empty((4,) + shape, dtype=bool)
+
+    def _get_rule(self):
+        ''' Return taps, weights and lag of the three stencils
+
+        The value of tap t is the sample t samples before the newest one, and
+        weights[s] are the weights of the stencil with spacing (4, 2, 1)[s].
+        '''
+        n, num_points = self.n, self.num_points
+        if self.method == 'central':
+            ho = num_points // 2
+            rule = NDerivative._weights(n, num_points)
+            lag = 4 * ho
+            offsets = np.arange(-ho, ho + 1)
+        elif self.method == 'backward':
+            if num_points < n + 1:
+                raise ValueError('num_points must be at least n + 1!')
+            offsets = -np.arange(num_points)
+            rule = fd_weights(offsets, 0, n)
+            lag = 0
+        else:
+            raise ValueError('method must be central or backward!')
+        taps, weights = [], np.zeros((3, 3 * num_points))
+        for s, spacing in enumerate((4, 2, 1)):
+            taps.append(lag - spacing * offsets)
+            weights[s, s * num_points:(s + 1) * num_points] = rule / (
+                spacing * self.dx) ** n
+        return np.hstack(taps), weights, lag
+
+    def reset(self):
+        ''' Forget all the samples received '''
+        self._buffer[:] = 0
+        self._pos = 0
+        self.count = 0
+        self.error_estimate = None
+
+    def _extrapolate(self, k, der, err):
+        ''' Write the derivatives and errors of the last k samples to der, err
+
+        Same as dea3 of the three estimates, followed by the fallback to the
+        finest estimate, but computed in place in the work arrays.
+        '''
+        e0, e1, e2 = self._estimates[:, :k]
+        work, masks = self._work[:, :k], self._masks[:, :k]
+        _dea3_into(e0, e1, e2, der, err, work, masks[:3])
+        err2, tmp, failed = work[2], work[7], masks[3]
+        # keep the finest estimate where the extrapolation fails
+        with np.errstate(invalid='ignore'):
+            np.abs(np.subtract(der, e2, out=tmp), out=tmp)
+        np.greater(tmp, err2, out=failed)
+        np.copyto(der, e2, where=failed)
+        np.copyto(err, err2, where=failed)
+
+    def update(self, samples, out=None, err_out=None):
+        ''' Add new samples and return the derivatives belonging to them
+
+        Parameters
+        ----------
+        samples : array_like
+            one new sample of each channel with shape (num_channels,), or k
+            new samples of each channel with shape (k, num_channels).
+        out, err_out : ndarrays, optional
+            arrays of the shape of samples to write the derivatives and the
+            error estimates to, instead of new arrays.
+
+        Returns
+        -------
+        der : ndarray
+            derivatives with the same shape as samples. der[i] belongs to the
+            sample lag samples before samples[i].
+        '''
+        samples = np.asarray(samples, dtype=float)
+        num_channels = self.num_channels
+        single = samples.shape == (num_channels,)
+        if not single and (samples.ndim != 2 or
+                           samples.shape[1] != num_channels):
+            raise ValueError('samples must have shape ({0},) or (k, {0}), '
+                             'not {1}'.format(num_channels, samples.shape))
+        der, err = [np.empty(samples.shape) if array is None else array
+                    for array in (out, err_out)]
+        for array in (der, err):
+            if array.shape != samples.shape:
+                raise ValueError('Output arrays must have shape {}, not '
+                                 '{}'.format(samples.shape, array.shape))
+        if single:
+            samples, der2d, err2d = samples[None], der[None], err[None]
+        else:
+            der2d, err2d = der, err
+        size = self._buffer.shape[0]
+        max_block = self._max_block
+        for start in range(0, samples.shape[0], max_block):
+            block = samples[start:start + max_block]
+            k = block.shape[0]
+            newest, index = self._newest[:k], self._index[:k]
+            np.add(self._arange[:k], self._pos, out=newest)
+            np.remainder(newest, size, out=newest)
+            self._buffer[newest] = block
+            np.subtract(newest[:, np.newaxis], self._taps, out=index)
+            np.remainder(index, size, out=index)
+            gathered = self._gathered[:k]
+            np.take(self._buffer, index, axis=0, out=gathered, mode='clip')
+            np.matmul(self._weights, gathered,
+                      out=self._estimates[:, :k].transpose(1, 0, 2))
+            stop = start + k
+            self._extrapolate(k, der2d[start:stop], err2d[start:stop])
+            num_missing = min(max(self._span - 1 - self.count, 0), k)
+            der2d[start:start + num_missing] = np.nan
+            err2d[start:start + num_missing] = np.nan
+            self._pos = (self._pos + k) % size
+            self.count += k
+        self.error_estimate = err
+        return der
+
+
+def test_docstrings():
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
+
+
+if __name__ == '__main__':
+    test_docstrings()
@@ -0,0 +1,261 @@
+"""Gradient and Hessian of partially separable functions
+
+Author : pbrod
+License : BSD
+Notes
+-----
+A partially separable function is a sum of element functions
+
+    f(x) = sum_k f_k(x[S_k])
+
+where each element function only depends on a few of the variables, given by
+the index set S_k. The gradient and Hessian of f are assembled from the
+gradients and Hessians of the elements, so the number of function
+evaluations scales with the total size of the elements, and not with the
+square of the number of variables. Elements of equal size that share the
+same element function are differentiated together, by perturbing the same
+local variable of all of them at once.
+"""
+from __future__ import division, print_function
+import numpy as np
+from scipy import sparse
+from numdifftools.core import Jacobian, _MixedDerivative
+
+__all__ = ['PartiallySeparable']
+
+
+class _ShiftedFun(object):
+    ''' Picklable function of the shift u returning fun(x0[:, k] + u) '''
+
+    def __init__(self, fun, x0, vectorized):
+        self.fun = fun
+        self.x0 = x0
+        self.vectorized = vectorized
+
+    def __call__(self, u):
+        fun, x0 = self.fun, self.x0
+        num_vars, num_elements = x0.shape
+        if self.vectorized:
+            u = np.asarray(u)
+            shifts = u.reshape(num_vars, 1, -1)
+            x = (x0[:, :, np.newaxis] + shifts).reshape(num_vars, -1)
+            fval = np.reshape(fun(x), (num_elements, -1))
+            return fval if u.ndim > 1 else fval.ravel()
+        return np.array([fun(x0[:, k] + u) for k in range(num_elements)],
+                        dtype=float)
+
+
+class _ElementHessians(_MixedDerivative):
+    ''' Hessian matrices of each output of a vector valued function
+
+    All the second order derivatives are computed from one shared tensor
+    product stencil, and each output and derivative is extrapolated
+    separately.
+    '''
+
+    def __init__(self, fun, **kwds):
+        super(_ElementHessians, self).__init__(fun, n=2, **kwds)
+
+    def __call__(self, x):
+        x0 = np.atleast_1d(np.asarray(x, dtype=float)).ravel()
+        nx = x0.size
+        self._set_romb_qr()
+        active = np.arange(nx)
+        steps, delta = self._get_step_matrix(x0, active)
+        num_steps = steps.shape[1]
+
+        indices, offsets, rules = self._get_shared_stencil(nx, 2)
+        num_points = offsets.shape[1]
+        fval = self._eval_points(self.fun, x0, active,
+                                 self._scale_offsets(offsets, steps))
+        num_funs = fval.shape[1]
+        fval = fval.reshape(num_steps, num_points, num_funs)
+
+        shape = (num_funs, nx, nx)
+        hess, err, final_delta = np.zeros(shape), np.zeros(shape), np.zeros(
+            shape)
+        for (i, j), (columns, weights) in zip(indices, rules):
+            der_init = np.einsum('j,kjf->fk', weights,
+                                 fval[:, columns]) / (steps[i] * steps[j])
+            for f in range(num_funs):
+                der_romb, errors, h2 = self._romb_extrap(der_init[f], delta)
+                hess[f, i, j], err[f, i, j], final_delta[f, i, j] = \
+                    self._best_der(der_romb, errors, h2)
+                hess[f, j, i], err[f, j, i], final_delta[f, j, i] = (
+                    hess[f, i, j], err[f, i, j], final_delta[f, i, j])
+        self.error_estimate = err
+        self.final_delta = final_delta
+        return hess
+
+
+class PartiallySeparable(object):
+    '''
+    Gradient and sparse Hessian of a partially separable function
+
+        f(x) = sum(element_funs[k](x[index_sets[k]]) for k in ...)
+
+    Parameters
+    ----------
+    element_funs : callable or list of callables
+        element functions. If only one function is given, it is used for all
+        the elements.
+    index_sets : list of integer sequences
+        indices of the variables of each element function.
+    vectorized : bool
+        If True, the element functions must accept an array of shape (s, m)
+        holding m points of size s as columns, and return m values. Then each
+        group of elements sharing the same function and size is evaluated in
+        one call for each step.
+    step_nom : vector, optional
+        nominal steps of the variables. The default is
+        maximum(log1p(abs(x)), 0.1). A group of elements uses the largest
+        nominal step of each of its local variables.
+    **kwds :
+        other options passed on to Jacobian, e.g., method, order,
+        romberg_terms, step_num, step_max and step_ratio.
+
+    Member variables
+    ----------------
+    error_estimate :
+        error estimate of the last gradient or Hessian, with the same shape.
+
+    Notes
+    -----
+    The element gradients are computed with Jacobian. For a group of K
+    elements of size s sharing the same function g, the Jacobian of the K
+    values g(x[S_k] + u) with respect to the common shift u is the K x s
+    matrix of element gradients. The element Hessians are computed from a
+    shared tensor product stencil in the same way. Thus a gradient costs
+    O(K * s) and a Hessian O(K * s**2) evaluations of g, and the global
+    gradient and Hessian are assembled by adding the element contributions.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools.separable as nds
+
+    # Chained Rosenbrock function with 999 elements of size 2
+
+    >>> n = 1000
+    >>> g = lambda z: (1 - z[0]) ** 2 + 100 * (z[1] - z[0] ** 2) ** 2
+    >>> index_sets = [[k, k + 1] for k in range(n - 1)]
+    >>> fun = nds.PartiallySeparable(g, index_sets, vectorized=True)
+    >>> x = np.ones(n)
+    >>> fun(x)
+    0.0
+    >>> np.allclose(fun.gradient(x), 0)
+    True
+    >>> hess = fun.hessian(x)
+    >>> hess.shape, hess.nnz
+    ((1000, 1000), 2998)
+    >>> np.allclose(hess[1, :3].toarray(), [[-400, 1002, -400]])
+    True
+    '''
+
+    def __init__(self, element_funs, index_sets, vectorized=False,
+                 step_nom=None, **kwds):
+        self.element_funs = element_funs
+        self.index_sets = index_sets
+        self.vectorized = vectorized
+        self.step_nom = step_nom
+        self.options = kwds
+        self.error_estimate = None
+
+    def _get_groups(self):
+        ''' Return list of (fun, index array of shape (s, K)) for each group
+        '''
+        funs = self.element_funs
+        if callable(funs):
+            funs = [funs] * len(self.index_sets)
+        if len(funs) != len(self.index_sets):
+            raise ValueError('element_funs and index_sets must have the same '
+                             'length.')
+        groups = {}
+        for fun, index in zip(funs, self.index_sets):
+            index = np.atleast_1d(np.asarray(index, dtype=int))
+            key = (id(fun), index.size)
+            groups.setdefault(key, (fun, []))[1].append(index)
+        return [(fun, np.array(indices).T)
+                for fun, indices in groups.values()]
+
+    def _shifted_fun(self, fun, x0):
+        ''' Return function of the shift u returning fun(x0[:, k] + u)
+
+        x0 holds the variables of the K elements as columns, and the returned
+        function returns the K element values.
+        '''
+        return _ShiftedFun(fun, x0, self.vectorized)
+
+    def _get_step_nom(self, x, index):
+        step_nom = self.step_nom
+        if step_nom is None:
+            step_nom = np.maximum(np.log1p(np.abs(x)), 0.1)
+        step_nom = np.ones(x.shape) * step_nom
+        return np.max(step_nom[index], axis=1)
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=float)
+        val = 0.0
+        for fun, index in self._get_groups():
+            if self.vectorized:
+                val += np.sum(fun(x[index]))
+            else:
+                val += sum(fun(x[index[:, k]]) for k in range(index.shape[1]))
+        return val
+
+    def gradient(self, x):
+        ''' Return gradient of the partially separable function at x
+        '''
+        x = np.asarray(x, dtype=float)
+        grad, err = np.zeros(x.shape), np.zeros(x.shape)
+        for fun, index in self._get_groups():
+            num_vars = index.shape[0]
+            jac_fun = Jacobian(self._shifted_fun(fun, x[index]),
+                               vectorized=self.vectorized,
+                               step_nom=self._get_step_nom(x, index),
+                               **self.options)
+            jac = jac_fun(np.zeros(num_vars))
+            np.add.at(grad, index.T, jac)
+            np.add.at(err, index.T, jac_fun.error_estimate)
+        self.error_estimate = err
+        return grad
+
+    def hessian(self, x):
+        ''' Return sparse Hessian matrix of the partially separable function
+
+        The Hessian is returned as a scipy.sparse.csr_matrix, and
+        error_estimate is a csr_matrix with the same sparsity pattern.
+        '''
+        x = np.asarray(x, dtype=float)
+        rows, cols, vals, errs = [], [], [], []
+        for fun, index in self._get_groups():
+            num_vars = index.shape[0]
+            hess_fun = _ElementHessians(self._shifted_fun(fun, x[index]),
+                                        vectorized=self.vectorized,
+                                        step_nom=self._get_step_nom(x, index),
+                                        **self.options)
+            hess = hess_fun(np.zeros(num_vars))
+            # hess[k, i, j] belongs to row index[i, k] and column index[j, k]
+            rows.append(np.broadcast_to(index.T[:, :, np.newaxis],
+                                        hess.shape).ravel())
+            cols.append(np.broadcast_to(index.T[:, np.newaxis, :],
+                                        hess.shape).ravel())
+            vals.append(hess.ravel())
+            errs.append(hess_fun.error_estimate.ravel())
+        rows, cols = np.hstack(rows), np.hstack(cols)
+        shape = (x.size, x.size)
+        hess = sparse.coo_matrix((np.hstack(vals), (rows, cols)),
+                                 shape=shape).tocsr()
+        self.error_estimate = sparse.coo_matrix((np.hstack(errs),
+                                                 (rows, cols)),
+                                                shape=shape).tocsr()
+        return hess
+
+
+def test_docstrings():
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
+
+
+if __name__ == '__main__':
+    test_docstrings()
@@ -0,0 +1,314 @@
+"""Spectral derivatives of smooth functions on an interval
+
+Author : pbrod
+License : BSD
+Notes
+-----
+The function is sampled once on a grid on [a, b] and replaced by a
+Chebyshev series (or a Fourier series if it is periodic). The number of
+terms is doubled until the coefficients have decayed to roundoff level.
+Derivatives of any order at any points in [a, b] are then obtained by
+differentiating the series, so the cost of many derivative evaluations is
+a few batched function evaluations plus cheap series arithmetic.
+"""
+from __future__ import division, print_function
+import warnings
+from collections import namedtuple
+import numpy as np
+from numpy.polynomial import chebyshev as _cheb
+
+_EPS = np.finfo(float).eps
+
+__all__ = ['Chebyshev', 'Fourier']
+
+
+def _chebyshev_coefficients(values):
+    '''Return Chebyshev coefficients from values at cos(pi * j / m)
+
+    The values are given at the m+1 Chebyshev points of the second kind,
+    j = 0, 1, ..., m, and the coefficients are computed with a DCT-I through
+    the FFT of the even extension of the values.
+    '''
+    m = len(values) - 1
+    ext = np.concatenate((values, values[-2:0:-1]))
+    coefs = np.fft.fft(ext)[:m + 1] / m
+    coefs[0] /= 2
+    coefs[-1] /= 2
+    if np.isrealobj(values):
+        return coefs.real
+    return coefs
+
+
+def _chebyshev_nodes(a, b, m):
+    '''Return the m+1 Chebyshev points on [a, b] and the ones that are new
+    compared with the grid for m/2'''
+    j = np.arange(m + 1)
+    nodes = 0.5 * (b + a) + 0.5 * (b - a) * np.cos(np.pi * j / m)
+    return nodes, j % 2 == 1
+
+
+def _chebyshev_tail_indices(coefs):
+    return slice(-max(len(coefs) // 8, 2), None)
+
+
+def _fourier_nodes(a, b, m):
+    '''Return the m equidistant points on [a, b) and the ones that are new
+    compared with the grid for m/2'''
+    j = np.arange(m)
+    return a + (b - a) * j / m, j % 2 == 1
+
+
+def _fourier_coefficients(values):
+    return np.fft.fft(values) / len(values)
+
+
+def _fourier_tail_indices(coefs):
+    m = len(coefs)
+    k = np.abs(np.fft.fftfreq(m, 1.0 / m))
+    return k >= 3 * m // 8
+
+
+class _Spectral(object):
+    '''Series fitted to samples of fun on grids that are refined by doubling
+
+    The series is given by the functions nodes(a, b, m), returning the m'th
+    grid and a mask of the nodes that are not in the grid for m/2,
+    coefficients(values), returning the series coefficients from the values
+    at the nodes, and tail_indices(coefs), returning the index of the
+    coefficients used to check the convergence.
+    '''
+    info = namedtuple('info', ['error_estimate', 'degree', 'function_count'])
+
+    def __init__(self, fun, a, b, n, tol, min_degree, max_degree, full_output,
+                 nodes, coefficients, tail_indices):
+        self.fun = fun
+        self.a = a
+        self.b = b
+        self.n = n
+        self.tol = tol
+        self.min_degree = min_degree
+        self.max_degree = max_degree
+        self.full_output = full_output
+        self.coefficients = None
+        self.function_count = 0
+        self._is_real = True
+        self._tail = None
+        self._nodes = nodes
+        self._coefficients = coefficients
+        self._tail_indices = tail_indices
+
+    def fit(self):
+        ''' Sample fun and compute the series coefficients
+
+        The number of grid intervals starts at min_degree and is doubled,
+        reusing the previous samples, until the last part of the coefficients
+        is below tol times the largest coefficient or max_degree is reached.
+        Call fit again if fun, a or b are changed.
+        '''
+        m = self.min_degree
+        nodes, _new = self._nodes(self.a, self.b, m)
+        values = self.fun(nodes)
+        self.function_count = nodes.size
+        while True:
+            coefs = self._coefficients(values)
+            scale = np.max(np.abs(coefs))
+            tail = np.abs(coefs[self._tail_indices(coefs)])
+            if np.max(tail) <= self.tol * scale or 2 * m > self.max_degree:
+                break
+            m = 2 * m
+            nodes, new = self._nodes(self.a, self.b, m)
+            new_values = self.fun(nodes[new])
+            self.function_count += new_values.size
+            tmp = np.zeros(nodes.shape, dtype=np.result_type(values,
+                                                             new_values))
+            tmp[new] = new_values
+            tmp[~new] = values
+            values = tmp
+        if np.max(tail) > self.tol * scale:
+            warnings.warn('The series did not converge for max_degree = %d! '
+                          'The function may not be smooth on [a, b].' % m)
+        self.coefficients = coefs
+        self._is_real = np.isrealobj(values)
+        self._tail = np.sum(tail) + len(coefs) * _EPS * scale
+        return self
+
+    def __call__(self, x):
+        if self.coefficients is None:
+            self.fit()
+        der, err = self._derivative(np.asarray(x, dtype=float), self.n)
+        if self.full_output:
+            return der, self.info(err, len(self.coefficients) - 1,
+                                  self.function_count)
+        return der
+
+
+class Chebyshev(_Spectral):
+    '''
+    Return n'th derivative of smooth function on [a, b] from Chebyshev series
+
+    Parameters
+    ----------
+    fun : callable
+        function to differentiate. It must be vectorized, i.e., accept
+        arrays of points in [a, b] and be evaluated elementwise.
+    a, b : real scalars
+        interval where fun is smooth.
+    n : scalar integer, optional
+        derivative order. 0 returns the interpolated function values.
+    tol : real scalar, optional
+        relative size of the last coefficients that stops the refinement.
+    min_degree, max_degree : scalar integers, optional
+        minimum and maximum degree of the Chebyshev series. The degree is
+        doubled from min_degree until the series has converged.
+    full_output : bool, optional
+        If `full_output` is False, only the derivative is returned.
+        If `full_output` is True, then (der, info) is returned, where `info`
+        is a namedtuple with the fields error_estimate, degree and
+        function_count.
+
+    Call Parameters
+    ---------------
+    x : array_like
+       points in [a, b] where the derivative is evaluated.
+
+    Returns
+    -------
+    der : ndarray
+       n'th derivative of fun at x.
+
+    Notes
+    -----
+    fun is sampled at the Chebyshev points of the second kind mapped to
+    [a, b], and the coefficients are computed with an FFT. Each doubling of
+    the degree reuses the previous samples, so the fit costs degree + 1
+    function evaluations in a few batched calls. The fit is done
+    on the first call and reused on subsequent calls.
+    The error estimate is the size of the neglected coefficients, and the
+    roundoff level, amplified by Markov's inequality for the n'th derivative
+    of a polynomial of the given degree.
+
+    References
+    ----------
+    Trefethen, L. N. (2013). Approximation Theory and Approximation Practice.
+    SIAM.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools.spectral as nds
+    >>> x = np.linspace(0, 2, 10001)
+    >>> d2f = nds.Chebyshev(np.exp, a=0, b=2, n=2)
+    >>> np.allclose(d2f(x), np.exp(x))
+    True
+    >>> d2f.function_count
+    17
+
+    See also
+    --------
+    Fourier
+    '''
+
+    def __init__(self, fun, a=-1, b=1, n=1, tol=100 * _EPS, min_degree=16,
+                 max_degree=2 ** 16, full_output=False):
+        super(Chebyshev, self).__init__(
+            fun, a, b, n, tol, min_degree, max_degree, full_output,
+            _chebyshev_nodes, _chebyshev_coefficients,
+            _chebyshev_tail_indices)
+
+    def _derivative(self, x, n):
+        scl = 2.0 / (self.b - self.a)
+        t = (2 * x - (self.b + self.a)) / (self.b - self.a)
+        coefs = self.coefficients
+        if n > 0:
+            coefs = _cheb.chebder(coefs, m=n, scl=scl)
+        degree = len(self.coefficients) - 1
+        # Markov's inequality for the n'th derivative of a polynomial
+        j = np.arange(n)
+        markov = np.prod((degree ** 2 - j ** 2) / (2.0 * j + 1)) * scl ** n
+        return _cheb.chebval(t, coefs), self._tail * markov
+
+
+class Fourier(_Spectral):
+    '''
+    Return n'th derivative of smooth periodic function from Fourier series
+
+    Parameters
+    ----------
+    fun : callable
+        function to differentiate. It must be vectorized and periodic with
+        period b - a.
+    a, b : real scalars
+        one period of fun.
+    n : scalar integer, optional
+        derivative order. 0 returns the interpolated function values.
+    tol : real scalar, optional
+        relative size of the last coefficients that stops the refinement.
+    min_degree, max_degree : scalar integers, optional
+        minimum and maximum number of sample points on [a, b). The number is
+        doubled from min_degree until the series has converged.
+    full_output : bool, optional
+        If `full_output` is False, only the derivative is returned.
+        If `full_output` is True, then (der, info) is returned, where `info`
+        is a namedtuple with the fields error_estimate, degree and
+        function_count.
+
+    Call Parameters
+    ---------------
+    x : array_like
+       points where the derivative is evaluated.
+
+    Returns
+    -------
+    der : ndarray
+       n'th derivative of fun at x.
+
+    Notes
+    -----
+    fun is sampled on an equidistant grid on [a, b) and the coefficients are
+    computed with an FFT. Each doubling of the number of points reuses the
+    previous samples. The derivative is evaluated at arbitrary points by
+    summing the differentiated series with Horner's rule.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import numdifftools.spectral as nds
+    >>> fun = lambda x: np.exp(np.sin(x))
+    >>> dfun = lambda x: np.cos(x) * np.exp(np.sin(x))
+    >>> x = np.linspace(-10, 10, 10001)
+    >>> df = nds.Fourier(fun, a=0, b=2 * np.pi, n=1)
+    >>> np.allclose(df(x), dfun(x))
+    True
+
+    See also
+    --------
+    Chebyshev
+    '''
+
+    def __init__(self, fun, a=-1, b=1, n=1, tol=100 * _EPS, min_degree=16,
+                 max_degree=2 ** 16, full_output=False):
+        super(Fourier, self).__init__(
+            fun, a, b, n, tol, min_degree, max_degree, full_output,
+            _fourier_nodes, _fourier_coefficients, _fourier_tail_indices)
+
+    def _derivative(self, x, n):
+        coefs = self.coefficients
+        m = len(coefs)
+        k = np.fft.fftfreq(m, 1.0 / m)
+        if m % 2 == 0:
+            # Split the Nyquist term evenly on the frequencies +-m/2
+            k = np.hstack((k, m // 2))
+            coefs = np.hstack((coefs, coefs[m // 2] / 2))
+            coefs[m // 2] /= 2
+        omega = 2 * np.pi / (self.b - self.a)
+        d_coefs = coefs * (1j * omega * k) ** n
+        k_max = int(np.max(np.abs(k)))
+        pos = np.zeros(k_max + 1, dtype=complex)
+        neg = np.zeros(k_max + 1, dtype=complex)
+        pos[k[k >= 0].astype(int)] = d_coefs[k >= 0]
+        neg[-k[k < 0].astype(int)] = d_coefs[k < 0]
+        z = np.exp(1j * omega * (x - self.a))
+        der = np.polyval(pos[::-1], z) + np.polyval(neg[::-1], 1.0 / z)
+        if self._is_real:
+            der = der.real
+        return der, self._tail * (k_max * omega) ** n
@@ -0,0 +1,27 @@
+""" Test functions and checks shared by the test modules
+
+"""
+import numpy as np
+from numpy.testing import assert_array_equal
+
+X0 = np.array([0.9, 1.2, 0.3])
+
+
+def rosen(x):
+    return (1 - x[0]) ** 2 + 105 * (x[1] - x[0] ** 2) ** 2 + np.exp(x[2])
+
+
+def residuals(x):
+    return np.array([x[0] * x[1], np.sin(x[2]) + x[0], x[1] ** 3])
+
+
+def assert_identical(cases, x, **options):
+    '''
+    Assert that options do not change the derivatives of the cases at x
+
+    Each case is a tuple (cls, fun, kwds) and cls(fun, **kwds, **options)(x)
+    must equal cls(fun, **kwds)(x) bit for bit.
+    '''
+    for cls, fun, kwds in cases:
+        val = cls(fun, **dict(kwds, **options))(x)
+        assert_array_equal(val, cls(fun, **kwds)(x))
@@ -0,0 +1,106 @@
+""" Test functions for numdifftools.asynchronous module
+
+"""
+import asyncio
+import unittest
+from unittest import mock
+import numdifftools as nd
+import numdifftools.asynchronous as nda
+import numdifftools.nd_cstep as ndc
+import numpy as np
+from numpy.testing import assert_array_equal
+from numdifftools.tests.helpers import X0, residuals, rosen
+
+
+class _Service(object):
+    ''' Coroutine function recording the number of calls in progress '''
+
+    def __init__(self, fun):
+        self.fun = fun
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+
+    async def __call__(self, x, *args):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0)
+            return self.fun(x, *args)
+        finally:
+            self.active -= 1
+
+
+class TestAcall(unittest.TestCase):
+
+    def test_identical_to_sync(self):
+        cases = [(nd.Derivative, np.exp, {}),
+                 (nd.Derivative, np.exp, dict(transform='exp')),
+                 (nd.Gradient, rosen, {}), (nd.Hessian, rosen, {}),
+                 (nd.Jacobian, residuals, {}),
+                 (nd.GaussNewtonHessian, residuals, dict(second_order=True)),
+                 (ndc.Derivative, np.exp, dict(method='central')),
+                 (ndc.Gradient, rosen, dict(method='central')),
+                 (ndc.Jacobian, residuals, {}), (ndc.Hessian, rosen, {})]
+        for cls, fun, kwds in cases:
+            service = _Service(fun)
+            d = cls(service, **kwds)
+            val = asyncio.run(d.acall(X0, max_concurrency=4))
+            d_sync = cls(fun, **kwds)
+            assert_array_equal(val, d_sync(X0))
+            self.assertTrue(d.fun is service if hasattr(d, 'fun')
+                            else d.f is service)
+            self.assertTrue(d.executor is None)
+            self.assertTrue(1 < service.max_active <= 4)
+            if hasattr(d_sync, 'error_estimate'):
+                assert_array_equal(d.error_estimate, d_sync.error_estimate)
+
+    def test_one_gather_per_step_level(self):
+        x = np.linspace(0.1, 1, 10)
+        cases = [(nd.Derivative, np.exp, 1),
+                 (nd.Gradient, lambda x: np.sum(x ** 3), 1),
+                 (nd.Hessdiag, lambda x: np.sum(x ** 3), 1),
+                 (nd.Jacobian, lambda x: x[::2] * x[1::2], 1),
+                 (nd.Hessian, lambda x: np.sum(x ** 3), 2)]
+        gather_map = nda._GatherExecutor.map
+        for cls, fun, num_levels in cases:
+            service = _Service(fun)
+            with mock.patch.object(nda._GatherExecutor, 'map', autospec=True,
+                                   side_effect=gather_map) as mapped:
+                val = asyncio.run(cls(service).acall(x, max_concurrency=64))
+            assert_array_equal(val, cls(fun)(x))
+            # the points of all elements are evaluated at the same time
+            self.assertEqual(mapped.call_count, num_levels)
+            self.assertTrue(service.max_active > 2 * x.size)
+
+    def test_concurrent_calls(self):
+        service = _Service(rosen)
+        grad = nd.Gradient(service)
+
+        async def main():
+            return await asyncio.gather(grad.acall(X0),
+                                        grad.acall(X0 + 1))
+
+        val0, val1 = asyncio.run(main())
+        assert_array_equal(val0, nd.Gradient(rosen)(X0))
+        assert_array_equal(val1, nd.Gradient(rosen)(X0 + 1))
+
+    def test_extra_arguments(self):
+        service = _Service(lambda x, a: a * np.sum(x ** 2))
+        grad = ndc.Gradient(service, method='central')
+        val = asyncio.run(grad.acall(X0, 3.0, max_concurrency=2))
+        self.assertTrue(service.max_active == 2)
+        assert_array_equal(val, ndc.Gradient(lambda x: 3.0 * np.sum(x ** 2),
+                                             method='central')(X0))
+
+    def test_error_propagation(self):
+        async def bad_fun(x):
+            raise ValueError('bad point')
+
+        self.assertRaises(ValueError, asyncio.run,
+                          nd.Gradient(bad_fun).acall(X0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+""" Test functions for numdifftools.distributed module
+
+"""
+import hashlib
+import multiprocessing
+import pickle
+import threading
+import unittest
+from unittest import mock
+import numdifftools.distributed as ndd
+import numdifftools as nd
+import numdifftools.nd_cstep as ndc
+import numpy as np
+from numpy.testing import assert_array_equal
+from numdifftools.distributed import TCPExecutor, Worker
+from numdifftools.tests.helpers import X0, assert_identical, residuals, rosen
+
+
+def bad_fun(x):
+    raise ValueError('bad point')
+
+
+_evaluated = []
+
+
+def counting_residuals(x):
+    _evaluated.append(x)
+    return residuals(x)
+
+
+def _serve(connection):
+    worker = Worker()
+    connection.send(worker.server_address)
+    worker.serve_forever()
+
+
+def _start_worker():
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(child,))
+    process.daemon = True
+    process.start()
+    return process, parent.recv()
+
+
+class TestTCPExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.processes, self.addresses = zip(*[_start_worker()
+                                               for _ in range(2)])
+
+    def tearDown(self):
+        for process in self.processes:
+            process.terminate()
+            process.join()
+
+    def test_identical_to_serial(self):
+        cases = [(nd.Gradient, rosen, {}), (nd.Hessian, rosen, {}),
+                 (nd.Jacobian, residuals, {}),
+                 (nd.GaussNewtonHessian, residuals, dict(second_order=True)),
+                 (ndc.Gradient, rosen, dict(method='central')),
+                 (ndc.Hessian, rosen, dict(method='central2'))]
+        with TCPExecutor(self.addresses, batch_size=5) as executor:
+            assert_identical(cases, X0, executor=executor)
+
+    def test_map(self):
+        points = [np.arange(3.0) + k for k in range(10)]
+        with TCPExecutor(self.addresses, batch_size=3) as executor:
+            values = list(executor.map(residuals, points))
+            self.assertEqual(len(values), 10)
+            for k, value in enumerate(values):
+                assert_array_equal(value, residuals(np.arange(3.0) + k))
+            connections = list(executor._connections)
+            self.assertEqual(list(executor.map(residuals, [])), [])
+            list(executor.map(residuals, points))
+            self.assertEqual(executor._connections, connections)
+            self.assertRaises(ValueError, nd.Gradient(bad_fun,
+                                                      executor=executor),
+                              X0)
+
+    def test_worker_loss(self):
+        points = [np.arange(3.0) + k for k in range(20)]
+        expected = [residuals(point) for point in points]
+        with TCPExecutor(self.addresses, batch_size=2) as executor:
+            list(executor.map(residuals, points))
+            self.processes[0].terminate()
+            self.processes[0].join()
+            values = list(executor.map(residuals, points))
+            assert_array_equal(values, expected)
+            self.processes[1].terminate()
+            self.processes[1].join()
+            self.assertRaises(ConnectionError, executor.map, residuals,
+                              points)
+
+    def test_invalid_input(self):
+        self.assertRaises(ValueError, TCPExecutor, [])
+
+
+class TestProtocol(unittest.TestCase):
+    ''' Tests with workers in threads of this process '''
+
+    def setUp(self):
+        self.workers = [Worker() for _ in range(2)]
+        for worker in self.workers:
+            threading.Thread(target=worker.serve_forever, daemon=True).start()
+        self.addresses = [worker.server_address for worker in self.workers]
+        self.points = [np.arange(3.0) + k for k in range(40)]
+        self.expected = [residuals(point) for point in self.points]
+
+    def tearDown(self):
+        for worker in self.workers:
+            worker.shutdown()
+            worker.server_close()
+
+    def test_points_are_sent_while_they_are_made(self):
+        batch_size = 2
+        in_flight = []
+
+        def points():
+            for k, point in enumerate(self.points):
+                in_flight.append(k - len(_evaluated))
+                yield point
+        del _evaluated[:]
+        with TCPExecutor(self.addresses, batch_size=batch_size) as executor:
+            values = list(executor.map(counting_residuals, points()))
+        assert_array_equal(values, self.expected)
+        # one batch per connection and the batch being made
+        self.assertLessEqual(max(in_flight), 3 * batch_size)
+
+    def test_function_is_sent_once_per_connection(self):
+        with mock.patch.object(ndd, '_send', wraps=ndd._send) as send:
+            with TCPExecutor(self.addresses, batch_size=2) as executor:
+                for _ in range(2):
+                    values = list(executor.map(residuals, self.points))
+                    assert_array_equal(values, self.expected)
+        requests = [call[0][1] for call in send.call_args_list
+                    if len(call[0][1]) == 3]
+        self.assertEqual(len(requests), 40)
+        functions = [data for _key, data, _points in requests
+                     if data is not None]
+        self.assertLessEqual(len(functions), 2)
+
+    def test_derivative_sends_function_once_per_connection(self):
+        cases = [(nd.Derivative, np.exp), (nd.Gradient, np.sum),
+                 (nd.Hessdiag, np.sum)]
+        x = np.linspace(0.1, 1, 6)
+        for cls, fun in cases:
+            with mock.patch.object(ndd, '_send', wraps=ndd._send) as send:
+                with TCPExecutor(self.addresses, batch_size=8) as executor:
+                    val = cls(fun, executor=executor)(x)
+            assert_array_equal(val, cls(fun)(x))
+            functions = [call[0][1][1] for call in send.call_args_list
+                         if len(call[0][1]) == 3 and
+                         call[0][1][1] is not None]
+            # all the elements are evaluated with one map of the executor
+            self.assertLessEqual(len(functions), len(self.addresses))
+
+    def test_function_is_sent_again_on_miss(self):
+        fun_data = pickle.dumps(residuals, protocol=pickle.HIGHEST_PROTOCOL)
+        with TCPExecutor(self.addresses, batch_size=2) as executor:
+            executor._keys = [hashlib.sha1(fun_data).digest()] * 2
+            values = list(executor.map(residuals, self.points))
+        assert_array_equal(values, self.expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
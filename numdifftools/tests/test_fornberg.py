@@ -0,0 +1,103 @@
+""" Test functions for numdifftools.fornberg module
+
+"""
+import unittest
+import numdifftools.fornberg as ndf
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+
+
+class TestFdWeights(unittest.TestCase):
+
+    def test_central_weights(self):
+        w = ndf.fd_weights(np.arange(-2, 3), 0, n=1)
+        assert_array_almost_equal(w, np.array([1, -8, 0, 8, -1]) / 12.,
+                                  decimal=14)
+        w = ndf.fd_weights(np.arange(-4, 5), 0, n=2)
+        assert_array_almost_equal(w * 5040, [-9, 128, -1008, 8064, -14350,
+                                             8064, -1008, 128, -9],
+                                  decimal=9)
+
+    def test_all_orders(self):
+        w = ndf.fd_weights_all(np.arange(-1, 2), 0, n=2)
+        assert_array_almost_equal(w, [[0, 1, 0], [-0.5, 0, 0.5], [1, -2, 1]],
+                                  decimal=14)
+
+    def test_non_uniform_offsets(self):
+        x = np.array([0., 0.1, 0.25, 0.5, 0.9, 1.4])
+        p = np.poly1d([1.] * 6)
+        w = ndf.fd_weights_all(x, 0.2, n=5)
+        for k in range(6):
+            # the weights are exact for polynomials of degree 5
+            assert_array_almost_equal(np.dot(w[k], p(x)), p.deriv(k)(0.2),
+                                      decimal=7)
+
+    def test_cached_weights_are_read_only(self):
+        w1 = ndf.fd_weights_all(np.arange(-3, 4), 0, n=3)
+        w2 = ndf.fd_weights_all(np.arange(-3, 4), 0, n=3)
+        self.assertTrue(w1 is w2)
+        self.assertFalse(w1.flags.writeable)
+
+    def test_invalid_input(self):
+        self.assertRaises(ValueError, ndf.fd_weights, [0, 1], 0, 2)
+        self.assertRaises(ValueError, ndf.fd_weights, [0, 1, 1], 0, 1)
+
+
+class TestTaylor(unittest.TestCase):
+
+    def test_taylor_exp(self):
+        taylor = ndf.Taylor(np.exp, n=6, full_output=True)
+        coefs, info = taylor([0., 1., 5.])
+        self.assertEqual(coefs.shape, (7, 3))
+        self.assertFalse(np.iscomplexobj(coefs))
+        fact = np.array([1, 1, 2, 6, 24, 120, 720])
+        true_coefs = np.exp([0., 1., 5.]) / fact[:, np.newaxis]
+        np.testing.assert_allclose(coefs, true_coefs, rtol=1e-12)
+        self.assertTrue((np.abs(coefs - true_coefs) <=
+                         info.error_estimate).all())
+        self.assertFalse(info.failed.any())
+
+    def test_taylor_is_batched_over_points(self):
+        shapes = []
+
+        def fun(z):
+            shapes.append(z.shape)
+            return np.exp(z)
+        x = np.linspace(-1, 1, 1000).reshape(10, 100)
+        _coefs, info = ndf.Taylor(fun, n=2, full_output=True)(x)
+        self.assertEqual(len(shapes), info.iterations + 1)
+        self.assertEqual(shapes[0], (10 * 100, 32))
+
+    def test_taylor_complex_point(self):
+        z0 = 1 + 1j
+        coefs = ndf.Taylor(np.exp, n=3)(z0)
+        self.assertTrue(np.iscomplexobj(coefs))
+        np.testing.assert_allclose(coefs, np.exp(z0) / [1, 1, 2, 6],
+                                   rtol=1e-12)
+
+
+class TestDerivative(unittest.TestCase):
+
+    def test_high_order_derivative_of_pole(self):
+        # f(z) = 1/(1-z) has a pole at z == 1 and f^(n)(0) = n!
+        dfun = ndf.Derivative(lambda z: 1 / (1 - z), n=10, full_output=True)
+        der, info = dfun(0.)
+        self.assertTrue(np.abs(der - 3628800) <= info.error_estimate)
+        self.assertTrue(info.final_radius < 1)
+
+    def test_derivative_sin(self):
+        x = np.linspace(0, 2 * np.pi, 13)
+        for n, dfun in enumerate([np.cos, lambda x: -np.sin(x),
+                                  lambda x: -np.cos(x)], 1):
+            der, info = ndf.Derivative(np.sin, n=n, full_output=True)(x)
+            assert_array_almost_equal(der, dfun(x), decimal=12)
+            self.assertTrue((np.abs(der - dfun(x)) <=
+                             info.error_estimate).all())
+
+    def test_derivative_polynomial(self):
+        der = ndf.Derivative(lambda z: z ** 3 + z, n=1)([0., 2.])
+        assert_array_almost_equal(der, [1., 13.], decimal=12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,14 @@
 """ Test functions for numdifftools module
 
 """
+import time
+import tracemalloc
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 import numdifftools.nd_cstep as nd
 import numpy as np
-from numpy.testing import assert_array_almost_equal
+from numpy.testing import assert_array_almost_equal, assert_array_equal
+from numdifftools.tests.helpers import X0, assert_identical, residuals, rosen
 
 
 class TestStepGenerator(unittest.TestCase):
@@ -122,6 +126,66 @@ class TestGradient(unittest.TestCase):
                 assert_array_almost_equal(di, dit)
 
 
+class TestOuterProductGradient(unittest.TestCase):
+
+    @staticmethod
+    def loglike(x, y):
+        return -0.5 * ((y - x[0]) / np.exp(x[1])) ** 2 - x[1]
+
+    def test_opg_equals_dot_product_of_jacobian(self):
+        y = np.random.RandomState(1).normal(1, 2, size=1000)
+        x = np.array([0.9, 0.6])
+        scores = nd.Jacobian(lambda x: self.loglike(x, y))(x)
+        for method in ['complex', 'central', 'forward']:
+            opg_fun = nd.OuterProductGradient(self.loglike, method=method)
+            chunks = (y[i:i + 300] for i in range(0, y.size, 300))
+            opg = opg_fun(x, chunks)
+            np.testing.assert_allclose(opg, np.dot(scores.T, scores),
+                                       rtol=1e-6)
+            self.assertEqual(opg_fun.nobs, 1000)
+            np.testing.assert_allclose(opg_fun.score_sum, scores.sum(axis=0),
+                                       rtol=1e-6)
+
+    def test_chunks_are_evaluated_one_at_a_time(self):
+        sizes = []
+
+        def loglike(x, y):
+            sizes.append(y.size)
+            return self.loglike(x, y)
+        y = np.random.RandomState(1).normal(1, 2, size=1000)
+        chunks = (y[i:i + 100] for i in range(0, y.size, 100))
+        opg, info = nd.OuterProductGradient(loglike, full_output=True)(
+            [1., 0.7], chunks)
+        self.assertEqual(max(sizes), 100)
+        self.assertEqual(info.error_estimate.shape, (2, 2))
+
+    def test_written_to_out(self):
+        y = np.random.RandomState(1).normal(1, 2, size=100)
+        x = np.array([0.9, 0.6])
+        opg_fun = nd.OuterProductGradient(self.loglike, full_output=True)
+        opg, info = opg_fun(x, [y])
+        out, err_out = np.empty((2, 2)), np.empty((2, 2))
+        opg2, info2 = opg_fun(x, [y], out=out, err_out=err_out)
+        self.assertTrue(opg2 is out)
+        self.assertTrue(info2.error_estimate is err_out)
+        assert_array_equal(out, opg)
+        assert_array_equal(err_out, info.error_estimate)
+        self.assertRaises(ValueError, opg_fun, x, [y], out=np.empty(2))
+
+    def test_sandwich(self):
+        y = np.random.RandomState(1).normal(1, 2, size=1000)
+        x = np.array([np.mean(y), np.log(np.std(y))])
+        hess = np.diag([-y.size / np.var(y), -2. * y.size])
+        opg_fun = nd.OuterProductGradient(self.loglike)
+        cov = opg_fun.sandwich(x, [y], hess)
+        opg = opg_fun(x, [y])
+        assert_array_almost_equal(cov, np.dot(np.linalg.inv(hess),
+                                              np.dot(opg,
+                                                     np.linalg.inv(hess))))
+        np.testing.assert_allclose(cov[0, 0], np.var(y) / y.size,
+                                   rtol=1e-10)
+
+
 class TestHessian(unittest.TestCase):
 
     def test_hessian_cosIx_yI_at_I0_0I(self):
@@ -140,5 +204,289 @@ class TestHessian(unittest.TestCase):
                 assert_array_almost_equal(hi, hit)
 
 
+class TestExecutor(unittest.TestCase):
+
+    def test_identical_to_serial(self):
+        methods = ['complex', 'central', 'forward', 'backward']
+        cases = ([(nd.Derivative, np.exp, dict(method=m)) for m in methods] +
+                 [(nd.Gradient, rosen, dict(method=m)) for m in methods] +
+                 [(nd.Hessian, rosen, dict(method=m))
+                  for m in methods + ['central2']])
+        with ThreadPoolExecutor(4) as executor:
+            assert_identical(cases, X0, executor=executor)
+            assert_identical([(nd.NDerivative, np.exp, dict(n=2, order=7))],
+                             1.0, executor=executor)
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+    def batch_fun(self, xs):
+        self.calls.append(len(xs))
+        return rosen(xs.T)
+
+    def batch_residuals(self, xs):
+        self.calls.append(len(xs))
+        return residuals(xs.T).T
+
+    def test_identical_to_loop(self):
+        x = X0
+        methods = dict(Gradient=['complex', 'central', 'forward', 'backward'],
+                       Hessian=['complex', 'central', 'central2', 'forward',
+                                'backward'])
+        for name, method_list in methods.items():
+            cls = getattr(nd, name)
+            for method in method_list:
+                for chunk_size in [None, 5]:
+                    self.calls = []
+                    d = cls(self.batch_fun, method=method, batch=True,
+                            chunk_size=chunk_size,
+                            steps=nd.StepsGenerator(num_steps=4))
+                    val = d(x)
+                    self.assertTrue(max(self.calls) <= (chunk_size or 40))
+                    if chunk_size is None:
+                        num_steps = len(list(d.steps(x, d.scale)))
+                        self.assertEqual(len(self.calls), num_steps)
+                    d_loop = cls(rosen, method=method,
+                                 steps=nd.StepsGenerator(num_steps=4))
+                    assert_array_equal(val, d_loop(x))
+
+    def test_jacobian(self):
+        for method in ['complex', 'central', 'forward']:
+            val = nd.Jacobian(self.batch_residuals, method=method, batch=True,
+                              chunk_size=2)(X0)
+            assert_array_equal(val, nd.Jacobian(residuals, method=method)(X0))
+
+    def test_executor(self):
+        with ThreadPoolExecutor(2) as executor:
+            val = nd.Hessian(self.batch_fun, batch=True, chunk_size=4,
+                             executor=executor)(X0)
+        assert_array_equal(val, nd.Hessian(rosen)(X0))
+
+
+class TestStackedSteps(unittest.TestCase):
+
+    def setUp(self):
+        self.x = np.linspace(0.1, 2, 7)
+        self.sizes = []
+
+    def counting_sin(self, xs):
+        self.sizes.append(xs.shape[0])
+        return np.sin(xs)
+
+    def test_derivative(self):
+        x = self.x
+        steps = nd.StepsGenerator(num_steps=10)
+        for method in ['complex', 'central', 'forward', 'backward']:
+            self.sizes = []
+            val = nd.Derivative(self.counting_sin, method=method, steps=steps,
+                                batch=True)(x)
+            self.assertEqual(len(self.sizes), 1)
+            assert_array_almost_equal(val, nd.Derivative(
+                np.sin, method=method, steps=steps)(x), decimal=14)
+            assert_array_almost_equal(val, np.cos(x), decimal=8)
+
+    def test_nderivative_chunks(self):
+        x = self.x
+        steps = nd.StepsGenerator(num_steps=10)
+        for n, order in [(1, 9), (2, 9), (3, 7)]:
+            val = nd.NDerivative(np.sin, n=n, order=order, steps=steps)(x)
+            for chunk_size in [None, 1, 20]:
+                self.sizes = []
+                val2 = nd.NDerivative(self.counting_sin, n=n, order=order,
+                                      steps=steps, batch=True,
+                                      chunk_size=chunk_size)(x)
+                assert_array_almost_equal(val2, val, decimal=14)
+                self.assertEqual(sum(self.sizes), 11 * order)
+                if chunk_size is None:
+                    self.assertEqual(len(self.sizes), 1)
+                else:
+                    self.assertTrue(max(self.sizes) <= max(chunk_size, order))
+
+    def test_executor(self):
+        steps = nd.StepsGenerator(num_steps=10)
+        with ThreadPoolExecutor(2) as executor:
+            val = nd.Derivative(np.sin, method='central', steps=steps,
+                                batch=True, chunk_size=4,
+                                executor=executor)(self.x)
+        assert_array_almost_equal(val, nd.Derivative(
+            np.sin, method='central', steps=steps)(self.x), decimal=14)
+
+
+class TestAutoBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = 0
+
+    @staticmethod
+    def batch_fun(xs):
+        return rosen(np.asarray(xs).T)
+
+    def counting_fun(self, xs):
+        self.calls += 1
+        time.sleep(1e-4)  # overhead of each call, e.g., of a simulator
+        return self.batch_fun(xs)
+
+    @staticmethod
+    def dot_fun(x):
+        return np.dot(x, x)
+
+    def test_batch_function(self):
+        x = X0
+        for method in ['complex', 'central', 'central2', 'forward']:
+            d = nd.Hessian(self.counting_fun, method=method, batch='auto')
+            val = d(x)
+            calls = self.calls
+            self.assertEqual(d._batch_probe.decisions[self.counting_fun],
+                             (True, ()))
+            assert_array_almost_equal(val, nd.Hessian(self.batch_fun,
+                                                      method=method)(x),
+                                      decimal=12)
+            self.calls = 0
+            assert_array_almost_equal(d(x), val, decimal=14)
+            num_steps = len(list(d.steps(x, d.scale)))
+            self.assertEqual(self.calls, num_steps)
+            self.assertTrue(calls > num_steps)
+
+    def test_non_batch_function(self):
+        x = X0
+        for cls in [nd.Gradient, nd.Hessian]:
+            d = cls(self.dot_fun, method='central', batch='auto')
+            assert_array_equal(d(x), cls(self.dot_fun, method='central')(x))
+            self.assertEqual(d._batch_probe.decisions[self.dot_fun],
+                             (False, ()))
+
+
+class TestOutputArrays(unittest.TestCase):
+
+    @staticmethod
+    def vec_fun(x):
+        t = np.linspace(0, 1, 100)
+        return x[0] * np.exp(x[1] * t) + np.sin(x[2] * t)
+
+    def test_written_to_out(self):
+        x = X0
+        steps = nd.StepsGenerator(num_steps=2)
+        cases = [(nd.Gradient, rosen, (3,), {}),
+                 (nd.Jacobian, self.vec_fun, (100, 3), {}),
+                 (nd.Hessian, rosen, (3, 3), {}),
+                 (nd.Gradient, rosen, (3,), dict(steps=steps)),
+                 (nd.Jacobian, self.vec_fun, (100, 3), dict(steps=steps)),
+                 (nd.Hessian, rosen, (3, 3), dict(steps=steps))]
+        for cls, fun, shape, kwds in cases:
+            d = cls(fun, full_output=True, **kwds)
+            val, info = d(x)
+            out, err_out = np.empty(shape), np.empty(shape)
+            for _ in range(2):
+                val2, info2 = d(x, out=out, err_out=err_out)
+            self.assertTrue(val2 is out)
+            self.assertTrue(info2.error_estimate is err_out)
+            assert_array_equal(out, val)
+            assert_array_equal(err_out, info.error_estimate)
+            assert_array_equal(info2.index, info.index)
+            self.assertRaises(ValueError, d, x, out=np.empty((4,) + shape))
+
+    @staticmethod
+    def peak_memory(derivative, x, out, err_out):
+        derivative(x, out=out, err_out=err_out)  # allocates the work arrays
+        tracemalloc.start()
+        try:
+            peaks = []
+            for _ in range(2):
+                tracemalloc.reset_peak()
+                # the blocks kept by numpy from earlier calls don't count
+                before = tracemalloc.get_traced_memory()[0]
+                derivative(x, out=out, err_out=err_out)
+                peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            return min(peaks)
+        finally:
+            tracemalloc.stop()
+
+    def test_peak_memory_after_warm_up(self):
+        steps = nd.StepsGenerator(num_steps=3)
+        for num_values in (100, 10000):
+            t = np.linspace(0, 1, num_values)
+            value = np.empty(num_values)
+
+            def vec_fun(x):
+                np.multiply(x[1], t, out=value)
+                np.exp(value, out=value)
+                return np.multiply(value, x[0], out=value)
+            out, err_out = np.empty((2, num_values, 3))
+            for method in ['central', 'forward', 'backward']:
+                d = nd.Jacobian(vec_fun, method=method, steps=steps)
+                peak = self.peak_memory(d, X0, out, err_out)
+                # the steps, the extrapolation and the final result are
+                # written to work arrays, so the peak does not grow with
+                # the 240 kB of the largest output
+                self.assertLess(peak, 16 * 1024)
+        for n in (20, 100):
+            x = np.linspace(0.1, 1, n)
+            out, err_out = np.empty((2, n, n))
+            for method in ['central', 'forward']:
+                d = nd.Hessian(lambda x: x.dot(x), method=method, steps=steps)
+                peak = self.peak_memory(d, x, out, err_out)
+                # only the values of the pairs of one row and the points are
+                # allocated, which is far less than the 80 kB of one n x n
+                self.assertLess(peak, 16 * 1024)
+        x = np.linspace(0.1, 1, 2000)
+        out, err_out = np.empty((2, x.size))
+        d = nd.Gradient(lambda x: x.dot(x), method='central', steps=steps)
+        # the points, the steps h and -h and the temporaries of the steps
+        # generator are a few copies of x, the rest is in work arrays
+        self.assertLess(self.peak_memory(d, x, out, err_out), 8 * x.nbytes)
+
+
+class TestMemory(unittest.TestCase):
+
+    @staticmethod
+    def peak_memory(derivative, x):
+        tracemalloc.start()
+        try:
+            derivative(x)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_peak_memory_linear_in_n(self):
+        steps = nd.StepsGenerator(num_steps=2)
+        fun = lambda x: np.sum(np.sin(x))
+        vec_fun = lambda x: np.sin(x[:3]) * np.sum(x)
+        cases = [(nd.Gradient, fun, 'central'), (nd.Gradient, fun, 'forward'),
+                 (nd.Gradient, fun, 'backward'),
+                 (nd.Gradient, fun, 'complex'),
+                 (nd.Jacobian, vec_fun, 'central')]
+        for cls, f, method in cases:
+            d = cls(f, method=method, steps=steps)
+            d(np.linspace(0.1, 1, 10))
+            peak, peak2 = [self.peak_memory(d, np.linspace(0.1, 1, n))
+                           for n in (500, 1000)]
+            # a dense n x n matrix of the increments needs 8 * n**2 bytes
+            self.assertTrue(peak2 < 8 * 1000 ** 2 / 10)
+            self.assertTrue(peak2 < 2.5 * peak)
+
+    def test_hessian_peak_memory_linear_in_n(self):
+        fun = lambda x: np.sum(np.sin(x))
+        for method in ['central', 'central2', 'forward', 'complex']:
+            d = nd.Hessian(fun, method=method)
+            d(np.linspace(0.1, 1, 10))
+            # the memory beyond the n x n result of the single default step
+            extra, extra2 = [self.peak_memory(d, np.linspace(0.1, 1, n)) -
+                             8 * n ** 2 for n in (50, 100)]
+            # a second n x n matrix would need 80 kB for n = 100
+            self.assertTrue(extra2 < 8 * 100 ** 2 / 4)
+            self.assertTrue(extra2 < 2.5 * extra)
+
+    def test_hessian_identical_for_int_x(self):
+        fun = lambda x: x[0] ** 2 * x[1] + np.exp(x[2])
+        for method in ['central', 'central2', 'forward', 'backward',
+                       'complex']:
+            d = nd.Hessian(fun, method=method)
+            assert_array_equal(d(np.array([1, 2, 0])),
+                               d(np.array([1., 2., 0.])))
+
+
 if __name__ == '__main__':
     unittest.main()
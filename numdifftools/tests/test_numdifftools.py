@@ -1,10 +1,15 @@
 """ Test functions for numdifftools module
 
 """
+import sys
+import tracemalloc
 import unittest
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 import numdifftools as nd
 import numpy as np
-from numpy.testing import assert_array_almost_equal
+from numpy.testing import assert_array_almost_equal, assert_array_equal
+from numdifftools.tests.helpers import X0, assert_identical, residuals, rosen
 
 
 class TestDerivative(unittest.TestCase):
@@ -107,6 +112,224 @@ class TestDerivative(unittest.TestCase):
         x = np.linspace(0, 5, 6)
         assert_array_almost_equal(df(x), 2*x)
 
+    def test_multi_order_derivative_equals_single_order(self):
+        x = np.array([[0.5, 1.], [1.5, 2.]])
+        for method in ['central', 'forward', 'backward']:
+            fd = nd.Derivative(np.exp, n=[1, 2, 3, 4], method=method)
+            der = fd(x)
+            self.assertEqual(der.shape, (4, 2, 2))
+            self.assertEqual(fd.error_estimate.shape, (4, 2, 2))
+            self.assertEqual(fd.final_delta.shape, (4, 2, 2))
+            for k, n in enumerate([1, 2, 3, 4]):
+                fdn = nd.Derivative(np.exp, n=n, method=method)
+                assert_array_almost_equal(der[k], fdn(x), decimal=12)
+                assert_array_almost_equal(fd.error_estimate[k],
+                                          fdn.error_estimate, decimal=12)
+
+    def test_multi_order_derivative_shares_samples(self):
+        calls = []
+
+        def fun(x):
+            calls.append(1)
+            return np.sin(x)
+        step_num = 20
+        fd = nd.Derivative(fun, n=[1, 2, 3, 4], step_num=step_num)
+        der = fd(np.pi / 4)
+        self.assertEqual(len(calls), 1 + 2 * step_num)
+        assert_array_almost_equal(der.ravel(), np.sqrt(0.5) *
+                                  np.array([1, -1, -1, 1]), decimal=4)
+
+    def test_high_order_derivatives_of_exp(self):
+        for method in ['central', 'forward', 'backward']:
+            for n in [2, 5, 6]:
+                dexp = nd.Derivative(np.exp, n=n, method=method)
+                y = dexp(0.5)
+                self.assertTrue(np.abs(y - np.exp(0.5)) <
+                                10 * dexp.error_estimate)
+        dexp = nd.Derivative(np.exp, n=6)
+        assert_array_almost_equal(dexp(0.5), np.exp(0.5), decimal=4)
+        dexp = nd.Derivative(np.exp, n=2, method='backward')
+        assert_array_almost_equal(dexp(0.5), np.exp(0.5), decimal=8)
+
+    def test_invalid_derivative_order(self):
+        self.assertRaises(ValueError, nd.Derivative, np.exp, n=[1, 2.5])
+        self.assertRaises(ValueError, nd.Derivative, np.exp, n=0)
+
+
+class TestPartialDerivative(unittest.TestCase):
+
+    def test_mixed_partial_derivative(self):
+        fun = lambda xy: np.sin(xy[0]) * np.exp(2 * xy[1])
+        true_val = 4 * np.cos(1) * np.exp(1)
+        for method in ['central', 'forward', 'backward']:
+            for order in [2, 4]:
+                pd = nd.PartialDerivative(fun, (1, 2), method=method,
+                                          order=order)
+                val = pd([1, 0.5])
+                self.assertTrue(np.abs(val - true_val) <= pd.error_estimate)
+                assert_array_almost_equal(val, true_val, decimal=6)
+
+    def test_one_evaluation_per_stencil_point(self):
+        calls = []
+
+        def fun(xy):
+            calls.append(1)
+            return np.sin(xy[0]) * np.exp(2 * xy[1])
+        step_num = 20
+        nd.PartialDerivative(fun, (1, 2), step_num=step_num)([1, 0.5])
+        # 2 x 3 stencil points with nonzero weight for each step
+        self.assertEqual(len(calls), 6 * step_num)
+
+    def test_vectorized_partial_derivative(self):
+        calls = []
+
+        def fun(x):
+            calls.append(1)
+            return x[0] ** 2 * x[2] ** 3
+        pd = nd.PartialDerivative(fun, (2, 0, 1), vectorized=True)
+        assert_array_almost_equal(pd([1., 5., 2.]), 24., decimal=8)
+        self.assertEqual(len(calls), 1)
+
+    def test_invalid_multi_index(self):
+        self.assertRaises(ValueError, nd.PartialDerivative, np.sum, (1, -1))
+        self.assertRaises(ValueError, nd.PartialDerivative, np.sum, (0, 0))
+        pd = nd.PartialDerivative(np.sum, (1, 1))
+        self.assertRaises(ValueError, pd, [1., 2., 3.])
+
+
+class TestThirdDerivative(unittest.TestCase):
+
+    def setUp(self):
+        self.a = np.array([1., 2., -0.5])
+        self.x0 = np.array([0.1, 0.2, 0.3])
+        self.true_tensor = np.einsum('i,j,k', self.a, self.a,
+                                     self.a) * self.fun(self.x0)
+
+    def fun(self, x):
+        return np.exp(np.dot(self.a, x))
+
+    def test_third_derivative(self):
+        a, fun = self.a, self.fun
+        callbacks = [dict(), dict(gradient=lambda x: a * fun(x)),
+                     dict(hessian=lambda x: np.outer(a, a) * fun(x))]
+        for kwds in callbacks:
+            Tfun = nd.ThirdDerivative(fun, **kwds)
+            tensor = Tfun(self.x0)
+            self.assertEqual(tensor.shape, (3, 3, 3))
+            assert_array_almost_equal(tensor, self.true_tensor, decimal=7)
+            self.assertTrue((np.abs(tensor - self.true_tensor) <=
+                             10 * Tfun.error_estimate).all())
+
+    def test_packed_third_derivative(self):
+        Tfun = nd.ThirdDerivative(self.fun, packed=True)
+        tensor = Tfun(self.x0)
+        self.assertEqual(tensor.shape, (10, ))
+        self.assertEqual(Tfun.error_estimate.shape, (10, ))
+        assert_array_almost_equal(tensor[[0, 3, 9]],
+                                  self.true_tensor[[0, 0, 2], [0, 1, 2],
+                                                   [0, 1, 2]], decimal=7)
+
+    def test_shared_stencil_points(self):
+        calls = []
+
+        def fun(x):
+            calls.append(1)
+            return self.fun(x)
+        step_num = 20
+        nd.ThirdDerivative(fun, step_num=step_num)(self.x0)
+        # the 3 * 4 + 6 * 6 + 8 = 56 stencil points share 32 distinct points
+        self.assertEqual(len(calls), 32 * step_num)
+
+    def test_vectorized_third_derivative(self):
+        a = self.a
+        fun = lambda x: np.exp(np.dot(a, x))
+        hessian = lambda x: np.einsum('i,j,k->ijk', a, a,
+                                      fun(x)).reshape(9, -1)
+        for kwds in [dict(), dict(hessian=hessian)]:
+            tensor = nd.ThirdDerivative(fun, vectorized=True,
+                                        **kwds)(self.x0)
+            assert_array_almost_equal(tensor, self.true_tensor, decimal=7)
+
+
+class TestLaplacian(unittest.TestCase):
+
+    @staticmethod
+    def fun(x):
+        return np.sum(np.sin(x), axis=0) + x[0] * x[1] ** 2
+
+    @staticmethod
+    def laplacian(x):
+        return -np.sum(np.sin(x), axis=0) + 2 * x[0]
+
+    def test_laplacian(self):
+        x0 = np.array([0.1, 0.2, 0.3, 0.4])
+        for method in ['central', 'forward', 'backward']:
+            for order in [2, 4]:
+                Lfun = nd.Laplacian(self.fun, method=method, order=order)
+                val = Lfun(x0)
+                assert_array_almost_equal(val, self.laplacian(x0), decimal=7)
+                self.assertTrue(np.abs(val - self.laplacian(x0)) <=
+                                10 * Lfun.error_estimate)
+
+    def test_fun_x0_is_evaluated_once(self):
+        calls = []
+
+        def fun(x):
+            calls.append(1)
+            return self.fun(x)
+        step_num = 20
+        nd.Laplacian(fun, step_num=step_num)([0.1, 0.2, 0.3])
+        self.assertEqual(len(calls), 1 + 2 * 3 * step_num)
+
+    def test_points_are_generated_on_demand(self):
+        calls = []
+
+        def fun(x):
+            calls.append(1)
+            return np.sum(x ** 2)
+        n = 200
+        Lfun = nd.Laplacian(fun)
+        Lfun(np.ones(3))
+        del calls[:]
+        tracemalloc.start()
+        try:
+            val = Lfun(np.linspace(0.1, 1, n))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        assert_array_almost_equal(val, 2 * n)
+        # all the points would need n floats for each call of fun
+        self.assertLess(peak, 8 * n * len(calls) // 10)
+
+    def test_vectorized_laplacian_of_many_points(self):
+        calls = []
+
+        def fun(x):
+            calls.append(1)
+            return self.fun(x)
+        x = np.linspace(0, 1, 15).reshape(3, 5)
+        Lfun = nd.Laplacian(fun, vectorized=True)
+        val = Lfun(x)
+        self.assertEqual(val.shape, (5, ))
+        self.assertEqual(Lfun.error_estimate.shape, (5, ))
+        assert_array_almost_equal(val, self.laplacian(x), decimal=7)
+        self.assertEqual(len(calls), 2)
+
+    def test_hutchinson_estimator(self):
+        x = np.linspace(0, 1, 15).reshape(3, 5)
+        Lfun = nd.Laplacian(self.fun, vectorized=True, num_probes=200,
+                            random_state=1)
+        val = Lfun(x)
+        self.assertTrue((np.abs(val - self.laplacian(x)) <=
+                         3 * Lfun.error_estimate).all())
+
+        # v' * H * v == trace(H) for diagonal H and v[i] = +-1
+        n = 500
+        scale = np.arange(1., n + 1)
+        fun = lambda x: np.dot(scale, x ** 2)
+        Lfun = nd.Laplacian(fun, vectorized=True, num_probes=10)
+        assert_array_almost_equal(Lfun(np.ones(n)), n * (n + 1), decimal=5)
+
 
 class TestJacobian(unittest.TestCase):
 
@@ -119,6 +342,44 @@ class TestJacobian(unittest.TestCase):
         for ji in J.ravel():
             assert_array_almost_equal(ji, 0.0)
 
+    def test_jacobian_methods(self):
+        fun = lambda x: np.array([x[0] * x[1], np.exp(x[0]) + x[1] ** 3])
+        x0 = np.array([1., 2.])
+        jtrue = [[2., 1.], [np.exp(1), 12.]]
+        for method in ['central', 'forward', 'backward']:
+            for order in [2, 4]:
+                Jfun = nd.Jacobian(fun, method=method, order=order)
+                assert_array_almost_equal(Jfun(x0), jtrue)
+
+    def test_forward_jacobian_evaluates_fun_x0_once(self):
+        calls = []
+
+        def fun(x):
+            calls.append(1)
+            return np.array([x[0] * x[1], x[0] ** 2])
+
+        step_num = 15
+        nd.Jacobian(fun, method='forward', step_num=step_num)([1., 2.])
+        self.assertEqual(len(calls), 1 + 2 * step_num)
+        calls[:] = []
+        nd.Jacobian(fun, method='central', step_num=step_num)([1., 2.])
+        self.assertEqual(len(calls), 1 + 2 * 2 * step_num)
+
+    def test_vectorized_jacobian(self):
+        xdata = np.arange(0, 1, 0.1)
+        ydata = 1 + 2 * np.exp(0.75 * xdata)
+
+        def fun(c):
+            c = c.reshape(3, -1)
+            return (c[0] + c[1] * np.exp(c[2] * xdata[:, None]) -
+                    ydata[:, None])
+        x0 = np.array([1., 2., 0.75])
+        jtrue = np.vstack((np.ones(10), np.exp(0.75 * xdata),
+                           2 * xdata * np.exp(0.75 * xdata))).T
+        for method in ['central', 'forward']:
+            Jfun = nd.Jacobian(fun, method=method, vectorized=True)
+            assert_array_almost_equal(Jfun(x0), jtrue)
+
 
 class TestGradient(unittest.TestCase):
     def testgradient(self):
@@ -143,6 +404,44 @@ class TestHessian(unittest.TestCase):
             assert_array_almost_equal(hi, hit)
 
 
+class TestGaussNewtonHessian(unittest.TestCase):
+
+    def setUp(self):
+        xdata = np.arange(0, 1, 0.1)
+        ydata = 1 + 2 * np.exp(0.75 * xdata)
+        self.calls = []
+
+        def fun(c):
+            self.calls.append(1)
+            return c[0] + c[1] * np.exp(c[2] * xdata) - ydata
+        self.fun = fun
+        self.jtrue = lambda c: np.vstack((np.ones(10),
+                                          np.exp(c[2] * xdata),
+                                          c[1] * xdata *
+                                          np.exp(c[2] * xdata))).T
+
+    def test_gauss_newton_hessian_at_solution(self):
+        c = np.array([1., 2., 0.75])
+        Hfun = nd.GaussNewtonHessian(self.fun, step_num=20)
+        h = Hfun(c)
+        jac = self.jtrue(c)
+        assert_array_almost_equal(h, 2 * np.dot(jac.T, jac))
+        self.assertTrue((np.abs(h - 2 * np.dot(jac.T, jac)) <=
+                         10 * Hfun.error_estimate).all())
+        self.assertEqual(len(self.calls), 1 + 2 * 3 * 20)
+        self.assertTrue(Hfun.second_order_term is None)
+
+    def test_second_order_term(self):
+        c = np.array([1., 2.5, 0.5])
+        Hfun = nd.GaussNewtonHessian(self.fun, second_order=True)
+        h = Hfun(c)
+        htrue = nd.Hessian(lambda c: np.sum(self.fun(c) ** 2))(c)
+        assert_array_almost_equal(h, htrue)
+        jac = self.jtrue(c)
+        assert_array_almost_equal(Hfun.second_order_term,
+                                  htrue - 2 * np.dot(jac.T, jac))
+
+
 class TestHessdiag(unittest.TestCase):
 
     def testhessdiag(self):
@@ -154,6 +453,272 @@ class TestHessdiag(unittest.TestCase):
             assert_array_almost_equal(hi, hit)
 
 
+class _CountingExecutor(ThreadPoolExecutor):
+
+    def __init__(self, max_workers=4):
+        super(_CountingExecutor, self).__init__(max_workers)
+        self.num_calls = 0
+
+    def submit(self, fn, *args, **kwargs):
+        self.num_calls += 1
+        return super(_CountingExecutor, self).submit(fn, *args, **kwargs)
+
+
+class TestExecutor(unittest.TestCase):
+
+    def test_identical_to_serial(self):
+        cases = [(nd.Hessian, rosen, {}),
+                 (nd.PartialDerivative, rosen, dict(multi_index=[1, 1, 0])),
+                 (nd.ThirdDerivative, rosen, {}), (nd.Laplacian, rosen, {}),
+                 (nd.GaussNewtonHessian, residuals, dict(second_order=True))]
+        for method in ['central', 'forward', 'backward']:
+            cases += [(nd.Derivative, np.exp, dict(method=method)),
+                      (nd.Derivative, np.exp, dict(method=method, n=[1, 2])),
+                      (nd.Gradient, rosen, dict(method=method)),
+                      (nd.Hessdiag, rosen, dict(method=method)),
+                      (nd.Jacobian, residuals, dict(method=method))]
+        for case in cases:
+            with _CountingExecutor() as executor:
+                assert_identical([case], X0, executor=executor)
+                self.assertTrue(executor.num_calls > 0)
+
+
+class TestAutoVectorized(unittest.TestCase):
+
+    @staticmethod
+    def dot_fun(x):
+        return np.dot(x, x)
+
+    def test_vectorized_functions(self):
+        x = X0
+        cases = [(nd.Derivative, np.exp), (nd.Jacobian, residuals),
+                 (nd.Hessian, rosen), (nd.Laplacian, rosen)]
+        for cls, fun in cases:
+            d = cls(fun, vectorized='auto')
+            val = d(x)
+            assert_array_almost_equal(val, cls(fun)(x), decimal=12)
+            decisions = d._batch_probe.decisions.values()
+            self.assertTrue(any(batch for batch, _shape in decisions))
+            assert_array_almost_equal(d(x), val, decimal=14)
+
+    def test_non_vectorized_function(self):
+        x = X0
+        for cls in [nd.Jacobian, nd.Hessian, nd.Laplacian]:
+            d = cls(self.dot_fun, vectorized='auto')
+            assert_array_equal(d(x), cls(self.dot_fun)(x))
+            self.assertEqual(d._batch_probe.decisions[self.dot_fun],
+                             (False, ()))
+
+
+class TestEvaluate(unittest.TestCase):
+
+    def test_result(self):
+        x = X0
+        calls = []
+
+        def fun(x):
+            calls.append(x)
+            return rosen(x)
+
+        for cls in [nd.Gradient, nd.Hessdiag, nd.Hessian, nd.Laplacian]:
+            d = cls(fun)
+            calls[:] = []
+            res = d.evaluate(x)
+            self.assertEqual(res.num_evaluations, len(calls))
+            self.assertTrue(d.error_estimate is None)
+            self.assertTrue(d.fun is fun)
+            d2 = cls(rosen)
+            assert_array_equal(res.value, d2(x))
+            assert_array_equal(res.error, d2.error_estimate)
+            assert_array_equal(res.step, d2.final_delta)
+            self.assertRaises(AttributeError, setattr, res, 'value', 0)
+
+    def test_repeated_auto_vectorized(self):
+        x = X0
+        for cls in [nd.Gradient, nd.Hessdiag, nd.Hessian, nd.Laplacian]:
+            d = cls(rosen, vectorized='auto')
+            value = d.evaluate(x).value
+            decisions = dict(d._batch_probe.decisions)
+            for _ in range(5):
+                assert_array_equal(d.evaluate(x).value, value)
+            self.assertEqual(d._batch_probe.decisions, decisions)
+            assert_array_equal(d(x), value)
+            self.assertEqual(d._batch_probe.decisions, decisions)
+
+    def test_concurrent_use(self):
+        rng = np.random.RandomState(0)
+        points = rng.uniform(0.5, 1.5, size=(40, 3))
+        cases = [(nd.Derivative(np.exp, n=2), np.exp, dict(n=2)),
+                 (nd.Gradient(rosen), rosen, {}),
+                 (nd.Hessian(rosen), rosen, {}),
+                 (nd.Jacobian(residuals), residuals, {})]
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # switch threads as often as possible
+        try:
+            with ThreadPoolExecutor(8) as executor:
+                results = [list(executor.map(d.evaluate, points))
+                           for d, _fun, _kwds in cases]
+        finally:
+            sys.setswitchinterval(switch_interval)
+        for (d, fun, kwds), case_results in zip(cases, results):
+            for x, res in zip(points, case_results):
+                d2 = type(d)(fun, **kwds)
+                assert_array_equal(res.value, d2(x))
+                assert_array_equal(res.error, d2.error_estimate)
+
+
+class TestPlan(unittest.TestCase):
+
+    def test_identical_to_object(self):
+        cases = [(nd.Derivative, np.exp, dict(n=2)),
+                 (nd.Derivative, np.exp, dict(n=[1, 2])),
+                 (nd.Gradient, rosen, {}), (nd.Hessdiag, rosen, {}),
+                 (nd.Hessian, rosen, {}), (nd.Jacobian, residuals, {}),
+                 (nd.PartialDerivative, rosen, dict(multi_index=[1, 1, 0])),
+                 (nd.Laplacian, rosen, {})]
+        for cls, fun, kwds in cases:
+            d = cls(fun, **kwds)
+            plan = d.plan(X0.shape)
+            for x in [X0, X0 + 0.5]:
+                val = plan(x)
+                assert_array_equal(val, d(x))
+                assert_array_equal(plan.error_estimate, d.error_estimate)
+                assert_array_equal(plan.evaluate(x).value, val)
+
+    def test_frozen(self):
+        d = nd.Gradient(rosen)
+        plan = d.plan(3)
+        val = plan(X0)
+        d.method = 'forward'
+        assert_array_equal(plan(X0), val)
+        self.assertRaises(ValueError, plan, X0[:2])
+
+    def test_parameters_are_copied(self):
+        d = nd.Gradient(rosen, step_nom=np.ones(3), vectorized='auto')
+        plan = d.plan(3)
+        val = plan(X0)
+        d.step_nom[:] = 1e-3
+        d(X0)
+        assert_array_equal(plan(X0), val)
+        self.assertTrue(plan.derivative.fun is d.fun)
+        self.assertFalse(plan.derivative._batch_probe is d._batch_probe)
+
+
+class TestOutputArrays(unittest.TestCase):
+
+    @staticmethod
+    def vec_fun(x):
+        t = np.linspace(0, 1, 100)
+        return x[0] * np.exp(x[1] * t) + np.sin(x[2] * t)
+
+    def test_written_to_out(self):
+        x = X0
+        cases = [(nd.Gradient, rosen, (3,), (3,)),
+                 (nd.Hessdiag, rosen, (3,), (3,)),
+                 (nd.Hessian, rosen, (3, 3), (3,)),
+                 (nd.Jacobian, self.vec_fun, (100, 3), (100, 3))]
+        for cls, fun, shape, step_shape in cases:
+            d = cls(fun)
+            val = d(x)
+            err, delta = d.error_estimate, d.final_delta
+            out, err_out = np.empty(shape), np.empty(shape)
+            step_out = np.empty(step_shape)
+            self.assertTrue(d(x, out, err_out, step_out) is out)
+            assert_array_equal(out, val)
+            assert_array_equal(err_out, err)
+            assert_array_equal(step_out, delta)
+            self.assertTrue(d.error_estimate is err_out)
+            self.assertRaises(ValueError, d, x, np.empty((4,) + shape))
+
+    @staticmethod
+    def peak_memory(plan, x, arrays):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')  # recorded warnings use memory
+            plan(x, *arrays)  # allocates the work arrays
+            tracemalloc.start()
+            try:
+                peaks = []
+                for _ in range(3):
+                    tracemalloc.reset_peak()
+                    # the blocks kept by numpy from earlier calls don't count
+                    before = tracemalloc.get_traced_memory()[0]
+                    plan(x, *arrays)
+                    peaks.append(tracemalloc.get_traced_memory()[1] - before)
+                return min(peaks)
+            finally:
+                tracemalloc.stop()
+
+    def test_peak_memory_after_warm_up(self):
+        fun = lambda x: x.dot(x)
+        cases = [(nd.Gradient, (20, 150), 1), (nd.Hessdiag, (20, 150), 1),
+                 (nd.Hessian, (6, 16), 2)]
+        for cls, sizes, ndim in cases:
+            for n in sizes:
+                plan = cls(fun, inplace=True).plan(n)
+                arrays = [np.empty((n,) * ndim), np.empty((n,) * ndim),
+                          np.empty(n)]
+                peak = self.peak_memory(plan, np.linspace(0.1, 1, n), arrays)
+                # the Romberg extrapolation of each element makes small
+                # arrays of a fixed size, all the rest is in work arrays
+                self.assertLess(peak, 32 * 1024)
+        for num_values in (20, 200):
+            t = np.linspace(0, 1, num_values)
+            value = np.empty(num_values)
+
+            def vec_fun(x):
+                np.multiply(x[1], t, out=value)
+                np.exp(value, out=value)
+                return np.multiply(value, x[0], out=value)
+            plan = nd.Jacobian(vec_fun).plan(3)
+            arrays = [np.empty((num_values, 3)) for _ in range(3)]
+            self.assertLess(self.peak_memory(plan, X0, arrays), 32 * 1024)
+
+
+class TestInplace(unittest.TestCase):
+
+    def setUp(self):
+        self.x = np.array([0.9, 1.2, 0.3, 2.0])
+        self.arrays = []
+
+    def fun(self, x):
+        self.arrays.append(x)
+        return (1 - x[0]) ** 2 + 105 * (x[1] - x[0] ** 2) ** 2 + x[3] * x[2]
+
+    def vec_fun(self, x):
+        self.arrays.append(x)
+        return np.array([x[0] * x[1], np.sin(x[2]) + x[0], x[3] ** 3])
+
+    def test_identical_to_copies(self):
+        x = self.x
+        cases = [(nd.Gradient, self.fun), (nd.Hessdiag, self.fun),
+                 (nd.Hessian, self.fun), (nd.Jacobian, self.vec_fun),
+                 (nd.GaussNewtonHessian, self.vec_fun)]
+        for cls, fun in cases:
+            for method in ['central', 'forward', 'backward']:
+                val = cls(fun, method=method)(x)
+                self.arrays = []
+                val2 = cls(fun, method=method, inplace=True)(x)
+                assert_array_equal(val2, val)
+                assert_array_equal(x, [0.9, 1.2, 0.3, 2.0])
+                # one scratch array, restored to x after the calls
+                scratch = self.arrays[-1]
+                num_scratch = sum(a is scratch for a in self.arrays)
+                self.assertTrue(num_scratch >= len(self.arrays) // 2)
+                assert_array_equal(scratch, x)
+
+    def test_values_sharing_memory(self):
+        jac = nd.Jacobian(lambda x: x, inplace=True)(self.x)
+        assert_array_almost_equal(jac, np.eye(4))
+        grad = nd.Gradient(lambda x: x[1:2], inplace=True)(self.x)
+        assert_array_almost_equal(grad, [0, 1, 0, 0])
+
+    def test_copies_with_executor(self):
+        with ThreadPoolExecutor(2) as executor:
+            nd.Gradient(self.fun, inplace=True, executor=executor)(self.x)
+        ids = set(id(a) for a in self.arrays)
+        self.assertEqual(len(ids), len(self.arrays))
+
+
 class TestGlobalFunctions(unittest.TestCase):
     def test_vec2mat(self):
         mat = nd.core.vec2mat(np.arange(6), n=2, m=3)
@@ -0,0 +1,74 @@
+""" Test functions for numdifftools.parallel module
+
+"""
+import pickle
+import unittest
+import numdifftools as nd
+import numdifftools.nd_cstep as ndc
+import numpy as np
+from numpy.testing import assert_array_equal
+from numdifftools.parallel import SharedMemoryExecutor
+from numdifftools.tests.helpers import X0, assert_identical, residuals, rosen
+
+
+def bad_fun(x):
+    raise ValueError('bad point')
+
+
+class TestPickle(unittest.TestCase):
+
+    def test_pickle_derivative_objects(self):
+        with SharedMemoryExecutor(max_workers=1) as executor:
+            objects = [nd.Derivative(np.exp, executor=executor),
+                       nd.Derivative(np.exp, transform='exp'),
+                       nd.Gradient(rosen, executor=executor),
+                       nd.Hessian(rosen), nd.Jacobian(residuals),
+                       nd.GaussNewtonHessian(residuals, second_order=True),
+                       ndc.Derivative(np.exp, executor=executor),
+                       ndc.Gradient(rosen), ndc.Hessian(rosen),
+                       ndc.NDerivative(np.exp, n=2, order=5)]
+            for obj in objects:
+                val = obj(X0)
+                obj2 = pickle.loads(pickle.dumps(obj))
+                self.assertTrue(obj2.executor is None)
+                assert_array_equal(obj2(X0), val)
+
+
+class TestSharedMemoryExecutor(unittest.TestCase):
+
+    def test_identical_to_serial(self):
+        cases = [(nd.Gradient, rosen, {}), (nd.Hessdiag, rosen, {}),
+                 (nd.Hessian, rosen, {}), (nd.Jacobian, residuals, {}),
+                 (nd.GaussNewtonHessian, residuals, dict(second_order=True)),
+                 (nd.Laplacian, rosen, {}),
+                 (ndc.Gradient, rosen, dict(method='central')),
+                 (ndc.Jacobian, residuals, {}),
+                 (ndc.Hessian, rosen, {}),
+                 (ndc.Hessian, rosen, dict(method='central2'))]
+        with SharedMemoryExecutor(max_workers=2, chunksize=3,
+                                  block_size=7) as executor:
+            assert_identical(cases, X0, executor=executor)
+
+    def test_map(self):
+        points = (np.arange(3.0) + k for k in range(10))
+        with SharedMemoryExecutor(max_workers=2, block_size=4) as executor:
+            values = list(executor.map(residuals, points))
+            self.assertEqual(len(values), 10)
+            for k, value in enumerate(values):
+                assert_array_equal(value, residuals(np.arange(3.0) + k))
+            self.assertEqual(list(executor.map(residuals, [])), [])
+            self.assertRaises(ValueError, nd.Gradient(bad_fun,
+                                                      executor=executor),
+                              X0)
+
+    def test_map_points_of_different_types(self):
+        points = ([np.arange(3)] * 5 + [np.arange(3.0) + 0.5] * 20 +
+                  [np.arange(3) * 1j, np.arange(2.0)])
+        with SharedMemoryExecutor(max_workers=1, block_size=16) as executor:
+            values = list(executor.map(np.sum, iter(points)))
+        self.assertEqual(values, [np.sum(point) for point in points])
+        self.assertEqual(type(values[0]), type(np.sum(points[0])))
+
+
+if __name__ == '__main__':
+    unittest.main()
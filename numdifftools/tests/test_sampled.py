@@ -0,0 +1,179 @@
+""" Test functions for numdifftools.sampled module
+
+"""
+import os
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+import numdifftools.sampled as nds
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+
+
+class TestDerivative(unittest.TestCase):
+
+    def setUp(self):
+        self.x = np.linspace(0, 3, 3001)
+        self.dx = self.x[1] - self.x[0]
+
+    def test_sin_derivatives(self):
+        x = self.x
+        for n, num_points, decimal in [(1, 3, 5), (1, 5, 10), (2, 5, 7),
+                                       (3, 5, 4), (3, 9, 3)]:
+            dy = nds.derivative(np.sin(x), dx=self.dx, n=n,
+                                num_points=num_points)
+            assert_array_almost_equal(dy, np.sin(x + n * np.pi / 2),
+                                      decimal=decimal)
+
+    def test_chunked_equals_unchunked(self):
+        y = np.vstack([np.sin(self.x), np.exp(self.x)])
+        for num_points in [3, 7]:
+            dy = nds.derivative(y, dx=self.dx, num_points=num_points, axis=1,
+                                chunk_size=y.shape[1])
+            for chunk_size in [1, 2, 257]:
+                dy2 = nds.derivative(y, dx=self.dx, num_points=num_points,
+                                     axis=1, chunk_size=chunk_size)
+                assert_array_almost_equal(dy2, dy, decimal=12)
+
+    def test_fft_equals_direct(self):
+        y = np.sin(self.x)
+        dy = nds.derivative(y, dx=self.dx, n=2, num_points=7,
+                            chunk_size=500)
+        dy2 = nds.derivative(y, dx=self.dx, n=2, num_points=7,
+                             chunk_size=500, fft_min_points=7)
+        assert_array_almost_equal(dy2, dy, decimal=6)
+
+    def test_memmap(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            shape = (2, self.x.size)
+            y = np.memmap(os.path.join(tmpdir, 'y.dat'), dtype=float,
+                          mode='w+', shape=shape)
+            y[0], y[1] = np.sin(self.x), np.cos(self.x)
+            y.flush()
+            out = np.memmap(os.path.join(tmpdir, 'dy.dat'), dtype=float,
+                            mode='w+', shape=shape)
+            dy = nds.derivative(y, dx=self.dx, num_points=5, axis=1,
+                                out=out, chunk_size=100)
+            self.assertTrue(dy is out)
+            assert_array_almost_equal(out[0], np.cos(self.x), decimal=10)
+            assert_array_almost_equal(out[1], -np.sin(self.x), decimal=10)
+            del y, out, dy
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def test_uneven_spacing(self):
+        x = np.sort(np.random.RandomState(1).uniform(0, 3, 2000))
+        for n, num_points, decimal in [(1, 3, 4), (1, 7, 8), (2, 5, 4)]:
+            dy = nds.derivative(np.sin(x), n=n, x=x, num_points=num_points,
+                                chunk_size=300)
+            assert_array_almost_equal(dy, np.sin(x + n * np.pi / 2),
+                                      decimal=decimal)
+
+    def test_invalid_input(self):
+        self.assertRaises(ValueError, nds.derivative, np.ones(2),
+                          num_points=3)
+        self.assertRaises(ValueError, nds.derivative, np.ones(5),
+                          x=np.arange(4))
+
+
+class TestIterDerivative(unittest.TestCase):
+
+    def test_equals_derivative(self):
+        x = np.linspace(0, 3, 1001)
+        y = np.vstack([np.sin(x), np.exp(x)])
+        dx = x[1] - x[0]
+        for num_points in [3, 5, 9]:
+            for n in [1, 2]:
+                dy = nds.derivative(y, dx=dx, n=n, num_points=num_points,
+                                    axis=1)
+                for size in [1, 37, 1001]:
+                    chunks = (y[:, i:i + size] for i in range(0, 1001, size))
+                    parts = list(nds.iter_derivative(chunks, dx=dx, n=n,
+                                                     num_points=num_points,
+                                                     axis=1))
+                    dy2 = np.concatenate(parts, axis=1)
+                    assert_array_almost_equal(dy2, dy, decimal=8)
+
+    def test_latency(self):
+        chunks = [np.arange(10.0), np.arange(10.0, 20.0)]
+        parts = list(nds.iter_derivative(iter(chunks), num_points=5))
+        self.assertEqual([len(part) for part in parts], [8, 10, 2])
+        assert_array_almost_equal(np.hstack(parts), np.ones(20))
+
+    def test_too_few_samples(self):
+        chunks = [np.arange(2.0)]
+        self.assertRaises(ValueError, list, nds.iter_derivative(chunks))
+
+
+class TestOnlineDerivative(unittest.TestCase):
+
+    def setUp(self):
+        self.t = np.arange(0, 5, 0.01)
+        self.omega = np.linspace(0.5, 3, 1000)
+        self.y = np.sin(self.omega * self.t[:, np.newaxis])
+
+    def test_matches_true_derivative(self):
+        for method in ['central', 'backward']:
+            for n, num_points in [(1, 3), (1, 5), (2, 5)]:
+                d = nds.OnlineDerivative(self.omega.size, dx=0.01, n=n,
+                                         num_points=num_points, method=method)
+                der = d.update(self.y)
+                true_der = self.omega ** n * np.sin(
+                    self.omega * (self.t[:, np.newaxis] - d.lag * 0.01) +
+                    n * np.pi / 2)
+                valid = slice(8 * (num_points // 2) + num_points, None)
+                self.assertTrue(np.isnan(der[0]).all())
+                self.assertTrue((np.abs(der - true_der)[valid] <=
+                                 d.error_estimate[valid] + 1e-8).all())
+                assert_array_almost_equal(der[valid], true_der[valid],
+                                          decimal=2)
+
+    def test_one_sample_at_a_time(self):
+        d = nds.OnlineDerivative(self.omega.size, dx=0.01, num_points=5)
+        der = d.update(self.y)
+        err = d.error_estimate
+        d.reset()
+        buffer = d._buffer
+        for i, sample in enumerate(self.y):
+            der_i = d.update(sample)
+            self.assertEqual(der_i.shape, (self.omega.size,))
+            assert_array_almost_equal(der_i, der[i], decimal=12)
+            assert_array_almost_equal(d.error_estimate, err[i], decimal=12)
+        self.assertTrue(d._buffer is buffer)
+        self.assertEqual(d.count, self.t.size)
+
+    def test_invalid_input(self):
+        self.assertRaises(ValueError, nds.OnlineDerivative, method='forward')
+        self.assertRaises(ValueError, nds.OnlineDerivative, n=2,
+                          num_points=2, method='backward')
+        self.assertRaises(ValueError, nds.OnlineDerivative, num_points=4)
+
+    def test_invalid_samples(self):
+        d = nds.OnlineDerivative(3)
+        for shape in [(), (2,), (6,), (4, 2), (1, 3, 1)]:
+            self.assertRaises(ValueError, d.update, np.ones(shape))
+        self.assertRaises(ValueError, d.update, np.ones((4, 3)),
+                          out=np.empty(3))
+        self.assertEqual(d.count, 0)
+
+    def test_no_allocations_with_out(self):
+        d = nds.OnlineDerivative(self.omega.size, dx=0.01, num_points=5)
+        out = np.empty((10, self.omega.size))
+        err_out = np.empty_like(out)
+        d.update(self.y[:10])
+        tracemalloc.start()
+        try:
+            for i in range(10, 100, 10):
+                der = d.update(self.y[i:i + 10], out=out, err_out=err_out)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertTrue(der is out)
+        self.assertTrue(d.error_estimate is err_out)
+        self.assertLess(peak, out.nbytes // 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+""" Test functions for numdifftools.separable module
+
+"""
+import unittest
+import numdifftools.separable as nds
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+
+
+def _g3(z):
+    return z[0] ** 2 * z[1] + np.sin(z[2])
+
+
+def _g3_hessian(z):
+    return np.array([[2 * z[1], 2 * z[0], 0], [2 * z[0], 0, 0],
+                     [0, 0, -np.sin(z[2])]])
+
+
+def _g2(z):
+    return np.exp(z[0] * z[1])
+
+
+def _g2_hessian(z):
+    exp = np.exp(z[0] * z[1])
+    return exp * np.array([[z[1] ** 2, 1 + z[0] * z[1]],
+                           [1 + z[0] * z[1], z[0] ** 2]])
+
+
+class TestPartiallySeparable(unittest.TestCase):
+
+    def setUp(self):
+        self.funs = [_g3, _g3, _g2, _g3, _g2]
+        self.index_sets = [[0, 1, 2], [2, 3, 4], [4, 5], [5, 6, 0], [1, 6]]
+        self.x = np.linspace(0.1, 0.7, 7)
+
+    def true_gradient_and_hessian(self, x):
+        grad, hess = np.zeros(7), np.zeros((7, 7))
+        for fun, index in zip(self.funs, self.index_sets):
+            z = x[index]
+            if fun is _g3:
+                grad[index] += [2 * z[0] * z[1], z[0] ** 2, np.cos(z[2])]
+                hess[np.ix_(index, index)] += _g3_hessian(z)
+            else:
+                grad[index] += np.exp(z[0] * z[1]) * z[::-1]
+                hess[np.ix_(index, index)] += _g2_hessian(z)
+        return grad, hess
+
+    def test_value(self):
+        fun = nds.PartiallySeparable(self.funs, self.index_sets)
+        val = sum(g(self.x[index])
+                  for g, index in zip(self.funs, self.index_sets))
+        self.assertAlmostEqual(fun(self.x), val)
+
+    def test_gradient_and_hessian(self):
+        grad, hess = self.true_gradient_and_hessian(self.x)
+        fun = nds.PartiallySeparable(self.funs, self.index_sets)
+        assert_array_almost_equal(fun.gradient(self.x), grad, decimal=10)
+        self.assertTrue((np.abs(fun.gradient(self.x) - grad) <=
+                         10 * fun.error_estimate + 1e-15).all())
+        h = fun.hessian(self.x)
+        pattern = np.zeros((7, 7), dtype=bool)
+        for index in self.index_sets:
+            pattern[np.ix_(index, index)] = True
+        self.assertEqual(h.nnz, pattern.sum())
+        assert_array_almost_equal(h.toarray(), hess, decimal=9)
+
+    def test_cost_scales_with_element_size(self):
+        calls = []
+
+        def g(z):
+            calls.append(1)
+            return (1 - z[0]) ** 2 + 100 * (z[1] - z[0] ** 2) ** 2
+        for n in [10, 20]:
+            calls[:] = []
+            index_sets = [[k, k + 1] for k in range(n - 1)]
+            fun = nds.PartiallySeparable(g, index_sets, step_num=10)
+            fun.gradient(np.ones(n))
+            # f(x0) once, and 2 points for each of the 2 variables and steps
+            self.assertEqual(len(calls), (n - 1) * (1 + 2 * 2 * 10))
+
+    def test_vectorized_groups(self):
+        calls = []
+
+        def g(z):
+            calls.append(1)
+            return (1 - z[0]) ** 2 + 100 * (z[1] - z[0] ** 2) ** 2
+        n = 500
+        index_sets = [[k, k + 1] for k in range(n - 1)]
+        fun = nds.PartiallySeparable(g, index_sets, vectorized=True)
+        x = np.ones(n)
+        hess = fun.hessian(x)
+        self.assertEqual(len(calls), 1)
+        assert_array_almost_equal(hess.diagonal()[[0, 1, -1]],
+                                  [802, 1002, 200], decimal=6)
+        self.assertEqual(fun.error_estimate.shape, (n, n))
+        calls[:] = []
+        assert_array_almost_equal(fun.gradient(x), np.zeros(n))
+        self.assertEqual(len(calls), 1 + 2 * 2)
+
+    def test_invalid_input(self):
+        fun = nds.PartiallySeparable([_g2], [[0, 1], [1, 2]])
+        self.assertRaises(ValueError, fun.gradient, self.x)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+""" Test functions for numdifftools.spectral module
+
+"""
+import unittest
+import warnings
+import numdifftools.spectral as nds
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+
+
+class TestChebyshev(unittest.TestCase):
+
+    def test_derivatives_of_exp(self):
+        x = np.linspace(0, 2, 1001)
+        for n in range(4):
+            der, info = nds.Chebyshev(np.exp, a=0, b=2, n=n,
+                                      full_output=True)(x)
+            self.assertTrue((np.abs(der - np.exp(x)) <=
+                             info.error_estimate).all())
+            self.assertEqual(info.function_count, info.degree + 1)
+
+    def test_fit_is_reused(self):
+        calls = []
+
+        def fun(x):
+            calls.append(x.size)
+            return np.sin(x)
+        dfun = nds.Chebyshev(fun, a=0, b=10, n=1)
+        dfun(np.linspace(0, 10, 7))
+        num_calls = len(calls)
+        der = dfun(np.linspace(0, 10, 10001))
+        self.assertEqual(len(calls), num_calls)
+        self.assertEqual(sum(calls), len(dfun.coefficients))
+        assert_array_almost_equal(der, np.cos(np.linspace(0, 10, 10001)),
+                                  decimal=10)
+
+    def test_runge_function(self):
+        def fun(x):
+            return 1. / (1 + 25 * x ** 2)
+
+        def dfun(x):
+            return -50 * x / (1 + 25 * x ** 2) ** 2
+        x = np.linspace(-1, 1, 101)
+        assert_array_almost_equal(nds.Chebyshev(fun)(x), dfun(x), decimal=9)
+
+    def test_non_smooth_function_warns(self):
+        with warnings.catch_warnings(record=True) as warn:
+            warnings.simplefilter('always')
+            nds.Chebyshev(np.abs, max_degree=256)(0.5)
+        self.assertEqual(len(warn), 1)
+
+
+class TestFourier(unittest.TestCase):
+
+    def test_derivatives_of_periodic_function(self):
+        def fun(x):
+            return np.exp(np.sin(x))
+        dfuns = [fun, lambda x: np.cos(x) * fun(x),
+                 lambda x: (np.cos(x) ** 2 - np.sin(x)) * fun(x)]
+        x = np.linspace(-5, 5, 1001)
+        for n, dfun in enumerate(dfuns):
+            der, info = nds.Fourier(fun, a=0, b=2 * np.pi, n=n,
+                                    full_output=True)(x)
+            self.assertFalse(np.iscomplexobj(der))
+            self.assertTrue((np.abs(der - dfun(x)) <=
+                             info.error_estimate).all())
+
+    def test_trigonometric_polynomial(self):
+        x = np.linspace(0, 1, 11)
+        der = nds.Fourier(lambda x: np.cos(2 * np.pi * 3 * x), a=0, b=1,
+                          n=2)(x)
+        assert_array_almost_equal(der, -(6 * np.pi) ** 2 *
+                                  np.cos(6 * np.pi * x), decimal=9)
+
+
+if __name__ == '__main__':
+    unittest.main()